@@ -71,8 +71,8 @@ def generate_music(quantity=1, genres=None, moods=None):
                                 print(f"    Song: {result['song']}")
                             if 'picture' in result:
                                 print(f"    Picture: {result['picture']}")
-                            if 'lyrics_file' in result:
-                                print(f"    Lyrics: {result['lyrics_file']}")
+                            if 'lyrics_url' in result:
+                                print(f"    Lyrics: http://localhost:5000{result['lyrics_url']}")
                     else:
                         print(f"✗ Error: {data.get('error', 'Unknown error')}")
                 else:
@@ -192,7 +192,7 @@ def main():
     print("Generated files are in the output/ directory:")
     print("  - output/songs/     (MIDI files)")
     print("  - output/images/    (Album art)")
-    print("  - output/           (Lyrics)")
+    print("Lyrics are served at /api/lyrics/<id>")
     print()
 
 
@@ -6,30 +6,269 @@ A music AI that evolves after use, creating songs, pictures, videos, lyrics, and
 
 import os
 import json
+import base64
+import hashlib
 import random
+import threading
 import time
-from datetime import datetime
-from flask import Flask, render_template, request, jsonify, send_from_directory
+from collections import namedtuple
+from datetime import datetime, timezone
+from flask import (Flask, Response, render_template, request, jsonify,
+                   send_from_directory, stream_with_context)
 from pathlib import Path
+from werkzeug.utils import secure_filename
 
-from music_generator import MusicGenerator
-from image_generator import ImageGenerator
-from lyrics_generator import LyricsGenerator
-from artist_generator import ArtistGenerator
-from evolution_engine import EvolutionEngine
+from batch_executor import BatchExecutor
+from job_queue import JobQueue, JobQueueFull
+from result_cache import ResultCache, settings_fingerprint
+from output_store import OutputStore, new_id
+from audio_renderer import AudioRenderer, AudioRenderError
+from metrics import Metrics, StageTimer
+from retention import RetentionManager
+import batch_archive
+from single_flight import SingleFlight
+from lazy import LazyObject, warm_up as warm_up_objects
 
 app = Flask(__name__)
 
 # Configuration
+CONFIG_FILE = Path("config.json")
 OUTPUT_DIR = Path("output")
-OUTPUT_DIR.mkdir(exist_ok=True)
 
-# Initialize generators
-music_gen = MusicGenerator()
-image_gen = ImageGenerator()
-lyrics_gen = LyricsGenerator()
-artist_gen = ArtistGenerator()
-evolution_engine = EvolutionEngine()
+# Content types in the order their results are added to each item
+CONTENT_TYPES = ['artist', 'lyrics', 'song', 'audio', 'picture', 'video']
+
+# Output subdirectories of immutable generated media
+MEDIA_DIRS = ('songs', 'images', 'videos', 'audio')
+
+# Output subdirectories kept under the disk quota: media, plus the result
+# cache index and batch manifests that refer to it
+RETAINED_DIRS = MEDIA_DIRS + ('cache', 'batches')
+
+# Customization options served when config.json does not list them
+DEFAULT_CUSTOMIZATION_OPTIONS = {
+    'genres': ['pop', 'rock', 'jazz', 'classical', 'electronic', 'hip-hop', 'country', 'blues'],
+    'moods': ['happy', 'sad', 'energetic', 'calm', 'romantic', 'dark', 'uplifting'],
+    'tempos': ['slow', 'medium', 'fast', 'variable'],
+    'keys': ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B'],
+    'styles': ['acoustic', 'electric', 'orchestral', 'synthetic', 'mixed']
+}
+
+
+def load_config():
+    """Load application configuration from config.json."""
+    if CONFIG_FILE.exists():
+        with open(CONFIG_FILE, 'r') as f:
+            return json.load(f)
+    return {}
+
+
+CONFIG = load_config()
+
+# /api/customization-options, serialized once with its validators
+CATALOG_BODY = json.dumps({
+    name: CONFIG.get('customization', {}).get(name, options)
+    for name, options in DEFAULT_CUSTOMIZATION_OPTIONS.items()
+}).encode('utf-8')
+CATALOG_ETAG = hashlib.sha256(CATALOG_BODY).hexdigest()[:32]
+CATALOG_LAST_MODIFIED = datetime.fromtimestamp(
+    int(CONFIG_FILE.stat().st_mtime if CONFIG_FILE.exists() else time.time()),
+    tz=timezone.utc
+)
+
+def prune_lyrics():
+    """Expire stored lyrics by age and row quota, after each retention sweep."""
+    lyrics_store.prune(
+        max_age_seconds=CONFIG.get('retention', {}).get('lyrics_max_age_seconds'),
+        max_rows=CONFIG.get('retention', {}).get('lyrics_max_rows', 100000)
+    )
+
+
+# LRU disk quota for generated files, swept on a background thread started
+# by warm_up() or the first request, so importing the app starts no thread
+retention = None
+if CONFIG.get('retention', {}).get('enabled', True):
+    retention = RetentionManager(
+        OUTPUT_DIR,
+        directories=RETAINED_DIRS,
+        max_bytes=CONFIG.get('retention', {}).get('max_bytes', 1024 ** 3),
+        max_age_seconds=CONFIG.get('retention', {}).get('max_age_seconds'),
+        grace_seconds=CONFIG.get('retention', {}).get('grace_seconds', 300),
+        sweep_interval=CONFIG.get('retention', {}).get('sweep_interval_seconds', 60),
+        batch_size=CONFIG.get('retention', {}).get('batch_size', 500),
+        on_sweep=prune_lyrics
+    )
+
+# Shared store that names and writes every generated file
+output_store = OutputStore(
+    OUTPUT_DIR,
+    shard_depth=CONFIG.get('output', {}).get('shard_depth', 1),
+    on_write=retention.track if retention is not None else None
+)
+
+# Generators and stores are built on first use (see lazy.py), importing
+# their modules then, so the app starts without loading NumPy, Pillow or
+# midiutil, opening databases or reading the statistics file
+
+
+def create_music_gen():
+    from music_generator import MusicGenerator
+    return MusicGenerator(
+        output_store=output_store,
+        duration_bars=CONFIG.get('generation', {}).get('midi_duration_bars', 32),
+        beats_per_bar=CONFIG.get('generation', {}).get('beats_per_bar', 4),
+        arrangement=CONFIG.get('generation', {}).get('arrangement', 'simple'),
+        melody_mode=CONFIG.get('generation', {}).get('melody_mode', 'scale'),
+        corpus_index=CONFIG.get('generation', {}).get('corpus_index', 'soundfonts/corpus.idx')
+    )
+
+
+def create_image_gen():
+    from image_generator import ImageGenerator
+    return ImageGenerator(
+        render_backend=CONFIG.get('generation', {}).get('render_backend', 'pil'),
+        background_cache_size=CONFIG.get('generation', {}).get('background_cache_size', 32),
+        output_store=output_store
+    )
+
+
+def create_lyrics_gen():
+    from lyrics_generator import LyricsGenerator
+    return LyricsGenerator(
+        engine=CONFIG.get('generation', {}).get('lyrics_engine', 'template'),
+        tables_file=CONFIG.get('generation', {}).get('lyrics_tables', 'lyrics_corpus/tables.npz')
+    )
+
+
+def create_artist_gen():
+    from artist_generator import ArtistGenerator
+    from bloom_filter import BloomFilter
+    return ArtistGenerator(issued_filter=BloomFilter(
+        CONFIG.get('artists', {}).get('issued_names_file', 'output/issued_artists.bloom'),
+        capacity=CONFIG.get('artists', {}).get('issued_names_capacity', 100000),
+        error_rate=CONFIG.get('artists', {}).get('issued_names_error_rate', 0.001)
+    ))
+
+
+def create_evolution_engine():
+    from evolution_engine import EvolutionEngine
+    from evolution_store import create_store
+    return EvolutionEngine(store=create_store(CONFIG.get('evolution', {})))
+
+
+def create_lyrics_store():
+    # Batched SQLite storage for generated lyrics
+    from lyrics_store import LyricsStore
+    return LyricsStore(
+        db_file=CONFIG.get('output', {}).get('lyrics_db', 'lyrics.db'),
+        batch_size=CONFIG.get('output', {}).get('lyrics_batch_size', 100)
+    )
+
+
+music_gen = LazyObject(create_music_gen, 'music')
+image_gen = LazyObject(create_image_gen, 'image')
+lyrics_gen = LazyObject(create_lyrics_gen, 'lyrics')
+artist_gen = LazyObject(create_artist_gen, 'artist')
+evolution_engine = LazyObject(create_evolution_engine, 'evolution')
+lyrics_store = LazyObject(create_lyrics_store, 'lyrics_store')
+
+LAZY_COMPONENTS = [music_gen, image_gen, lyrics_gen, artist_gen, evolution_engine, lyrics_store]
+
+# Worker pool shared by all generation batches
+batch_executor = BatchExecutor(
+    pool_size=CONFIG.get('generation', {}).get('worker_pool_size', 4),
+    pool_type=CONFIG.get('generation', {}).get('worker_pool_type', 'thread')
+)
+
+# Server settings that change what a seeded request generates; they and
+# the data files they name are part of every result cache key
+GENERATOR_SETTINGS = {
+    'generation': {
+        key: CONFIG.get('generation', {}).get(key)
+        for key in ('midi_duration_bars', 'beats_per_bar', 'arrangement', 'melody_mode',
+                    'corpus_index', 'render_backend', 'image_size', 'lyrics_engine',
+                    'lyrics_tables')
+    },
+    'audio': {
+        key: CONFIG.get('audio', {}).get(key)
+        for key in ('soundfont', 'sample_rate')
+    }
+}
+
+# Content-addressed cache of seeded results
+result_cache = ResultCache(
+    OUTPUT_DIR,
+    memory_size=CONFIG.get('generation', {}).get('result_cache_size', 1024),
+    fingerprint=settings_fingerprint(GENERATOR_SETTINGS, files=[
+        CONFIG.get('generation', {}).get('corpus_index', 'soundfonts/corpus.idx'),
+        CONFIG.get('generation', {}).get('lyrics_tables', 'lyrics_corpus/tables.npz'),
+        CONFIG.get('audio', {}).get('soundfont', '/usr/share/sounds/sf2/FluidR3_GM.sf2')
+    ])
+)
+
+# FluidSynth render pool for the 'audio' content type
+audio_renderer = AudioRenderer(
+    OUTPUT_DIR,
+    soundfont=CONFIG.get('audio', {}).get('soundfont', '/usr/share/sounds/sf2/FluidR3_GM.sf2'),
+    fluidsynth_bin=CONFIG.get('audio', {}).get('fluidsynth_bin', 'fluidsynth'),
+    sample_rate=CONFIG.get('audio', {}).get('sample_rate', 44100),
+    pool_size=CONFIG.get('audio', {}).get('render_pool_size', 2),
+    max_pending=CONFIG.get('audio', {}).get('max_pending_renders', 8)
+)
+
+# Per-stage latency histograms and per-type counters for /api/metrics
+metrics = Metrics()
+
+# Shares one generation between identical concurrent seeded requests
+single_flight = None
+if CONFIG.get('coalescing', {}).get('enabled', True):
+    single_flight = SingleFlight(
+        max_waiters=CONFIG.get('coalescing', {}).get('max_waiters', 64),
+        wait_timeout=CONFIG.get('coalescing', {}).get('wait_timeout_seconds', 30)
+    )
+
+# Background queue for /api/jobs
+job_queue = JobQueue(
+    max_running_jobs=CONFIG.get('jobs', {}).get('max_running_jobs', 2),
+    max_retained_jobs=CONFIG.get('jobs', {}).get('max_retained_jobs', 100),
+    max_queued_jobs=CONFIG.get('jobs', {}).get('max_queued_jobs', 20)
+)
+
+
+def warm_up():
+    """
+    Build every generator and store now instead of on first use, and start
+    the retention sweeps.
+    
+    Call this from a worker's post-fork hook, or set startup.warm_up in
+    config.json, so the first request does not pay for initialization.
+    
+    Returns:
+        dict: milliseconds spent building each component
+    """
+    timings = warm_up_objects(LAZY_COMPONENTS)
+    start_retention()
+    return timings
+
+
+def start_retention():
+    """Start the retention sweeps, unless disabled or already running."""
+    if retention is not None:
+        retention.start()
+
+
+# 'lazy' builds on first use, 'background' warms up on a thread, 'eager' blocks
+WARM_UP_MODE = CONFIG.get('startup', {}).get('warm_up', 'lazy')
+if WARM_UP_MODE == 'eager':
+    warm_up()
+elif WARM_UP_MODE == 'background':
+    threading.Thread(target=warm_up, name='warm-up', daemon=True).start()
+
+
+@app.before_request
+def start_background_tasks():
+    """Start the retention sweeps with the first request if warm-up has not."""
+    start_retention()
 
 
 @app.route('/')
@@ -45,8 +284,13 @@ def generate_content():
     
     Expects JSON with:
     - quantity: number of items to generate
-    - content_types: list of content types (song, picture, video, lyrics, artist)
-    - customization: dict of customization options
+    - content_types: list of content types (song, audio, picture, video,
+      lyrics, artist)
+    - customization: dict of customization options (include 'seed' for
+      reproducible, cacheable results)
+    
+    Add ?stream=1 or send Accept: application/x-ndjson to receive one JSON
+    record per line as each item finishes (see stream_batch).
     """
     try:
         data = request.json
@@ -54,51 +298,23 @@ def generate_content():
         content_types = data.get('content_types', ['song', 'lyrics', 'artist'])
         customization = data.get('customization', {})
         
-        results = []
+        if wants_stream():
+            return Response(
+                stream_with_context(stream_batch(quantity, content_types, customization)),
+                mimetype='application/x-ndjson'
+            )
         
-        for i in range(quantity):
-            item_result = {
-                'id': f"{int(time.time())}_{i}",
-                'timestamp': datetime.now().isoformat(),
-                'customization': customization
-            }
-            
-            # Generate artist name
-            if 'artist' in content_types:
-                artist_name = artist_gen.generate(customization)
-                item_result['artist'] = artist_name
-            
-            # Generate lyrics
-            if 'lyrics' in content_types:
-                lyrics = lyrics_gen.generate(customization)
-                item_result['lyrics'] = lyrics
-                item_result['lyrics_file'] = save_lyrics(lyrics, item_result['id'])
-            
-            # Generate song
-            if 'song' in content_types:
-                song_file = music_gen.generate(customization)
-                item_result['song'] = song_file
-            
-            # Generate picture/album art
-            if 'picture' in content_types:
-                image_file = image_gen.generate(customization)
-                item_result['picture'] = image_file
-            
-            # Generate video (placeholder for now)
-            if 'video' in content_types:
-                video_file = generate_video_placeholder(customization)
-                item_result['video'] = video_file
-            
-            results.append(item_result)
-            
-            # Update evolution engine with generation data
-            evolution_engine.record_generation(item_result)
+        batch_id = new_id()
+        results = list(iter_batch(quantity, content_types, customization, batch_id=batch_id))
         
         # Evolve the AI based on accumulated data
-        evolution_engine.evolve()
+        with metrics.time('evolve'):
+            evolution_engine.evolve()
         
         return jsonify({
             'success': True,
+            'batch_id': batch_id,
+            'archive_url': f"/api/batches/{batch_id}/archive",
             'results': results,
             'evolution_score': evolution_engine.get_score()
         })
@@ -114,72 +330,607 @@ def generate_content():
         }), 500
 
 
-@app.route('/api/customization-options', methods=['GET'])
-def get_customization_options():
-    """Get available customization options."""
+def wants_stream():
+    """Check whether the client asked for a streamed NDJSON response."""
+    if request.args.get('stream', '').lower() in ('1', 'true', 'yes'):
+        return True
+    return request.accept_mimetypes.best == 'application/x-ndjson'
+
+
+def stream_batch(quantity, content_types, customization):
+    """
+    Generate a batch as newline-delimited JSON records.
+    
+    Yields one {"type": "item", "index": i, "result": {...}} record per item
+    as soon as it finishes, then a final {"type": "done", "success": true,
+    "evolution_score": ...} record, or {"type": "error", "success": false,
+    "error": ...} if generation fails part way through.
+    """
+    batch_id = new_id()
+    try:
+        for index, item_result in enumerate(iter_batch(quantity, content_types, customization,
+                                                       batch_id=batch_id)):
+            yield json.dumps({'type': 'item', 'index': index, 'result': item_result}) + '\n'
+        
+        # Evolve the AI based on accumulated data
+        with metrics.time('evolve'):
+            evolution_engine.evolve()
+        
+        yield json.dumps({
+            'type': 'done',
+            'success': True,
+            'count': quantity,
+            'batch_id': batch_id,
+            'archive_url': f"/api/batches/{batch_id}/archive",
+            'evolution_score': evolution_engine.get_score()
+        }) + '\n'
+        
+    except Exception as e:
+        import logging
+        logging.error(f"Error streaming content: {str(e)}")
+        
+        yield json.dumps({
+            'type': 'error',
+            'success': False,
+            'error': 'An error occurred while generating content. Please try again.'
+        }) + '\n'
+
+
+@app.route('/api/jobs', methods=['POST'])
+def create_job():
+    """
+    Queue a generation batch and return its job id immediately.
+    
+    Expects the same JSON as /api/generate, plus optional:
+    - max_concurrency: number of workers used by this job
+    
+    Returns 400 for an invalid max_concurrency and 429 when
+    jobs.max_queued_jobs jobs are already waiting to run.
+    """
+    try:
+        data = request.json
+        quantity = data.get('quantity', 1)
+        content_types = data.get('content_types', ['song', 'lyrics', 'artist'])
+        customization = data.get('customization', {})
+        
+        concurrency_cap = CONFIG.get('jobs', {}).get('max_concurrency_per_job', 4)
+        try:
+            concurrency = int(data.get('max_concurrency', concurrency_cap))
+        except (TypeError, ValueError):
+            return jsonify({'success': False,
+                            'error': 'max_concurrency must be an integer'}), 400
+        concurrency = max(1, min(concurrency, concurrency_cap))
+        
+        try:
+            job = job_queue.submit(run_generation_job, quantity,
+                                   content_types, customization, concurrency)
+        except JobQueueFull:
+            return jsonify({'success': False,
+                            'error': 'Too many jobs are queued. Please try again later.'}), 429
+        
+        return jsonify({
+            'success': True,
+            'job_id': job.id,
+            'status': job.status,
+            'status_url': f"/api/jobs/{job.id}"
+        }), 202
+        
+    except Exception as e:
+        import logging
+        logging.error(f"Error creating job: {str(e)}")
+        
+        return jsonify({
+            'success': False,
+            'error': 'An error occurred while queuing the job. Please try again.'
+        }), 500
+
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def get_job(job_id):
+    """Get the progress and partial results of a queued job."""
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({'success': False, 'error': 'Job not found'}), 404
+    
+    status = job.to_dict()
+    if job.status == 'completed':
+        status['evolution_score'] = evolution_engine.get_score()
+        # Jobs use their own id as the batch id
+        status['archive_url'] = f"/api/batches/{job.id}/archive"
+    return jsonify({'success': True, **status})
+
+
+@app.route('/api/preview/song', methods=['GET'])
+def preview_song():
+    """
+    Generate a song and return it directly as audio/midi.
+    
+    Customization options (genre, mood, tempo, key, style, seed) are taken
+    from the query string. Nothing is written to disk and the preview is not
+    recorded with the evolution engine.
+    """
+    customization = {k: v for k, v in request.args.items()
+                     if k in ('genre', 'mood', 'tempo', 'key', 'style')}
+    seed = request.args.get('seed')
+    rng = random.Random(seed) if seed is not None else None
+    
+    midi = music_gen.generate_bytes(customization, rng)
+    
+    genre = secure_filename(customization.get('genre', 'pop')) or 'song'
+    return Response(midi, mimetype='audio/midi', headers={
+        'Content-Disposition': f'inline; filename="preview_{genre}.mid"'
+    })
+
+
+@app.route('/api/lyrics/<item_id>', methods=['GET'])
+def get_lyrics(item_id):
+    """Get the lyrics of a generated item as plain text (?download=1 to save)."""
+    lyrics = lyrics_store.get(item_id)
+    if lyrics is None:
+        return jsonify({'success': False, 'error': 'Lyrics not found'}), 404
+    
+    response = Response(lyrics, mimetype='text/plain')
+    if request.args.get('download'):
+        response.headers['Content-Disposition'] = \
+            f'attachment; filename="lyrics_{secure_filename(item_id)}.txt"'
+    
+    # Lyrics never change once generated
+    response.set_etag(hashlib.sha256(lyrics.encode('utf-8')).hexdigest()[:32])
+    response.cache_control.public = True
+    response.cache_control.max_age = CONFIG.get('http', {}).get('media_max_age', 31536000)
+    response.cache_control.immutable = True
+    return response.make_conditional(request, accept_ranges=True,
+                                     complete_length=response.content_length)
+
+
+@app.route('/api/batches/<batch_id>/archive', methods=['GET'])
+def get_batch_archive(batch_id):
+    """
+    Download every file of a batch as one archive, streamed as it is built.
+    
+    Query parameters:
+    - format: 'zip' (default) or 'tar'
+    """
+    archive_format = request.args.get('format', 'zip')
+    if archive_format not in batch_archive.FORMATS:
+        return jsonify({'success': False, 'error': 'format must be zip or tar'}), 400
+    
+    manifest = batch_archive.load_manifest(OUTPUT_DIR, batch_id)
+    if manifest is None:
+        return jsonify({'success': False, 'error': 'Batch not found'}), 404
+    if retention is not None:
+        retention.touch(batch_archive.manifest_name(batch_id))
+    
+    entries = batch_archive.archive_entries(OUTPUT_DIR, manifest, lyrics_store.get)
+    if archive_format == 'zip':
+        stream, mimetype = batch_archive.stream_zip(entries), 'application/zip'
+    else:
+        stream, mimetype = batch_archive.stream_tar(entries), 'application/x-tar'
+    
+    return Response(stream, mimetype=mimetype, headers={
+        'Content-Disposition': f'attachment; filename="batch_{batch_id}.{archive_format}"'
+    })
+
+
+@app.route('/api/artist-names', methods=['GET'])
+def get_artist_names():
+    """
+    Get distinct artist names.
+    
+    Query parameters:
+    - genre: genre whose naming styles are used (default pop)
+    - count: number of names (default 10)
+    - exclude_issued: 1 to skip names handed out before, across restarts
+    - seed: seed for a reproducible draw
+    """
+    max_count = CONFIG.get('artists', {}).get('max_unique_count', 1000)
+    try:
+        count = int(request.args.get('count', 10))
+    except ValueError:
+        count = 0
+    if not 1 <= count <= max_count:
+        return jsonify({'success': False, 'error': f'count must be between 1 and {max_count}'}), 400
+    
+    genre = request.args.get('genre', 'pop')
+    seed = request.args.get('seed')
+    exclude_issued = request.args.get('exclude_issued', '').lower() in ('1', 'true', 'yes')
+    
+    try:
+        names = artist_gen.generate_unique(
+            {'genre': genre}, count,
+            rng=random.Random(seed) if seed is not None else None,
+            exclude_issued=exclude_issued
+        )
+    except ValueError as e:
+        return jsonify({'success': False, 'error': str(e)}), 409
+    
     return jsonify({
-        'genres': ['pop', 'rock', 'jazz', 'classical', 'electronic', 'hip-hop', 'country', 'blues'],
-        'moods': ['happy', 'sad', 'energetic', 'calm', 'romantic', 'dark', 'uplifting'],
-        'tempos': ['slow', 'medium', 'fast', 'variable'],
-        'keys': ['C', 'C#', 'D', 'D#', 'E', 'F', 'F#', 'G', 'G#', 'A', 'A#', 'B'],
-        'styles': ['acoustic', 'electric', 'orchestral', 'synthetic', 'mixed']
+        'success': True,
+        'genre': genre,
+        'names': names,
+        'name_space_size': len(artist_gen.name_space(genre))
     })
 
 
+@app.route('/api/customization-options', methods=['GET'])
+def get_customization_options():
+    """
+    Get available customization options.
+    
+    The body is serialized once at startup; clients revalidate with
+    If-None-Match or If-Modified-Since and get 304 while it is unchanged.
+    """
+    response = Response(CATALOG_BODY, mimetype='application/json')
+    response.set_etag(CATALOG_ETAG)
+    response.last_modified = CATALOG_LAST_MODIFIED
+    response.cache_control.public = True
+    response.cache_control.max_age = CONFIG.get('http', {}).get('catalog_max_age', 3600)
+    return response.make_conditional(request)
+
+
 @app.route('/api/evolution-stats', methods=['GET'])
 def get_evolution_stats():
     """Get current evolution statistics."""
     return jsonify(evolution_engine.get_stats())
 
 
+@app.route('/api/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Get hit/miss counters for the generation caches."""
+    return jsonify({
+        'image_backgrounds': image_gen.get_cache_stats(),
+        'results': result_cache.stats(),
+        'audio': audio_renderer.stats(),
+        'coalescing': single_flight.stats() if single_flight is not None else None
+    })
+
+
+@app.route('/api/storage', methods=['GET'])
+def get_storage():
+    """Get disk usage of generated files, the lyrics database and retention counters."""
+    lyrics_db = lyrics_store.disk_usage()
+    if retention is None:
+        return jsonify({'enabled': False, 'lyrics_db': lyrics_db})
+    return jsonify({'enabled': True, **retention.stats(), 'lyrics_db': lyrics_db})
+
+
+@app.route('/api/metrics', methods=['GET'])
+def get_metrics():
+    """
+    Get per-stage latency histograms and per-type item/error counts.
+    
+    Returned in the Prometheus text format; add ?format=json for a summary
+    with p50/p95/p99 latencies per stage.
+    """
+    if request.args.get('format') == 'json':
+        return jsonify(metrics.snapshot())
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+
 @app.route('/output/<path:filename>')
 def serve_output(filename):
-    """Serve generated output files."""
-    # Sanitize filename to prevent path traversal attacks
-    import os
-    from werkzeug.utils import secure_filename
-    
-    # Remove any path components and ensure safe filename
-    safe_filename = secure_filename(filename)
+    """Serve generated media files (songs, images, videos, audio)."""
+    # Sanitize each path component, keeping the shard subdirectories
+    parts = filename.split('/')
+    safe_parts = [secure_filename(part) for part in parts]
+    if not all(safe_parts):
+        return jsonify({'error': 'Invalid file path'}), 400
+    safe_filename = '/'.join(safe_parts)
     
     # Ensure the file is within OUTPUT_DIR
-    requested_path = (OUTPUT_DIR / safe_filename).resolve()
-    output_base = OUTPUT_DIR.resolve()
-    
-    # Check if the resolved path is within OUTPUT_DIR
     try:
-        requested_path.relative_to(output_base)
+        output_store.resolve(safe_filename)
     except ValueError:
         # Path is outside OUTPUT_DIR, reject
         return jsonify({'error': 'Invalid file path'}), 400
     
-    return send_from_directory(OUTPUT_DIR, safe_filename)
+    # Only generated media is public; caches, batch manifests and other
+    # internal state under OUTPUT_DIR are not
+    if safe_parts[0] not in MEDIA_DIRS:
+        return jsonify({'error': 'File not found'}), 404
+    
+    # Validators (ETag, Last-Modified) and Range requests are handled by
+    # send_from_directory; generated media never changes once written, so
+    # it may also be cached for a long time
+    if retention is not None:
+        retention.touch(safe_filename)
+    
+    response = send_from_directory(
+        OUTPUT_DIR, safe_filename,
+        max_age=CONFIG.get('http', {}).get('media_max_age', 31536000)
+    )
+    response.cache_control.public = True
+    response.cache_control.immutable = True
+    return response
+
+
+# What a part task sends back to the process that runs the batch
+PartResult = namedtuple('PartResult', ['content_type', 'part', 'timings', 'shared', 'error'])
+
+
+def generate_part(content_type, customization, item_id, index=0):
+    """
+    Run the generator for one content type of one batch item.
+    
+    When customization contains a 'seed', the generator draws from its own
+    random.Random seeded by (seed, index, content type), so the result is
+    reproducible and is served from the result cache on repeat requests.
+    
+    This runs on the worker pool, which may be a process pool, so it does
+    not touch the metrics or the lyrics store itself: it returns what it
+    timed and produced, and record_part records that in the process that
+    runs the batch.
+    
+    Args:
+        content_type: one of CONTENT_TYPES
+        customization: dict of customization options
+        item_id: id of the item being generated
+        index: position of the item in its batch
+        
+    Returns:
+        PartResult: the result fields to merge into the item (or the
+            error raised), with the stage timings observed
+    """
+    timer = StageTimer()
+    try:
+        part, shared = _cached_part(content_type, customization, item_id, index, timer)
+    except Exception as e:
+        return PartResult(content_type, None, timer.observations, False, e)
+    return PartResult(content_type, part, timer.observations, shared, None)
+
+
+def record_part(result, customization):
+    """
+    Record a finished part in this process and return its result fields.
+    
+    Observes the part's stage timings, counts it, stores its lyrics and
+    marks its audio as used.
+    
+    Raises:
+        the exception the part's generator raised, if any
+    """
+    metrics.observe_all(result.timings)
+    if result.error is not None:
+        metrics.count_error(result.content_type)
+        raise result.error
+    
+    part = result.part
+    if result.shared:
+        metrics.count_coalesced(result.content_type)
+    if 'audio_error' in part:
+        metrics.count_error(result.content_type)
+    else:
+        metrics.count_item(result.content_type)
+    
+    if 'lyrics_url' in part:
+        # Cached parts carry the id of the item they were first made for;
+        # storing them again keeps that URL working
+        save_lyrics(part['lyrics'], lyrics_id(part), customization)
+    if part.get('audio') and retention is not None:
+        retention.touch(part['audio'])
+    return part
+
+
+def lyrics_id(part):
+    """Get the id the lyrics of a part are stored under."""
+    return part['lyrics_url'].rsplit('/', 1)[-1]
+
+
+def _cached_part(content_type, customization, item_id, index, timer):
+    """
+    Serve a seeded part from the result cache, generating it on a miss.
+    
+    Identical seeded parts requested at the same time are generated once
+    and shared (see single_flight.py), since they would come out the same.
+    
+    Returns:
+        tuple: (result fields, whether they came from another caller's
+            in-flight generation)
+    """
+    seed = customization.get('seed')
+    if seed is None:
+        return _run_generator(content_type, customization, item_id, None, timer), False
+    
+    key = result_cache.make_key(seed, customization, content_type, index)
+    cached = result_cache.get(key)
+    if cached is not None:
+        return cached, False
+    
+    def generate():
+        rng = random.Random(f"{seed}:{index}:{content_type}")
+        part = _run_generator(content_type, customization, item_id, rng, timer)
+        if 'audio_error' not in part:
+            # Inline previews are kept in memory only, never written to disk
+            result_cache.put(key, part, persist='song_midi' not in part)
+        return part
+    
+    if single_flight is None:
+        return generate(), False
+    return single_flight.do(key, generate)
 
 
-def save_lyrics(lyrics, item_id):
-    """Save lyrics to a text file."""
-    # Sanitize item_id to prevent path injection
-    from werkzeug.utils import secure_filename
-    import re
+def _run_generator(content_type, customization, item_id, rng, timer):
+    """Call the generator for a content type and wrap its output."""
+    if content_type == 'artist':
+        with timer.time('artist'):
+            return {'artist': artist_gen.generate(customization, rng)}
+    
+    if content_type == 'lyrics':
+        with timer.time('lyrics'):
+            lyrics = lyrics_gen.generate(customization, rng)
+        # Stored by record_part, in the process running the batch
+        return {'lyrics': lyrics, 'lyrics_url': f"/api/lyrics/{item_id}"}
+    
+    if content_type == 'song':
+        with timer.time('song'):
+            if customization.get('inline_midi'):
+                # Ephemeral preview: return the bytes instead of writing a file
+                midi = music_gen.generate_bytes(customization, rng)
+                return {'song_midi': base64.b64encode(midi).decode('ascii')}
+            return {'song': music_gen.generate(customization, rng)}
     
-    # Only allow alphanumeric, dash, and underscore
-    safe_item_id = re.sub(r'[^a-zA-Z0-9_-]', '', str(item_id))
+    if content_type == 'audio':
+        return generate_audio(customization, rng, timer)
     
-    filename = secure_filename(f"lyrics_{safe_item_id}.txt")
-    filepath = OUTPUT_DIR / filename
+    if content_type == 'picture':
+        with timer.time('picture'):
+            return {'picture': image_gen.generate(customization, rng)}
     
-    # Ensure we're writing within OUTPUT_DIR
-    filepath = filepath.resolve()
-    output_base = OUTPUT_DIR.resolve()
+    if content_type == 'video':
+        # Generate video (placeholder for now)
+        return {'video': generate_video_placeholder(customization)}
+    
+    return {}
+
+
+def iter_batch(quantity, content_types, customization, executor=None, batch_id=None):
+    """
+    Generate a batch of items on the worker pool.
     
+    Every content type of every item runs as its own task; items are
+    yielded in their original order as soon as all of their parts finish,
+    and each item is recorded with the evolution engine as it is yielded.
+    
+    Args:
+        quantity: number of items to generate
+        content_types: list of content types to generate for each item
+        customization: dict of customization options
+        executor: BatchExecutor to use (defaults to the shared pool)
+        batch_id: id of the batch, for its archive (defaults to a new id)
+        
+    Yields:
+        dict: one generated item
+    """
+    executor = executor or batch_executor
+    batch_id = batch_id or new_id()
+    item_ids = [f"{batch_id}_{i}" for i in range(quantity)]
+    selected_types = [ct for ct in CONTENT_TYPES if ct in content_types]
+    if 'audio' in selected_types and 'song' in selected_types:
+        # The audio part generates the song it renders
+        selected_types.remove('song')
+    
+    # Artist names are drawn for the whole batch up front so they are distinct
+    artist_names = None
+    if 'artist' in selected_types:
+        selected_types.remove('artist')
+        try:
+            with metrics.time('artist'):
+                artist_names = batch_artist_names(quantity, customization)
+        except Exception:
+            metrics.count_error('artist')
+            raise
+        metrics.count_item('artist', quantity)
+    
+    groups = [
+        [(content_type, customization, item_id, index) for content_type in selected_types]
+        for index, item_id in enumerate(item_ids)
+    ]
+    
+    produced = []
     try:
-        filepath.relative_to(output_base)
-    except ValueError:
-        raise ValueError("Invalid file path")
+        results = zip(item_ids, executor.imap_grouped(generate_part, groups))
+        for index, (item_id, parts) in enumerate(results):
+            item_result = {
+                'id': item_id,
+                'timestamp': datetime.now().isoformat(),
+                'customization': customization
+            }
+            if artist_names is not None:
+                item_result['artist'] = artist_names[index]
+            for result in parts:
+                item_result.update(record_part(result, customization))
+            
+            # Update evolution engine with generation data
+            evolution_engine.record_generation(item_result)
+            
+            produced.append(item_result)
+            yield item_result
+    finally:
+        # Record what the batch produced, for /api/batches/<id>/archive;
+        # inline previews are not archived
+        if produced and not customization.get('inline_midi'):
+            manifest = batch_archive.write_manifest(OUTPUT_DIR, batch_id, produced,
+                                                    customization)
+            if retention is not None:
+                retention.touch(manifest)
+        
+        # Write the batch's buffered lyrics in one transaction
+        lyrics_store.flush()
+
+
+def batch_artist_names(quantity, customization):
+    """
+    Draw distinct artist names for a batch.
+    
+    Seeded batches always draw the same names; otherwise names handed out
+    before are skipped when artists.exclude_issued is set, as long as
+    enough are left. A batch larger than the genre's name space repeats
+    names once every name has been used.
+    """
+    space_size = len(artist_gen.name_space(customization.get('genre', 'pop')))
+    count = min(quantity, space_size)
+    
+    seed = customization.get('seed')
+    rng = random.Random(f"{seed}:artists") if seed is not None else random
+    names = None
+    if seed is None and CONFIG.get('artists', {}).get('exclude_issued', False):
+        try:
+            names = artist_gen.generate_unique(customization, count, exclude_issued=True)
+        except ValueError as e:
+            import logging
+            logging.warning(f"Reusing issued artist names: {str(e)}")
+    if names is None:
+        names = artist_gen.generate_unique(customization, count, rng=rng)
     
-    with open(filepath, 'w', encoding='utf-8') as f:
-        f.write(lyrics)
-    return filename
+    while len(names) < quantity:
+        names.extend(names[:quantity - len(names)])
+    return names
+
+
+def run_generation_job(job, content_types, customization, concurrency):
+    """Generate a queued batch, publishing each item as it finishes."""
+    executor = BatchExecutor(
+        pool_size=concurrency,
+        pool_type=CONFIG.get('generation', {}).get('worker_pool_type', 'thread')
+    )
+    try:
+        for item_result in iter_batch(job.total, content_types, customization,
+                                      executor=executor, batch_id=job.id):
+            job.add_result(item_result)
+    finally:
+        executor.shutdown()
+    
+    with metrics.time('evolve'):
+        evolution_engine.evolve()
+
+
+def generate_audio(customization, rng, timer):
+    """
+    Generate a song and render it to audio.
+    
+    The audio format comes from customization 'audio_format' ('wav' or
+    'ogg'). If the synthesizer is unavailable or busy the song is still
+    returned, with 'audio' set to None and an 'audio_error' message.
+    """
+    with timer.time('song'):
+        song = music_gen.generate(customization, rng)
+    audio_format = customization.get('audio_format',
+                                     CONFIG.get('audio', {}).get('format', 'wav'))
+    try:
+        with timer.time('audio_render'):
+            audio = audio_renderer.render(song, audio_format)
+        return {'song': song, 'audio': audio}
+    except AudioRenderError as e:
+        import logging
+        logging.error(f"Error rendering audio: {str(e)}")
+        return {'song': song, 'audio': None, 'audio_error': str(e)}
+
+
+def save_lyrics(lyrics, item_id, customization=None):
+    """Buffer lyrics in the lyrics store and return the URL they are served at."""
+    with metrics.time('save_lyrics'):
+        lyrics_store.put(item_id, lyrics, customization)
+    return f"/api/lyrics/{item_id}"
 
 
 def generate_video_placeholder(customization):
@@ -189,10 +940,9 @@ def generate_video_placeholder(customization):
 
 
 if __name__ == '__main__':
-    # Create necessary directories
-    (OUTPUT_DIR / "songs").mkdir(exist_ok=True)
-    (OUTPUT_DIR / "images").mkdir(exist_ok=True)
-    (OUTPUT_DIR / "videos").mkdir(exist_ok=True)
+    # Create necessary directories (output/ itself is not created on import)
+    for directory in MEDIA_DIRS:
+        (OUTPUT_DIR / directory).mkdir(parents=True, exist_ok=True)
     
     # Use debug mode only for development
     # In production, set debug=False and use a proper WSGI server
@@ -0,0 +1,222 @@
+"""
+Arrangement Module
+Builds multi-track songs: melody, chords, bass and drums.
+
+Each track is generated on its own from a shared song context (genre scale,
+key, mood, length) and its own seed, so tracks never depend on each other
+and any subset can be built in any order. They are only merged when the
+MIDI file is written, one MIDI track per part.
+
+Tracks are built serially: building all four takes about 15 ms for a
+1024-bar song, against over 100 ms to merge the notes into the MIDI file,
+so a thread pool only added GIL contention and a process pool would spend
+more pickling the notes back than it saves (see
+benchmarks/bench_arrangement.py).
+"""
+
+import random
+from collections import namedtuple
+
+import numpy as np
+from midiutil import MIDIFile
+
+
+# One generated part: General MIDI program, channel and its notes as
+# (pitch, start beat, duration in beats, velocity) tuples
+Track = namedtuple('Track', ['name', 'program', 'channel', 'notes'])
+
+# Song settings shared by every track builder
+SongContext = namedtuple('SongContext', [
+    'genre', 'mood', 'key', 'scale', 'root', 'bars', 'beats_per_bar', 'melody_mode'
+], defaults=('scale',))
+
+# Chord roots as scale-degree indexes, one chord per bar
+CHORD_PROGRESSIONS = {
+    'pop': [0, 4, 5, 3],
+    'rock': [0, 3, 4, 3],
+    'jazz': [1, 4, 0, 0],
+    'classical': [0, 3, 4, 0],
+    'electronic': [0, 3, 4, 2],
+    'hip-hop': [0, 0, 3, 2],
+    'country': [0, 3, 0, 4],
+    'blues': [0, 0, 0, 0, 2, 2, 0, 0, 3, 2, 0, 3]
+}
+
+# Bass rhythm as (start, duration) in beats within a 4-beat bar
+BASS_RHYTHMS = {
+    'rock': [(0, 1), (1, 1), (2, 1), (3, 1)],
+    'electronic': [(0.5, 0.5), (1.5, 0.5), (2.5, 0.5), (3.5, 0.5)],
+    'hip-hop': [(0, 1.5), (2.5, 1.5)],
+    'jazz': [(0, 1), (1, 1), (2, 1), (3, 1)],
+    'blues': [(0, 1.5), (1.5, 0.5), (2, 1.5), (3.5, 0.5)],
+    'country': [(0, 2), (2, 2)],
+    'default': [(0, 2), (2, 2)]
+}
+
+# Drum patterns as 16 sixteenth-note steps per bar ('x' = hit)
+KICK, SNARE, HIHAT, RIDE = 36, 38, 42, 51
+DRUM_PATTERNS = {
+    'rock': {KICK: 'x.......x.x.....', SNARE: '....x.......x...', HIHAT: 'x.x.x.x.x.x.x.x.'},
+    'pop': {KICK: 'x.......x.......', SNARE: '....x.......x...', HIHAT: 'x.x.x.x.x.x.x.x.'},
+    'electronic': {KICK: 'x...x...x...x...', SNARE: '....x.......x...', HIHAT: '..x...x...x...x.'},
+    'hip-hop': {KICK: 'x......x..x.....', SNARE: '....x.......x...', HIHAT: 'x.x.x.x.x.x.x.x.'},
+    'jazz': {RIDE: 'x...x..xx...x..x', KICK: 'x...............'},
+    'blues': {KICK: 'x.....x.x.......', SNARE: '....x.......x...', HIHAT: 'x..x..x..x..x..x'},
+    'country': {KICK: 'x.......x.......', SNARE: '....x.......x...', HIHAT: 'x.x.x.x.x.x.x.x.'},
+    'classical': {}
+}
+
+# General MIDI programs (0-based) for melody, chords and bass per genre
+PROGRAMS = {
+    'rock': (29, 30, 33),
+    'jazz': (65, 0, 32),
+    'classical': (40, 48, 42),
+    'electronic': (80, 88, 38),
+    'hip-hop': (4, 89, 38),
+    'country': (25, 24, 32),
+    'blues': (26, 16, 33),
+    'pop': (0, 4, 33)
+}
+
+DRUM_CHANNEL = 9
+
+
+class Arranger:
+    """Arrange a song into separate melody, chord, bass and drum tracks."""
+
+    TRACKS = ('melody', 'chords', 'bass', 'drums')
+
+    def __init__(self, music_gen):
+        """
+        Create an arranger.
+
+        Args:
+            music_gen: MusicGenerator providing scales, keys, tempos and melodies
+        """
+        self.music_gen = music_gen
+
+    def arrange(self, customization, rng=None, tracks=None):
+        """
+        Compose a multi-track song.
+
+        Args:
+            customization: dict with genre, mood, tempo, key, style
+            rng: random.Random to draw from (defaults to the global generator)
+            tracks: names of the tracks to include (defaults to all)
+
+        Returns:
+            MIDIFile: one MIDI track per arranged part
+        """
+        if rng is None:
+            rng = random
+
+        genre = customization.get('genre', 'pop')
+        key = customization.get('key', 'C')
+        context = SongContext(
+            genre=genre,
+            mood=customization.get('mood', 'happy'),
+            key=key,
+            scale=self.music_gen.genre_scales.get(genre, self.music_gen.genre_scales['pop']),
+            root=self.music_gen.key_map.get(key, 0),
+            bars=self.music_gen.duration_bars,
+            beats_per_bar=self.music_gen.beats_per_bar,
+            melody_mode=customization.get('melody_mode', self.music_gen.melody_mode)
+        )
+
+        # Every track gets its own seed, drawn in a fixed order, so a track
+        # is the same whichever other tracks are built and in whatever order
+        seeds = {name: rng.getrandbits(64) for name in self.TRACKS}
+        names = [name for name in self.TRACKS if tracks is None or name in tracks]
+        built = [self.build_track(name, context, seeds[name]) for name in names]
+
+        tempo_bpm = self.music_gen.tempo_map.get(customization.get('tempo', 'medium'), 120)
+        return self.merge(built, tempo_bpm)
+
+    def build_track(self, name, context, seed):
+        """Build one track from the song context and its seed."""
+        builder = getattr(self, f'_build_{name}')
+        return builder(context, random.Random(seed))
+
+    def merge(self, tracks, tempo_bpm):
+        """Write tracks into a MIDIFile, one MIDI track each."""
+        # Every part is a non-overlapping line per pitch, so midiutil's
+        # duplicate-removal and de-interleaving passes are skipped
+        midi = MIDIFile(max(len(tracks), 1), removeDuplicates=False, deinterleave=False)
+        midi.addTempo(0, 0, tempo_bpm)
+
+        for index, track in enumerate(tracks):
+            midi.addTrackName(index, 0, track.name)
+            if track.channel != DRUM_CHANNEL:
+                midi.addProgramChange(index, track.channel, 0, track.program)
+            add_note = midi.addNote
+            for pitch, start, duration, velocity in track.notes:
+                add_note(index, track.channel, pitch, start, duration, velocity)
+
+        return midi
+
+    def _chord_roots(self, context):
+        """Get the scale-degree index of each bar's chord."""
+        progression = CHORD_PROGRESSIONS.get(context.genre, CHORD_PROGRESSIONS['pop'])
+        return [progression[bar % len(progression)] for bar in range(context.bars)]
+
+    def _scale_pitch(self, context, degree, octave):
+        """Get the pitch of a scale degree, wrapping into higher octaves."""
+        size = len(context.scale)
+        return context.root + context.scale[degree % size] + (octave + degree // size) * 12
+
+    def _build_melody(self, context, rng):
+        program = PROGRAMS.get(context.genre, PROGRAMS['pop'])[0]
+        length = context.bars * context.beats_per_bar
+        pitches, starts, durations, velocities = self.music_gen.melody_events(
+            context.genre, context.key, context.mood, length, rng, context.melody_mode)
+
+        # Keep the melody within the song so it ends with the other parts
+        notes = [(p, s, min(d, length - s), v)
+                 for p, s, d, v in zip(pitches, starts, durations, velocities) if s < length]
+        return Track('melody', program, 0, notes)
+
+    def _build_chords(self, context, rng):
+        program = PROGRAMS.get(context.genre, PROGRAMS['pop'])[1]
+        beats = context.beats_per_bar
+        low, high = self.music_gen.mood_velocity.get(context.mood, self.music_gen.default_velocity)
+        velocity = (low + high) // 2 - 15
+
+        notes = []
+        for bar, degree in enumerate(self._chord_roots(context)):
+            # Triad stacked in thirds from the scale, held for the bar
+            for offset in (0, 2, 4):
+                notes.append((self._scale_pitch(context, degree + offset, 4),
+                              bar * beats, beats, velocity))
+        return Track('chords', program, 1, notes)
+
+    def _build_bass(self, context, rng):
+        program = PROGRAMS.get(context.genre, PROGRAMS['pop'])[2]
+        beats = context.beats_per_bar
+        rhythm = BASS_RHYTHMS.get(context.genre, BASS_RHYTHMS['default'])
+        scale = beats / 4.0
+
+        notes = []
+        for bar, degree in enumerate(self._chord_roots(context)):
+            root = self._scale_pitch(context, degree, 2)
+            for start, duration in rhythm:
+                # Walking genres step to the fifth now and then
+                pitch = root + 7 if context.genre in ('jazz', 'blues') and rng.random() < 0.25 else root
+                notes.append((pitch, bar * beats + start * scale, duration * scale,
+                              rng.randint(75, 95)))
+        return Track('bass', program, 2, notes)
+
+    def _build_drums(self, context, rng):
+        pattern = DRUM_PATTERNS.get(context.genre, DRUM_PATTERNS['rock'])
+        beats = context.beats_per_bar
+        step = beats / 16.0
+        bar_starts = np.arange(context.bars) * beats
+
+        notes = []
+        for pitch, steps in pattern.items():
+            hits = np.flatnonzero(np.frombuffer(steps.encode('ascii'), dtype=np.uint8) == ord('x'))
+            starts = (bar_starts[:, None] + hits[None, :] * step).ravel().tolist()
+            velocities = np.random.default_rng(rng.getrandbits(64)).integers(
+                80, 120, len(starts)).tolist()
+            notes.extend((pitch, start, step, velocity)
+                         for start, velocity in zip(starts, velocities))
+        return Track('drums', 0, DRUM_CHANNEL, notes)
@@ -3,13 +3,66 @@ Artist Generator Module
 Generates artist names with customizable parameters.
 """
 
+import bisect
 import random
 
 
+class NameSpace:
+    """
+    Every name a set of patterns can produce, enumerated lazily.
+    
+    Each pattern is a format string and the word lists that fill it. Names
+    are numbered pattern by pattern, and a number is decoded into one word
+    per list (mixed radix), so no name is built until it is asked for.
+    """
+    
+    def __init__(self, patterns):
+        """
+        Create a name space.
+        
+        Args:
+            patterns: list of (format string, list of word lists)
+        """
+        self.patterns = patterns
+        self._ends = []
+        total = 0
+        for _, lists in patterns:
+            size = 1
+            for words in lists:
+                size *= len(words)
+            total += size
+            self._ends.append(total)
+    
+    def __len__(self):
+        return self._ends[-1] if self._ends else 0
+    
+    def __getitem__(self, index):
+        if not 0 <= index < len(self):
+            raise IndexError(index)
+        pattern = bisect.bisect_right(self._ends, index)
+        index -= self._ends[pattern - 1] if pattern else 0
+        template, lists = self.patterns[pattern]
+        
+        words = []
+        for word_list in reversed(lists):
+            index, position = divmod(index, len(word_list))
+            words.append(word_list[position])
+        return template.format(*reversed(words))
+
+
 class ArtistGenerator:
     """Generate artist names based on genre and style."""
     
-    def __init__(self):
+    def __init__(self, issued_filter=None):
+        """
+        Create an artist generator.
+        
+        Args:
+            issued_filter: BloomFilter that remembers names handed out by
+                generate_unique, so later calls can exclude them
+        """
+        self.issued_filter = issued_filter
+        
         self.prefixes = [
             'DJ', 'MC', 'Lil', 'Big', 'The', 'Young', 'Old', 'Major', 'Minor',
             'King', 'Queen', 'Prince', 'Lady', 'Sir', 'Captain', 'Professor'
@@ -49,70 +102,162 @@ class ArtistGenerator:
             'country': ['solo', 'band'],
             'blues': ['solo', 'band']
         }
+        
+        # Name patterns for each artist type, as used by generate()
+        solo_patterns = [
+            ("{} {}", [self.prefixes, self.first_names]),
+            ("{} {}", [self.first_names, self.last_names]),
+            ("{}", [self.first_names])
+        ]
+        self.type_patterns = {
+            'solo': solo_patterns,
+            'duo': solo_patterns,
+            'trio': [("The {} Trio", [self.first_names])],
+            'crew': [("{} {} Crew", [self.band_words, self.band_nouns])],
+            'ensemble': [("{} Ensemble", [self.band_words])],
+            'band': [
+                ("{} {}", [self.band_words, self.band_nouns]),
+                ("The {}", [self.band_nouns]),
+                ("{}{}", [self.first_names, self.last_names])
+            ]
+        }
+        self._name_spaces = {}
+    
+    def name_space(self, genre):
+        """Get the lazily enumerated space of every name for a genre."""
+        space = self._name_spaces.get(genre)
+        if space is None:
+            patterns = []
+            for artist_type in self.genre_styles.get(genre, ['solo', 'band']):
+                for pattern in self.type_patterns[artist_type]:
+                    if pattern not in patterns:
+                        patterns.append(pattern)
+            space = NameSpace(patterns)
+            self._name_spaces[genre] = space
+        return space
+    
+    def generate_unique(self, customization, count, rng=None, exclude_issued=False):
+        """
+        Generate distinct artist names.
+        
+        Names are drawn without replacement from the genre's name space with
+        a lazy Fisher-Yates shuffle, so each draw is O(1) and nothing is
+        materialized up front. Every returned name is recorded in the
+        issued-name filter, if there is one.
+        
+        Args:
+            customization: dict with genre
+            count: number of names
+            rng: random.Random to draw from (defaults to the global generator)
+            exclude_issued: skip names the issued-name filter has seen
+                (it may also skip a few never-issued names by mistake)
+            
+        Returns:
+            list: count distinct names
+            
+        Raises:
+            ValueError: if the name space has fewer than count usable names
+        """
+        if rng is None:
+            rng = random
+        
+        genre = customization.get('genre', 'pop')
+        space = self.name_space(genre)
+        total = len(space)
+        exclude = self.issued_filter if exclude_issued else None
+        
+        names = []
+        seen = set()
+        swaps = {}
+        for i in range(total):
+            if len(names) == count:
+                break
+            # Lazily swap a random remaining index into position i
+            j = rng.randrange(i, total)
+            index = swaps.get(j, j)
+            swaps[j] = swaps.get(i, i)
+            
+            name = space[index]
+            if name in seen or (exclude is not None and name in exclude):
+                continue
+            seen.add(name)
+            names.append(name)
+        
+        if len(names) < count:
+            raise ValueError(f"Only {len(names)} unique artist names are available for {genre}")
+        
+        if self.issued_filter is not None:
+            for name in names:
+                self.issued_filter.add(name)
+        return names
     
-    def generate(self, customization):
+    def generate(self, customization, rng=None):
         """
         Generate an artist name.
         
         Args:
             customization: dict with genre, style
+            rng: random.Random to draw from (defaults to the global generator)
             
         Returns:
             str: generated artist name
         """
+        if rng is None:
+            rng = random
+        
         genre = customization.get('genre', 'pop')
         
         # Determine artist type based on genre
         artist_types = self.genre_styles.get(genre, ['solo', 'band'])
-        artist_type = random.choice(artist_types)
+        artist_type = rng.choice(artist_types)
         
         if artist_type in ['solo', 'duo']:
             # Generate solo artist or duo name
-            name_style = random.choice(['prefix_name', 'name_lastname', 'single_name'])
+            name_style = rng.choice(['prefix_name', 'name_lastname', 'single_name'])
             
             if name_style == 'prefix_name':
-                prefix = random.choice(self.prefixes)
-                name = random.choice(self.first_names)
+                prefix = rng.choice(self.prefixes)
+                name = rng.choice(self.first_names)
                 return f"{prefix} {name}"
             
             elif name_style == 'name_lastname':
-                first = random.choice(self.first_names)
-                last = random.choice(self.last_names)
+                first = rng.choice(self.first_names)
+                last = rng.choice(self.last_names)
                 return f"{first} {last}"
             
             else:  # single_name
-                return random.choice(self.first_names)
+                return rng.choice(self.first_names)
         
         elif artist_type == 'trio':
             # Generate trio name
-            first = random.choice(self.first_names)
+            first = rng.choice(self.first_names)
             return f"The {first} Trio"
         
         elif artist_type == 'crew':
             # Generate hip-hop crew name
-            word = random.choice(self.band_words)
-            noun = random.choice(self.band_nouns)
+            word = rng.choice(self.band_words)
+            noun = rng.choice(self.band_nouns)
             return f"{word} {noun} Crew"
         
         elif artist_type == 'ensemble':
             # Generate ensemble name
-            word = random.choice(self.band_words)
+            word = rng.choice(self.band_words)
             return f"{word} Ensemble"
         
         else:  # band
             # Generate band name
-            style = random.choice(['adjective_noun', 'the_noun', 'compound'])
+            style = rng.choice(['adjective_noun', 'the_noun', 'compound'])
             
             if style == 'adjective_noun':
-                adj = random.choice(self.band_words)
-                noun = random.choice(self.band_nouns)
+                adj = rng.choice(self.band_words)
+                noun = rng.choice(self.band_nouns)
                 return f"{adj} {noun}"
             
             elif style == 'the_noun':
-                noun = random.choice(self.band_nouns)
+                noun = rng.choice(self.band_nouns)
                 return f"The {noun}"
             
             else:  # compound
-                word1 = random.choice(self.first_names)
-                word2 = random.choice(self.last_names)
+                word1 = rng.choice(self.first_names)
+                word2 = rng.choice(self.last_names)
                 return f"{word1}{word2}"
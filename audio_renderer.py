@@ -0,0 +1,210 @@
+"""
+Audio Renderer Module
+Renders generated MIDI files to WAV or OGG with a local FluidSynth.
+
+Renders run on a dedicated pool of worker threads, each driving one
+fluidsynth subprocess, with a bounded number of renders waiting at once so a
+burst of requests cannot queue unbounded synthesizer work. Rendered audio is
+stored under output/audio/ by a hash of the MIDI bytes, soundfont and sample
+rate, so a MIDI file that was already rendered with the same settings is
+never synthesized again.
+"""
+
+import hashlib
+import logging
+import os
+import shutil
+import subprocess
+import tempfile
+import threading
+import time
+import wave
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+
+# Output format -> fluidsynth file type
+AUDIO_FORMATS = {'wav': 'wav', 'ogg': 'oga'}
+
+
+class AudioRenderError(RuntimeError):
+    """Raised when audio cannot be rendered."""
+
+
+class AudioRenderer:
+    """Render MIDI files to audio on a bounded worker pool."""
+
+    def __init__(self, output_dir, soundfont, fluidsynth_bin="fluidsynth",
+                 sample_rate=44100, pool_size=2, max_pending=8,
+                 queue_timeout=30.0, render_timeout=120.0):
+        """
+        Create an audio renderer.
+
+        Args:
+            output_dir: directory generated files are served from
+            soundfont: path of the .sf2/.sf3 soundfont used for synthesis
+            fluidsynth_bin: fluidsynth executable name or path
+            sample_rate: output sample rate in Hz
+            pool_size: number of renders run at once
+            max_pending: renders allowed to run or wait at once
+            queue_timeout: seconds to wait for a free queue slot
+            render_timeout: seconds before a single render is abandoned
+        """
+        self.output_dir = Path(output_dir)
+        self.soundfont = Path(soundfont)
+        self.fluidsynth_bin = fluidsynth_bin
+        self.sample_rate = sample_rate
+        self.pool_size = pool_size
+        self.queue_timeout = queue_timeout
+        self.render_timeout = render_timeout
+
+        # Synthesis settings that change the audio, hashed with the MIDI bytes
+        self._settings_key = f"{self.soundfont.resolve()}\0{sample_rate}".encode('utf-8')
+
+        self._slots = threading.BoundedSemaphore(max(max_pending, pool_size))
+        self._pool = None
+        self._lock = threading.Lock()
+        # Renders in progress by output path, so duplicates wait for the first
+        self._in_flight = {}
+
+        # Counters
+        self.renders = 0
+        self.cache_hits = 0
+        self.render_seconds = 0.0
+        self.audio_seconds = 0.0
+
+    def available(self):
+        """Check that the synthesizer and soundfont are installed."""
+        return shutil.which(self.fluidsynth_bin) is not None and self.soundfont.is_file()
+
+    def render(self, midi_path, audio_format='wav'):
+        """
+        Render a MIDI file, reusing earlier audio for identical MIDI bytes
+        rendered with the same soundfont and sample rate.
+
+        Args:
+            midi_path: MIDI path relative to the output directory
+            audio_format: 'wav' or 'ogg'
+
+        Returns:
+            str: audio path relative to the output directory
+
+        Raises:
+            AudioRenderError: if the format is unknown, the synthesizer is
+                missing, the queue stays full or the render fails
+        """
+        if audio_format not in AUDIO_FORMATS:
+            raise AudioRenderError(f"Unsupported audio format: {audio_format}")
+
+        midi_file = self.output_dir / midi_path
+        hasher = hashlib.sha256(midi_file.read_bytes())
+        hasher.update(self._settings_key)
+        digest = hasher.hexdigest()
+        relative_path = f"audio/{digest[:2]}/{digest}.{audio_format}"
+        audio_file = self.output_dir / relative_path
+
+        if audio_file.is_file():
+            with self._lock:
+                self.cache_hits += 1
+            return relative_path
+
+        if not self.available():
+            raise AudioRenderError("Audio rendering is not available")
+
+        with self._lock:
+            future = self._in_flight.get(relative_path)
+
+        owner = False
+        if future is None:
+            if not self._slots.acquire(timeout=self.queue_timeout):
+                raise AudioRenderError("Audio render queue is full")
+            with self._lock:
+                future = self._in_flight.get(relative_path)
+                if future is None:
+                    owner = True
+                    future = self._get_pool().submit(
+                        self._render_file, midi_file, audio_file, audio_format)
+                    future.add_done_callback(lambda f: self._slots.release())
+                    self._in_flight[relative_path] = future
+            if not owner:
+                self._slots.release()
+
+        try:
+            future.result()
+        finally:
+            if owner:
+                with self._lock:
+                    self._in_flight.pop(relative_path, None)
+        return relative_path
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = ThreadPoolExecutor(max_workers=self.pool_size,
+                                            thread_name_prefix='audio-render')
+        return self._pool
+
+    def _render_file(self, midi_file, audio_file, audio_format):
+        """Synthesize one file into a temporary path and rename it into place."""
+        audio_file.parent.mkdir(parents=True, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=audio_file.parent, prefix='.',
+                                        suffix=f'.{audio_format}')
+        os.close(fd)
+
+        start = time.perf_counter()
+        try:
+            completed = subprocess.run(
+                [self.fluidsynth_bin, '-ni', '-q',
+                 '-F', tmp_path,
+                 '-T', AUDIO_FORMATS[audio_format],
+                 '-r', str(self.sample_rate),
+                 str(self.soundfont), str(midi_file)],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                timeout=self.render_timeout
+            )
+            if completed.returncode != 0 or os.path.getsize(tmp_path) == 0:
+                logging.error(f"fluidsynth failed: {completed.stderr.decode(errors='replace')}")
+                raise AudioRenderError("Audio render failed")
+            os.chmod(tmp_path, 0o644)
+            os.replace(tmp_path, audio_file)
+        except subprocess.TimeoutExpired:
+            raise AudioRenderError("Audio render timed out")
+        finally:
+            if os.path.exists(tmp_path):
+                os.unlink(tmp_path)
+
+        elapsed = time.perf_counter() - start
+        duration = audio_duration(audio_file)
+        with self._lock:
+            self.renders += 1
+            self.render_seconds += elapsed
+            self.audio_seconds += duration or 0.0
+
+    def stats(self):
+        """Get render counters, including render time per second of audio."""
+        with self._lock:
+            return {
+                'available': self.available(),
+                'renders': self.renders,
+                'cache_hits': self.cache_hits,
+                'in_flight': len(self._in_flight),
+                'render_seconds': self.render_seconds,
+                'audio_seconds': self.audio_seconds,
+                'render_seconds_per_audio_second': (
+                    self.render_seconds / self.audio_seconds if self.audio_seconds else None)
+            }
+
+    def shutdown(self):
+        """Stop the render pool."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+
+
+def audio_duration(path):
+    """Get the length of a WAV file in seconds, or None for other formats."""
+    try:
+        with wave.open(str(path), 'rb') as f:
+            return f.getnframes() / float(f.getframerate())
+    except (wave.Error, EOFError, OSError):
+        return None
@@ -0,0 +1,240 @@
+"""
+Batch Archive Module
+Records what each generation batch produced and streams it as one archive.
+
+When a batch finishes, a small manifest listing its items and their files is
+written to output/batches/<shard>/<batch_id>.json, sharded like the other
+output files and deleted by retention like them. An archive is then assembled on
+the fly from the manifest: files are read and sent in fixed-size chunks as
+the client downloads, so memory use does not depend on the batch size and
+nothing is built in memory or on disk first.
+
+ZIP archives are written by zipfile into a write-only sink, which makes
+zipfile emit data descriptors instead of seeking back; TAR archives are
+written directly from TarInfo headers.
+"""
+
+import json
+import re
+import tarfile
+import time
+import zipfile
+from datetime import datetime
+from pathlib import Path
+
+from output_store import atomic_write
+
+
+CHUNK_SIZE = 64 * 1024
+
+FORMATS = ('zip', 'tar')
+
+# Item fields that name files under the output directory
+FILE_FIELDS = ('song', 'audio', 'picture')
+
+BATCH_ID_PATTERN = re.compile(r'^[0-9a-f]{32}$')
+
+
+def manifest_name(batch_id):
+    """Get the manifest file of a batch, relative to the output directory."""
+    return f"batches/{batch_id[:2]}/{batch_id}.json"
+
+
+def manifest_path(output_dir, batch_id):
+    """Get the manifest file of a batch."""
+    return Path(output_dir) / manifest_name(batch_id)
+
+
+def write_manifest(output_dir, batch_id, items, customization):
+    """
+    Record the items of a finished batch.
+
+    Args:
+        output_dir: directory generated files are served from
+        batch_id: id of the batch
+        items: generated item results, in batch order
+        customization: dict of customization options used
+
+    Returns:
+        str: path of the manifest relative to output_dir
+    """
+    manifest = {
+        'batch_id': batch_id,
+        'created_at': datetime.now().isoformat(),
+        'customization': customization,
+        'items': [
+            {
+                'id': item['id'],
+                'artist': item.get('artist'),
+                # Cached or shared parts keep the lyrics of the item they
+                # were first made for, stored under that item's id
+                'lyrics_id': (item['lyrics_url'].rsplit('/', 1)[-1]
+                              if item.get('lyrics_url') else None),
+                'files': {field: item[field] for field in FILE_FIELDS if item.get(field)}
+            }
+            for item in items
+        ]
+    }
+    path = manifest_path(output_dir, batch_id)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with atomic_write(path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f)
+    return manifest_name(batch_id)
+
+
+def load_manifest(output_dir, batch_id):
+    """
+    Load the manifest of a batch.
+
+    Returns:
+        dict or None: the manifest, or None if the id is invalid or unknown
+    """
+    if not BATCH_ID_PATTERN.match(batch_id):
+        return None
+    try:
+        with open(manifest_path(output_dir, batch_id), 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def archive_entries(output_dir, manifest, get_lyrics):
+    """
+    List the members of a batch archive.
+
+    Files deleted since the batch was generated (e.g. by retention), and
+    lyrics no longer stored, are left out and listed as missing in the
+    archive's manifest.json.
+
+    Args:
+        output_dir: directory generated files are served from
+        manifest: manifest from load_manifest
+        get_lyrics: callable(lyrics id) returning lyrics text or None
+
+    Returns:
+        list: (archive name, Path or bytes) pairs
+    """
+    output_dir = Path(output_dir)
+    entries = []
+    summary = {'batch_id': manifest['batch_id'],
+               'customization': manifest['customization'], 'items': []}
+
+    for index, item in enumerate(manifest['items'], start=1):
+        folder = f"item_{index:02d}"
+        item_summary = {'id': item['id'], 'artist': item['artist'], 'files': [], 'missing': []}
+        for field, relative_path in item['files'].items():
+            path = output_dir / relative_path
+            if path.is_file():
+                name = f"{folder}/{field}{path.suffix}"
+                entries.append((name, path))
+                item_summary['files'].append(name)
+            else:
+                item_summary['missing'].append(relative_path)
+        if item.get('lyrics_id'):
+            lyrics = get_lyrics(item['lyrics_id'])
+            if lyrics is not None:
+                name = f"{folder}/lyrics.txt"
+                entries.append((name, lyrics.encode('utf-8')))
+                item_summary['files'].append(name)
+            else:
+                item_summary['missing'].append(f"/api/lyrics/{item['lyrics_id']}")
+        summary['items'].append(item_summary)
+
+    entries.insert(0, ('manifest.json', json.dumps(summary, indent=2).encode('utf-8')))
+    return entries
+
+
+def _read_chunks(source):
+    """Yield the contents of a Path or bytes in CHUNK_SIZE pieces."""
+    if isinstance(source, bytes):
+        for start in range(0, len(source), CHUNK_SIZE):
+            yield source[start:start + CHUNK_SIZE]
+        return
+    with open(source, 'rb') as f:
+        while True:
+            chunk = f.read(CHUNK_SIZE)
+            if not chunk:
+                return
+            yield chunk
+
+
+def _source_info(source):
+    """Get (size, mtime) of a Path or bytes."""
+    if isinstance(source, bytes):
+        return len(source), time.time()
+    stat = source.stat()
+    return stat.st_size, stat.st_mtime
+
+
+class _Sink:
+    """Write-only, non-seekable file object drained by the archive stream."""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def stream_zip(entries):
+    """
+    Stream a ZIP archive of the entries (stored, not compressed).
+
+    Yields:
+        bytes: consecutive pieces of the archive
+    """
+    sink = _Sink()
+    with zipfile.ZipFile(sink, 'w', zipfile.ZIP_STORED) as archive:
+        for name, source in entries:
+            size, mtime = _source_info(source)
+            info = zipfile.ZipInfo(name, date_time=time.localtime(mtime)[:6])
+            info.file_size = size
+            info.external_attr = 0o644 << 16
+            with archive.open(info, 'w') as member:
+                for chunk in _read_chunks(source):
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            # Data descriptor
+            yield sink.drain()
+    # Central directory
+    yield sink.drain()
+
+
+def stream_tar(entries):
+    """
+    Stream a ustar/pax TAR archive of the entries.
+
+    Yields:
+        bytes: consecutive pieces of the archive
+    """
+    written = 0
+    for name, source in entries:
+        size, mtime = _source_info(source)
+        info = tarfile.TarInfo(name)
+        info.size = size
+        info.mtime = int(mtime)
+        info.mode = 0o644
+        header = info.tobuf(tarfile.PAX_FORMAT)
+        yield header
+        written += len(header)
+        for chunk in _read_chunks(source):
+            yield chunk
+        padding = -size % tarfile.BLOCKSIZE
+        yield tarfile.NUL * padding
+        written += size + padding
+
+    # End-of-archive marker, padded to a whole record
+    end = 2 * tarfile.BLOCKSIZE
+    end += -(written + end) % tarfile.RECORDSIZE
+    yield tarfile.NUL * end
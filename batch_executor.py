@@ -0,0 +1,84 @@
+"""
+Batch Executor Module
+Fans the items and content types of a generation batch out to a worker pool.
+"""
+
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+
+class BatchExecutor:
+    """Run generation tasks on a shared thread or process pool."""
+
+    POOL_TYPES = ('thread', 'process')
+
+    def __init__(self, pool_size=None, pool_type='thread'):
+        """
+        Create a batch executor.
+
+        Args:
+            pool_size: number of workers (None or 0 uses the CPU count,
+                1 runs every task inline on the calling thread)
+            pool_type: 'thread' or 'process'
+        """
+        if pool_type not in self.POOL_TYPES:
+            raise ValueError(f"Unknown pool type: {pool_type}")
+
+        self.pool_size = pool_size or os.cpu_count() or 1
+        self.pool_type = pool_type
+        self._pool = None
+        self._lock = threading.Lock()
+
+    def _get_pool(self):
+        """Create the worker pool on first use."""
+        with self._lock:
+            if self._pool is None:
+                if self.pool_type == 'process':
+                    self._pool = ProcessPoolExecutor(max_workers=self.pool_size)
+                else:
+                    self._pool = ThreadPoolExecutor(max_workers=self.pool_size,
+                                                    thread_name_prefix='batch')
+            return self._pool
+
+    def imap_grouped(self, fn, groups):
+        """
+        Run fn over groups of argument tuples, yielding each group's results.
+
+        Every task is submitted up front so the pool stays busy, but groups are
+        yielded in their original order as soon as all of their tasks finish.
+
+        Args:
+            fn: picklable callable run once per argument tuple
+            groups: list of lists of argument tuples
+
+        Yields:
+            list: results of one group, in the order of its argument tuples
+        """
+        if self.pool_size <= 1:
+            for group in groups:
+                yield [fn(*args) for args in group]
+            return
+
+        pool = self._get_pool()
+        futures = [[pool.submit(fn, *args) for args in group] for group in groups]
+
+        try:
+            for group in futures:
+                yield [future.result() for future in group]
+        finally:
+            # Drop queued work if the consumer stops early or a task failed
+            for group in futures:
+                for future in group:
+                    future.cancel()
+
+    def map_grouped(self, fn, groups):
+        """Run fn over groups of argument tuples and return all results in order."""
+        return list(self.imap_grouped(fn, groups))
+
+    def shutdown(self, wait=True):
+        """Shut down the worker pool."""
+        with self._lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
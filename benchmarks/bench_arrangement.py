@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""
+Benchmark full arrangements as the track count grows.
+
+For each song length, builds songs with 1 to 4 tracks (melody, chords,
+bass, drums) and reports ms/song split into arranging (building the tracks
+and merging their notes into a MIDIFile) and writing the file. The default
+lengths include 1024-bar songs, the case parallel track building was meant
+for; even there, building the tracks is a small part of the total.
+Rows slower than --budget-ms per 32 bars are marked and make the script
+exit with status 1, so it can guard a per-song time budget.
+
+Usage: python benchmarks/bench_arrangement.py [--bars N ...] [--budget-ms MS]
+"""
+
+import argparse
+import io
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from arrangement import Arranger  # noqa: E402
+from music_generator import MusicGenerator  # noqa: E402
+
+
+CUSTOMIZATION = {
+    'genre': 'rock',
+    'mood': 'energetic',
+    'tempo': 'fast',
+    'key': 'E'
+}
+
+
+def run(bars, tracks, songs):
+    """Return (build ms, write ms) per song for one configuration."""
+    music_gen = MusicGenerator(duration_bars=bars, arrangement='full')
+    arranger = music_gen.arranger
+    rng = random.Random(0)
+
+    build = write = 0.0
+    for _ in range(songs):
+        start = time.perf_counter()
+        midi = arranger.arrange(CUSTOMIZATION, rng, tracks)
+        built = time.perf_counter()
+        midi.writeFile(io.BytesIO())
+        write += time.perf_counter() - built
+        build += built - start
+    return build * 1000 / songs, write * 1000 / songs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--bars', type=int, nargs='+', default=[32, 128, 1024])
+    parser.add_argument('--songs', type=int, default=20, help='songs per configuration')
+    parser.add_argument('--budget-ms', type=float, default=50.0,
+                        help='maximum total ms per song, per 32 bars of length')
+    args = parser.parse_args()
+
+    over_budget = False
+    print(f"{'bars':>6}{'tracks':>8}{'build ms':>10}{'write ms':>10}{'total ms':>10}")
+    for bars in args.bars:
+        for count in range(1, len(Arranger.TRACKS) + 1):
+            build, write = run(bars, Arranger.TRACKS[:count], args.songs)
+            total = build + write
+            flag = '  over budget' if total > args.budget_ms * bars / 32 else ''
+            over_budget = over_budget or bool(flag)
+            print(f"{bars:>6}{count:>8}{build:>10.2f}{write:>10.2f}{total:>10.2f}{flag}")
+
+    return 1 if over_budget else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Benchmark MIDI-to-audio rendering with FluidSynth.
+
+Generates songs for several genres, renders each one to audio and reports
+render time per second of rendered audio (below 1.0 is faster than real
+time), then renders the same songs again to show the cache hit path.
+
+Usage: python benchmarks/bench_audio_render.py [--songs N] [--format wav|ogg]
+"""
+
+import argparse
+import json
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from audio_renderer import AudioRenderer, audio_duration  # noqa: E402
+from music_generator import MusicGenerator  # noqa: E402
+from output_store import OutputStore  # noqa: E402
+
+
+GENRES = ['pop', 'rock', 'jazz', 'classical', 'electronic']
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--songs', type=int, default=5, help='songs to render')
+    parser.add_argument('--format', default='wav', choices=['wav', 'ogg'])
+    args = parser.parse_args()
+
+    with open(ROOT / 'config.json') as f:
+        audio_config = json.load(f).get('audio', {})
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = OutputStore(tmp)
+        renderer = AudioRenderer(
+            tmp,
+            soundfont=audio_config.get('soundfont', '/usr/share/sounds/sf2/FluidR3_GM.sf2'),
+            fluidsynth_bin=audio_config.get('fluidsynth_bin', 'fluidsynth'),
+            sample_rate=audio_config.get('sample_rate', 44100)
+        )
+        if not renderer.available():
+            print("fluidsynth or the configured soundfont is not installed; nothing to benchmark")
+            return 1
+
+        music_gen = MusicGenerator(output_store=store)
+        songs = [music_gen.generate({'genre': GENRES[i % len(GENRES)]})
+                 for i in range(args.songs)]
+
+        print(f"{'genre':<12}{'audio s':>10}{'render s':>10}{'s/audio s':>12}")
+        for i, song in enumerate(songs):
+            start = time.perf_counter()
+            audio = renderer.render(song, args.format)
+            elapsed = time.perf_counter() - start
+            duration = audio_duration(Path(tmp) / audio)
+            ratio = f"{elapsed / duration:>12.3f}" if duration else f"{'n/a':>12}"
+            print(f"{GENRES[i % len(GENRES)]:<12}{duration or 0:>10.1f}{elapsed:>10.2f}{ratio}")
+
+        start = time.perf_counter()
+        for song in songs:
+            renderer.render(song, args.format)
+        cached_ms = (time.perf_counter() - start) * 1000 / len(songs)
+
+        stats = renderer.stats()
+        renderer.shutdown()
+
+    if stats['render_seconds_per_audio_second'] is not None:
+        print(f"\noverall: {stats['render_seconds_per_audio_second']:.3f} s render per s audio")
+    print(f"cached re-render: {cached_ms:.2f} ms/song")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
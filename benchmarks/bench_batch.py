@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Benchmark batch generation throughput as the worker pool grows.
+
+Runs the same batch through app.iter_batch with thread and process pools of
+increasing size and reports items/sec for each configuration.
+
+Usage: python benchmarks/bench_batch.py [--quantity N] [--repeat N]
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+os.chdir(ROOT)
+
+import app  # noqa: E402
+from batch_executor import BatchExecutor  # noqa: E402
+
+
+CUSTOMIZATION = {
+    'genre': 'electronic',
+    'mood': 'energetic',
+    'tempo': 'fast',
+    'key': 'A',
+    'style': 'synthetic'
+}
+CONTENT_TYPES = ['artist', 'lyrics', 'song', 'picture']
+
+
+def pool_sizes():
+    """Return pool sizes from 1 up to the CPU count, doubling each step."""
+    cores = os.cpu_count() or 1
+    sizes = []
+    size = 1
+    while size < cores:
+        sizes.append(size)
+        size *= 2
+    sizes.append(cores)
+    return sizes
+
+
+def run(pool_type, pool_size, quantity, repeat):
+    """Return the best items/sec over several runs of one configuration."""
+    executor = BatchExecutor(pool_size=pool_size, pool_type=pool_type)
+    best = 0.0
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            items = list(app.iter_batch(quantity, CONTENT_TYPES, CUSTOMIZATION,
+                                        executor=executor))
+            elapsed = time.perf_counter() - start
+            best = max(best, len(items) / elapsed)
+    finally:
+        executor.shutdown()
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--quantity', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Batch of {args.quantity} items ({', '.join(CONTENT_TYPES)}), "
+          f"{os.cpu_count()} cores")
+    print(f"{'pool':<8} {'workers':>7} {'items/sec':>10} {'speedup':>8}")
+
+    for pool_type in BatchExecutor.POOL_TYPES:
+        baseline = None
+        for size in pool_sizes():
+            rate = run(pool_type, size, args.quantity, args.repeat)
+            baseline = baseline or rate
+            print(f"{pool_type:<8} {size:>7} {rate:>10.2f} {rate / baseline:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
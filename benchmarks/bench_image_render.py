@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+"""
+Benchmark album art rendering with and without the background layer cache.
+
+Reports ms/image for every genre pattern, rendering in memory only so the
+PNG encoder and disk do not dominate the numbers. The uncached column
+re-renders the mood gradient for every image.
+
+Usage: python benchmarks/bench_image_render.py [--repeat N] [--mood MOOD]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from image_generator import ImageGenerator  # noqa: E402
+
+
+def time_render(image_gen, customization, repeat):
+    """Return the mean ms/image for one customization."""
+    random.seed(0)
+    image_gen.render(customization)  # warm up caches
+    start = time.perf_counter()
+    for _ in range(repeat):
+        image_gen.render(customization)
+    return (time.perf_counter() - start) * 1000 / repeat
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=20)
+    parser.add_argument('--mood', default='happy')
+    args = parser.parse_args()
+
+    generators = {
+        'uncached': ImageGenerator(background_cache_size=0),
+        'cached': ImageGenerator()
+    }
+
+    print(f"{'genre':<12} {'pattern':<12} {'uncached ms':>12} {'cached ms':>10} {'speedup':>8}")
+    for genre, pattern in generators['cached'].genre_patterns.items():
+        customization = {'genre': genre, 'mood': args.mood}
+        timings = {name: time_render(image_gen, customization, args.repeat)
+                   for name, image_gen in generators.items()}
+        print(f"{genre:<12} {pattern:<12} {timings['uncached']:>12.2f} {timings['cached']:>10.2f} "
+              f"{timings['uncached'] / timings['cached']:>7.2f}x")
+
+
+if __name__ == '__main__':
+    main()
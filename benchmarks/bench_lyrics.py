@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Benchmark lyric line generation: template engine vs Markov tables.
+
+Builds the Markov tables from lyrics_corpus/ into a temporary file, then
+reports lines/sec for each engine, both per line and for whole songs
+through LyricsGenerator.generate.
+
+Usage: python benchmarks/bench_lyrics.py [--seconds S]
+"""
+
+import argparse
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from lyrics_generator import LyricsGenerator  # noqa: E402
+from markov_lyrics import build_tables  # noqa: E402
+
+
+MOODS = ['happy', 'sad', 'energetic', 'calm', 'romantic', 'dark', 'uplifting']
+
+# Lines in one generated song: two verses, chorus and bridge
+LINES_PER_SONG = 4 + 4 + 4 + 2
+
+
+def rate(fn, seconds):
+    """Return calls/sec of fn over about `seconds`."""
+    fn()  # warm up, loading any lazy tables
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        fn()
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0, help='time spent per engine')
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    with tempfile.TemporaryDirectory() as tmp:
+        tables_file = Path(tmp) / 'tables.npz'
+        build_tables(ROOT / 'lyrics_corpus', tables_file)
+        engines = {
+            'template': LyricsGenerator(engine='template', tables_file=tables_file),
+            'markov': LyricsGenerator(engine='markov', tables_file=tables_file)
+        }
+
+        template_gen = engines['template']
+        markov_gen = engines['markov']
+        theme_list = template_gen.themes['happy']
+        verb_list = template_gen.verbs['happy']
+
+        def template_line():
+            return rng.choice(template_gen.templates).format(
+                theme=rng.choice(theme_list), verb=rng.choice(verb_list))
+
+        table = markov_gen.markov.table_name('happy')
+
+        def markov_line():
+            return markov_gen.markov.line(table, rng)
+
+        print(f"{'engine':<10}{'lines/s':>12}{'song lines/s':>15}")
+        for name, line_fn in (('template', template_line), ('markov', markov_line)):
+            lyrics_gen = engines[name]
+            songs = rate(lambda: lyrics_gen.generate({'mood': rng.choice(MOODS)}, rng),
+                         args.seconds)
+            print(f"{name:<10}{rate(line_fn, args.seconds):>12.0f}"
+                  f"{songs * LINES_PER_SONG:>15.0f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Benchmark MIDI song generation as songs get longer.
+
+Builds songs of 32, 128 and 512 bars in memory with MusicGenerator and
+reports songs/sec and ms/song for each length.
+
+Usage: python benchmarks/bench_music.py [--seconds S] [--bars N ...]
+"""
+
+import argparse
+import random
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from music_generator import MusicGenerator  # noqa: E402
+
+
+CUSTOMIZATION = {
+    'genre': 'jazz',
+    'mood': 'energetic',
+    'tempo': 'fast',
+    'key': 'A'
+}
+
+
+def run(bars, seconds):
+    """Return songs/sec for one song length, generating for about `seconds`."""
+    music_gen = MusicGenerator(duration_bars=bars)
+    rng = random.Random(0)
+    music_gen.generate_bytes(CUSTOMIZATION, rng)  # warm up
+
+    count = 0
+    start = time.perf_counter()
+    while time.perf_counter() - start < seconds:
+        music_gen.generate_bytes(CUSTOMIZATION, rng)
+        count += 1
+    return count / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=2.0,
+                        help='time spent on each song length')
+    parser.add_argument('--bars', type=int, nargs='+', default=[32, 128, 512])
+    args = parser.parse_args()
+
+    print(f"{'bars':>6}{'songs/s':>12}{'ms/song':>12}")
+    for bars in args.bars:
+        rate = run(bars, args.seconds)
+        print(f"{bars:>6}{rate:>12.1f}{1000 / rate:>12.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Benchmark application cold start: imports, component init and first request.
+
+Every measurement runs in a fresh interpreter, so nothing is already
+imported or cached. Reports the median over --repeat runs of:
+- import time of each module on its own (shared dependencies included)
+- import app, then app.warm_up() per lazily built component
+- import app followed by the first /api/generate request
+
+Runs in a temporary working directory, so no output is left in the
+repository.
+
+Usage: python benchmarks/bench_startup.py [--repeat N] [--json]
+"""
+
+import argparse
+import json
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+
+MODULES = [
+    'flask', 'numpy', 'PIL.Image', 'midiutil',
+    'music_generator', 'image_generator', 'lyrics_generator',
+    'artist_generator', 'evolution_engine', 'lyrics_store', 'app'
+]
+
+IMPORT_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+__import__({module!r})
+print(json.dumps({{'ms': (time.perf_counter() - start) * 1000}}))
+"""
+
+WARM_UP_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+import_ms = (time.perf_counter() - start) * 1000
+print(json.dumps({{'import app': import_ms, **app.warm_up()}}))
+"""
+
+FIRST_REQUEST_SCRIPT = """
+import json, sys, time
+sys.path.insert(0, {root!r})
+start = time.perf_counter()
+import app
+response = app.app.test_client().post('/api/generate', json={{
+    'quantity': 1, 'content_types': ['artist', 'lyrics', 'song']
+}})
+assert response.status_code == 200
+print(json.dumps({{'ms': (time.perf_counter() - start) * 1000}}))
+"""
+
+
+def run_script(script, workdir):
+    """Run a snippet in a fresh interpreter and return its JSON output."""
+    result = subprocess.run([sys.executable, '-c', script.strip()], cwd=workdir,
+                            capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def median_of(runs):
+    """Median of each key over a list of {name: ms} dicts."""
+    return {key: statistics.median(run[key] for run in runs) for key in runs[0]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='fresh interpreters per measurement')
+    parser.add_argument('--json', action='store_true', help='print a JSON report instead of a table')
+    args = parser.parse_args()
+
+    workdir = Path(tempfile.mkdtemp(prefix='music_ai_startup_'))
+    try:
+        shutil.copy(ROOT / 'config.json', workdir / 'config.json')
+
+        imports = {}
+        for module in MODULES:
+            script = IMPORT_SCRIPT.format(root=str(ROOT), module=module)
+            imports[module] = median_of([run_script(script, workdir)
+                                         for _ in range(args.repeat)])['ms']
+
+        script = WARM_UP_SCRIPT.format(root=str(ROOT))
+        warm_up = median_of([run_script(script, workdir) for _ in range(args.repeat)])
+
+        script = FIRST_REQUEST_SCRIPT.format(root=str(ROOT))
+        first_request = median_of([run_script(script, workdir)
+                                   for _ in range(args.repeat)])['ms']
+    finally:
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    if args.json:
+        print(json.dumps({'import_ms': imports, 'warm_up_ms': warm_up,
+                          'first_request_ms': first_request}, indent=2))
+        return
+
+    print(f"Median of {args.repeat} fresh interpreters")
+    print(f"{'import':<24}{'ms':>10}")
+    for module, ms in imports.items():
+        print(f"{module:<24}{ms:>10.1f}")
+    print(f"\n{'warm up':<24}{'ms':>10}")
+    for name, ms in warm_up.items():
+        print(f"{name:<24}{ms:>10.1f}")
+    print(f"\n{'import app + first request':<24}{first_request:>10.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+"""
+Benchmark every generator and the /api/generate route, emitting JSON.
+
+Each case is called repeatedly for about --seconds and reports calls/sec,
+items/sec and latency percentiles. Cases cover MusicGenerator,
+ImageGenerator, LyricsGenerator, ArtistGenerator, EvolutionEngine
+record_generation/evolve, and POST /api/generate through Flask's test client
+across quantities and content-type mixes. Everything runs offline in a
+temporary directory, so no output is left in the repository.
+
+Save a run with --output, then pass it to a later run with --compare to
+print per-case speed ratios; the exit status is 1 if any case got slower
+than --threshold allows.
+
+Usage: python benchmarks/bench_suite.py [--seconds S] [--only TEXT ...]
+                                        [--output FILE] [--compare FILE]
+"""
+
+import argparse
+import atexit
+import json
+import os
+import platform
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from artist_generator import ArtistGenerator  # noqa: E402
+from evolution_engine import EvolutionEngine  # noqa: E402
+from image_generator import ImageGenerator  # noqa: E402
+from lyrics_generator import LyricsGenerator  # noqa: E402
+from music_generator import MusicGenerator  # noqa: E402
+from output_store import OutputStore  # noqa: E402
+
+
+CUSTOMIZATION = {
+    'genre': 'rock',
+    'mood': 'energetic',
+    'tempo': 'fast',
+    'key': 'E',
+    'style': 'electric'
+}
+
+QUANTITIES = [1, 5, 10]
+
+CONTENT_MIXES = {
+    'text': ['artist', 'lyrics'],
+    'song': ['artist', 'lyrics', 'song'],
+    'full': ['artist', 'lyrics', 'song', 'picture']
+}
+
+
+def percentile(ordered, q):
+    """Nearest-rank percentile of a sorted list."""
+    index = min(len(ordered) - 1, max(0, round(q * len(ordered)) - 1))
+    return ordered[index]
+
+
+def measure(fn, seconds, items=1, min_calls=3):
+    """
+    Call fn for about `seconds` (and at least min_calls times).
+
+    Returns:
+        dict: calls, calls/sec, items/sec and latency percentiles in ms
+    """
+    fn()  # warm up caches and lazy loads
+    latencies = []
+    start = time.perf_counter()
+    while len(latencies) < min_calls or time.perf_counter() - start < seconds:
+        call_start = time.perf_counter()
+        fn()
+        latencies.append(time.perf_counter() - call_start)
+    elapsed = time.perf_counter() - start
+
+    ordered = sorted(latencies)
+    return {
+        'calls': len(latencies),
+        'calls_per_sec': len(latencies) / elapsed,
+        'items_per_sec': len(latencies) * items / elapsed,
+        'latency_ms': {
+            'mean': sum(latencies) / len(latencies) * 1000,
+            'p50': percentile(ordered, 0.50) * 1000,
+            'p95': percentile(ordered, 0.95) * 1000,
+            'p99': percentile(ordered, 0.99) * 1000,
+            'max': ordered[-1] * 1000
+        }
+    }
+
+
+def generator_cases(workdir):
+    """Yield (name, params, fn, items) for each generator on its own."""
+    rng = random.Random(0)
+    store = OutputStore(workdir / 'output')
+
+    music_gen = MusicGenerator(output_store=store)
+    yield 'music.generate_bytes', {}, lambda: music_gen.generate_bytes(CUSTOMIZATION, rng), 1
+    yield 'music.generate', {}, lambda: music_gen.generate(CUSTOMIZATION, rng), 1
+
+    image_gen = ImageGenerator(output_store=store)
+    yield 'image.generate', {}, lambda: image_gen.generate(CUSTOMIZATION, rng), 1
+
+    lyrics_gen = LyricsGenerator()
+    yield 'lyrics.generate', {}, lambda: lyrics_gen.generate(CUSTOMIZATION, rng), 1
+
+    artist_gen = ArtistGenerator()
+    yield 'artist.generate', {}, lambda: artist_gen.generate(CUSTOMIZATION, rng), 1
+    yield ('artist.generate_unique', {'count': 100},
+           lambda: artist_gen.generate_unique(CUSTOMIZATION, 100, rng), 100)
+
+    engine = EvolutionEngine(stats_file=workdir / 'evolution_stats.json')
+    record = {
+        'content_types': ['song', 'lyrics', 'artist'],
+        'customization': CUSTOMIZATION,
+        'quantity': 1
+    }
+    yield 'evolution.record_generation', {}, lambda: engine.record_generation(record), 1
+    yield 'evolution.evolve', {}, engine.evolve, 1
+
+
+def http_cases():
+    """Yield (name, params, fn, items) for POST /api/generate."""
+    import app  # imported here so it picks up the temporary working directory
+    client = app.app.test_client()
+
+    for mix, content_types in CONTENT_MIXES.items():
+        for quantity in QUANTITIES:
+            body = {
+                'quantity': quantity,
+                'content_types': content_types,
+                'customization': CUSTOMIZATION
+            }
+
+            def post(body=body):
+                response = client.post('/api/generate', json=body)
+                assert response.status_code == 200, response.status_code
+
+            yield 'http.generate', {'mix': mix, 'quantity': quantity}, post, quantity
+
+
+def git_commit():
+    """Return the current commit hash, or None outside a git checkout."""
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def case_key(result):
+    """Identify a case across runs by its name and parameters."""
+    params = ','.join(f'{k}={v}' for k, v in sorted(result['params'].items()))
+    return f"{result['name']}[{params}]" if params else result['name']
+
+
+def compare(results, baseline_file, threshold):
+    """
+    Print throughput ratios against a saved run.
+
+    Returns:
+        bool: True if no case is slower than the threshold allows
+    """
+    baseline = {case_key(r): r for r in json.loads(Path(baseline_file).read_text())['results']}
+    ok = True
+    print(f"{'case':<40}{'baseline/s':>12}{'current/s':>12}{'ratio':>8}", file=sys.stderr)
+    for result in results:
+        key = case_key(result)
+        before = baseline.get(key)
+        if before is None:
+            print(f"{key:<40}{'-':>12}{result['items_per_sec']:>12.1f}{'new':>8}", file=sys.stderr)
+            continue
+        ratio = result['items_per_sec'] / before['items_per_sec']
+        slower = ratio < 1 - threshold
+        ok = ok and not slower
+        print(f"{key:<40}{before['items_per_sec']:>12.1f}{result['items_per_sec']:>12.1f}"
+              f"{ratio:>7.2f}x{'  SLOWER' if slower else ''}", file=sys.stderr)
+    return ok
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--seconds', type=float, default=1.0, help='time spent per case')
+    parser.add_argument('--only', nargs='*', default=[],
+                        help='run only cases whose name contains one of these strings')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='JSON report of an earlier run to compare with')
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help='fraction of throughput a case may lose before --compare fails')
+    args = parser.parse_args()
+    # Resolve report paths before moving into the temporary directory
+    output = Path(args.output).resolve() if args.output else None
+    baseline = Path(args.compare).resolve() if args.compare else None
+
+    workdir = Path(tempfile.mkdtemp(prefix='music_ai_bench_'))
+    # The app reads config.json and writes output/ relative to the working
+    # directory; registered first, the cleanup runs after the app's own
+    # exit-time flushes
+    atexit.register(shutil.rmtree, workdir, ignore_errors=True)
+    shutil.copy(ROOT / 'config.json', workdir / 'config.json')
+    os.chdir(workdir)
+
+    results = []
+    for cases in (generator_cases(workdir), http_cases()):
+        for name, params, fn, items in cases:
+            if args.only and not any(text in name for text in args.only):
+                continue
+            print(f"running {name} {params or ''}", file=sys.stderr)
+            results.append({'name': name, 'params': params,
+                            **measure(fn, args.seconds, items)})
+
+    report = {
+        'meta': {
+            'commit': git_commit(),
+            'timestamp': datetime.now().isoformat(),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'seconds_per_case': args.seconds
+        },
+        'results': results
+    }
+    text = json.dumps(report, indent=2)
+    if output:
+        output.write_text(text + '\n')
+    else:
+        print(text)
+
+    if baseline and not compare(results, baseline, args.threshold):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
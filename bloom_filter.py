@@ -0,0 +1,91 @@
+"""
+Bloom Filter Module
+A compact, persistent set-membership filter backed by a memory-mapped file.
+
+Used to remember which generated names have already been issued without
+storing the names themselves. Lookups may report a false positive at about
+the configured error rate, but never a false negative. The bit array lives
+in a memory-mapped file, so it survives restarts and is shared by every
+worker process that opens the same path.
+"""
+
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from pathlib import Path
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter stored in a memory-mapped file."""
+
+    MAGIC = b'BLM1'
+    HEADER = struct.Struct('<4sQI20x')
+
+    def __init__(self, path, capacity=100000, error_rate=0.001):
+        """
+        Open or create a filter.
+
+        Args:
+            path: file holding the filter
+            capacity: number of items the filter is sized for
+            error_rate: false-positive rate at capacity
+
+        Raises:
+            ValueError: if the file exists but is not a Bloom filter
+        """
+        self.path = Path(path)
+        self.capacity = capacity
+        self.error_rate = error_rate
+
+        # Optimal bit count and hash count for the capacity and error rate
+        bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        hashes = max(1, round(bits / capacity * math.log(2)))
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(fd).st_size == 0:
+                os.ftruncate(fd, self.HEADER.size + (bits + 7) // 8)
+                os.pwrite(fd, self.HEADER.pack(self.MAGIC, bits, hashes), 0)
+
+            # An existing file keeps the size it was created with
+            magic, self.bits, self.hashes = self.HEADER.unpack(os.pread(fd, self.HEADER.size, 0))
+            if magic != self.MAGIC:
+                raise ValueError(f"{self.path} is not a Bloom filter")
+            self._map = mmap.mmap(fd, self.HEADER.size + (self.bits + 7) // 8)
+        finally:
+            os.close(fd)
+
+        self._lock = threading.Lock()
+
+    def _positions(self, item):
+        """Get the bit positions of an item (double hashing)."""
+        digest = hashlib.blake2b(item.encode('utf-8'), digest_size=16).digest()
+        first, second = struct.unpack('<QQ', digest)
+        return [(first + i * second) % self.bits for i in range(self.hashes)]
+
+    def add(self, item):
+        """Add an item to the filter."""
+        offset = self.HEADER.size
+        with self._lock:
+            for position in self._positions(item):
+                index = offset + position // 8
+                self._map[index] |= 1 << (position % 8)
+
+    def __contains__(self, item):
+        offset = self.HEADER.size
+        return all(self._map[offset + position // 8] & (1 << (position % 8))
+                   for position in self._positions(item))
+
+    def flush(self):
+        """Ask the OS to write the bit array back to the file."""
+        self._map.flush()
+
+    def close(self):
+        """Flush and unmap the filter."""
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
@@ -0,0 +1,85 @@
+"""
+Bounded Cache Module
+Thread-safe LRU cache with hit/miss counters for monitoring.
+"""
+
+import threading
+from collections import OrderedDict
+
+
+class BoundedLRUCache:
+    """Least-recently-used cache holding at most max_size entries."""
+
+    def __init__(self, max_size=128):
+        self.max_size = max_size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Get a cached value, counting the lookup as a hit or miss."""
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return self._entries[key]
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """Store a value, evicting the least recently used entry if full."""
+        if self.max_size <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_create(self, key, factory):
+        """
+        Get a cached value, building and storing it on a miss.
+
+        Args:
+            key: hashable cache key
+            factory: zero-argument callable that builds the value
+
+        Returns:
+            the cached or newly built value
+        """
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            # Built outside the lock; concurrent misses may build twice
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def discard(self, key):
+        """Remove a key if present."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def stats(self):
+        """Get hit/miss counters and current size."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'size': len(self._entries),
+                'max_size': self.max_size,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
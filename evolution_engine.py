@@ -3,37 +3,36 @@ Evolution Engine Module
 Manages the AI's learning and evolution based on usage patterns.
 """
 
-import json
-from pathlib import Path
-from datetime import datetime
+from evolution_store import JSONEvolutionStore
 
 
 class EvolutionEngine:
     """Track and evolve AI based on usage patterns."""
     
-    def __init__(self):
-        self.stats_file = Path("evolution_stats.json")
-        self.stats = self._load_stats()
-        
-    def _load_stats(self):
-        """Load evolution statistics from file."""
-        if self.stats_file.exists():
-            with open(self.stats_file, 'r') as f:
-                return json.load(f)
-        else:
-            return {
-                'total_generations': 0,
-                'genre_counts': {},
-                'mood_counts': {},
-                'tempo_counts': {},
-                'evolution_score': 0,
-                'generation_history': []
-            }
-    
-    def _save_stats(self):
-        """Save evolution statistics to file."""
-        with open(self.stats_file, 'w') as f:
-            json.dump(self.stats, f, indent=2)
+    def __init__(self, stats_file="evolution_stats.json", history_limit=100,
+                 flush_interval=5.0, flush_threshold=100, store=None):
+        """
+        Create an evolution engine.
+        
+        Statistics live in a pluggable store (see evolution_store.py). When
+        no store is given, a JSONEvolutionStore is created from the other
+        arguments: updates are kept in memory and written to stats_file by a
+        background thread every flush_interval seconds, or as soon as
+        flush_threshold updates are pending, and once more at shutdown.
+        
+        Args:
+            stats_file: path of the JSON statistics file
+            history_limit: number of recent generations kept in history
+            flush_interval: seconds between background flushes
+            flush_threshold: pending updates that trigger an early flush
+            store: storage backend to use instead of the JSON file
+        """
+        self.store = store or JSONEvolutionStore(
+            stats_file=stats_file,
+            history_limit=history_limit,
+            flush_interval=flush_interval,
+            flush_threshold=flush_threshold
+        )
     
     def record_generation(self, generation_data):
         """
@@ -44,81 +43,67 @@ class EvolutionEngine:
         """
         customization = generation_data.get('customization', {})
         
-        # Increment total generations
-        self.stats['total_generations'] += 1
-        
-        # Track genre preferences
-        genre = customization.get('genre', 'unknown')
-        self.stats['genre_counts'][genre] = self.stats['genre_counts'].get(genre, 0) + 1
-        
-        # Track mood preferences
-        mood = customization.get('mood', 'unknown')
-        self.stats['mood_counts'][mood] = self.stats['mood_counts'].get(mood, 0) + 1
-        
-        # Track tempo preferences
-        tempo = customization.get('tempo', 'unknown')
-        self.stats['tempo_counts'][tempo] = self.stats['tempo_counts'].get(tempo, 0) + 1
-        
-        # Add to history (keep last 100)
-        self.stats['generation_history'].append({
+        # Track genre, mood and tempo preferences
+        self.store.record({
             'timestamp': generation_data.get('timestamp'),
-            'genre': genre,
-            'mood': mood,
-            'tempo': tempo
+            'genre': customization.get('genre', 'unknown'),
+            'mood': customization.get('mood', 'unknown'),
+            'tempo': customization.get('tempo', 'unknown')
         })
-        
-        if len(self.stats['generation_history']) > 100:
-            self.stats['generation_history'] = self.stats['generation_history'][-100:]
     
     def evolve(self):
         """
         Evolve the AI based on accumulated data.
         Updates evolution score and learns from patterns.
         """
+        counts = self.store.counts()
+        
         # Calculate evolution score based on generations
-        total = self.stats['total_generations']
+        total = counts['total_generations']
         
         # Evolution score increases with usage
         # Every 10 generations increases score by 1
         base_score = total // 10
         
         # Bonus for diversity - using multiple genres/moods
-        genre_diversity = len(self.stats['genre_counts'])
-        mood_diversity = len(self.stats['mood_counts'])
+        genre_diversity = len(counts['genre_counts'])
+        mood_diversity = len(counts['mood_counts'])
         diversity_bonus = (genre_diversity + mood_diversity) // 2
         
         # Calculate final score
-        self.stats['evolution_score'] = base_score + diversity_bonus
+        derived = {'evolution_score': base_score + diversity_bonus}
         
         # Determine preferred styles for recommendations
-        if self.stats['genre_counts']:
-            most_common_genre = max(self.stats['genre_counts'].items(), 
-                                   key=lambda x: x[1])[0]
-            self.stats['preferred_genre'] = most_common_genre
-        
-        if self.stats['mood_counts']:
-            most_common_mood = max(self.stats['mood_counts'].items(), 
-                                  key=lambda x: x[1])[0]
-            self.stats['preferred_mood'] = most_common_mood
-        
-        # Save updated stats
-        self._save_stats()
+        if counts['genre_counts']:
+            derived['preferred_genre'] = self.store.top('genre')
+        
+        if counts['mood_counts']:
+            derived['preferred_mood'] = self.store.top('mood')
+        
+        # Updated stats are persisted by the store
+        self.store.set_derived(derived)
+    
+    def flush(self):
+        """Write any pending updates to storage now."""
+        self.store.flush()
+    
+    def close(self):
+        """Flush pending updates and release storage resources."""
+        self.store.close()
     
     def get_score(self):
         """Get current evolution score."""
-        return self.stats['evolution_score']
+        return self.store.get_derived('evolution_score', 0)
+    
+    def get_persistence_stats(self):
+        """Get persistence counters from the store."""
+        return self.store.persistence_stats()
     
     def get_stats(self):
         """Get all evolution statistics."""
         return {
-            'total_generations': self.stats['total_generations'],
-            'evolution_score': self.stats['evolution_score'],
-            'genre_counts': self.stats['genre_counts'],
-            'mood_counts': self.stats['mood_counts'],
-            'tempo_counts': self.stats['tempo_counts'],
-            'preferred_genre': self.stats.get('preferred_genre', 'unknown'),
-            'preferred_mood': self.stats.get('preferred_mood', 'unknown'),
-            'recent_generations': self.stats['generation_history'][-10:]
+            **self.store.snapshot(recent=10),
+            'persistence': self.get_persistence_stats()
         }
     
     def get_recommendations(self):
@@ -130,16 +115,17 @@ class EvolutionEngine:
         """
         recommendations = {}
         
-        if self.stats.get('preferred_genre'):
-            recommendations['genre'] = self.stats['preferred_genre']
+        preferred_genre = self.store.get_derived('preferred_genre')
+        if preferred_genre:
+            recommendations['genre'] = preferred_genre
         
-        if self.stats.get('preferred_mood'):
-            recommendations['mood'] = self.stats['preferred_mood']
+        preferred_mood = self.store.get_derived('preferred_mood')
+        if preferred_mood:
+            recommendations['mood'] = preferred_mood
         
         # Suggest tempo based on most common choice
-        if self.stats['tempo_counts']:
-            most_common_tempo = max(self.stats['tempo_counts'].items(), 
-                                   key=lambda x: x[1])[0]
+        most_common_tempo = self.store.top('tempo')
+        if most_common_tempo:
             recommendations['tempo'] = most_common_tempo
         
         return recommendations
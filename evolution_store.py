@@ -0,0 +1,668 @@
+"""
+Evolution Store Module
+Storage backends for the evolution engine's usage statistics.
+
+Every backend records generation events, keeps per-dimension preference
+counts (genre, mood, tempo) and stores the derived values computed by
+EvolutionEngine.evolve() (evolution_score, preferred_genre, preferred_mood).
+
+- JSONEvolutionStore keeps everything in memory and writes a JSON file in
+  the background (write-behind). Each process has its own copy.
+- SQLiteEvolutionStore keeps every event in a SQLite database in WAL mode
+  and maintains the counts incrementally, so several worker processes can
+  share one consistent dataset.
+- SharedMemoryEvolutionStore keeps counters and recent history in a
+  memory-mapped file that every worker process maps, incrementing each
+  counter under its own byte-range lock.
+"""
+
+import atexit
+import json
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from output_store import atomic_write
+
+
+DIMENSIONS = ('genre', 'mood', 'tempo')
+
+
+class JSONEvolutionStore:
+    """In-memory statistics flushed to a JSON file by a background thread."""
+
+    def __init__(self, stats_file="evolution_stats.json", history_limit=100,
+                 flush_interval=5.0, flush_threshold=100):
+        """
+        Create a JSON store.
+
+        Updates are kept in memory and written to stats_file by a background
+        thread (write-behind), every flush_interval seconds or as soon as
+        flush_threshold updates are pending, and once more at shutdown.
+
+        Args:
+            stats_file: path of the JSON statistics file
+            history_limit: number of recent generations kept in history
+            flush_interval: seconds between background flushes
+            flush_threshold: pending updates that trigger an early flush
+        """
+        self.stats_file = Path(stats_file)
+        self.history_limit = history_limit
+        self.flush_interval = flush_interval
+        self.flush_threshold = flush_threshold
+
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._flush_requested = threading.Event()
+        self._closed = False
+        self._flusher = None
+        self._flusher_pid = None
+
+        # Persistence counters
+        self._pending = 0
+        self._dirty = False
+        self._flushes = 0
+        self._last_flush_ms = None
+        self._last_flush_at = None
+
+        self.stats = self._load_stats()
+        atexit.register(self.close)
+
+    def _load_stats(self):
+        """Load evolution statistics from file."""
+        if self.stats_file.exists():
+            with open(self.stats_file, 'r') as f:
+                return json.load(f)
+        else:
+            return {
+                'total_generations': 0,
+                'genre_counts': {},
+                'mood_counts': {},
+                'tempo_counts': {},
+                'evolution_score': 0,
+                'generation_history': []
+            }
+
+    def record(self, event):
+        """
+        Record a generation event.
+
+        Args:
+            event: dict with timestamp, genre, mood and tempo
+        """
+        with self._lock:
+            self.stats['total_generations'] += 1
+            for dimension in DIMENSIONS:
+                counts = self.stats[f'{dimension}_counts']
+                counts[event[dimension]] = counts.get(event[dimension], 0) + 1
+
+            # Add to history (keep the most recent history_limit entries)
+            history = self.stats['generation_history']
+            history.append(dict(event))
+            if len(history) > self.history_limit:
+                self.stats['generation_history'] = history[-self.history_limit:]
+
+            self._mark_dirty(1)
+
+    def counts(self):
+        """Get the total and per-dimension counts."""
+        with self._lock:
+            return {
+                'total_generations': self.stats['total_generations'],
+                **{f'{d}_counts': dict(self.stats[f'{d}_counts']) for d in DIMENSIONS}
+            }
+
+    def top(self, dimension):
+        """Get the most common value of a dimension, or None."""
+        with self._lock:
+            counts = self.stats[f'{dimension}_counts']
+            if not counts:
+                return None
+            return max(counts.items(), key=lambda x: x[1])[0]
+
+    def set_derived(self, values):
+        """Store values computed by EvolutionEngine.evolve()."""
+        with self._lock:
+            self.stats.update(values)
+            self._mark_dirty()
+
+    def get_derived(self, key, default=None):
+        """Get a value computed by EvolutionEngine.evolve()."""
+        with self._lock:
+            return self.stats.get(key, default)
+
+    def snapshot(self, recent=10):
+        """Get counts, derived values and the most recent generations."""
+        with self._lock:
+            return {
+                **self.counts(),
+                'evolution_score': self.stats['evolution_score'],
+                'preferred_genre': self.stats.get('preferred_genre', 'unknown'),
+                'preferred_mood': self.stats.get('preferred_mood', 'unknown'),
+                'recent_generations': self.stats['generation_history'][-recent:]
+            }
+
+    def _save_stats(self):
+        """Save evolution statistics to file."""
+        # The snapshot is taken under the flush lock so that overlapping
+        # flushes write their snapshots in the order they were taken
+        with self._flush_lock:
+            with self._lock:
+                if not self._dirty:
+                    return
+                snapshot = json.dumps(self.stats, separators=(',', ':'))
+                pending = self._pending
+                self._pending = 0
+                self._dirty = False
+
+            # Write outside the main lock so request threads are never blocked on disk
+            start = time.perf_counter()
+            try:
+                with atomic_write(self.stats_file, 'w', encoding='utf-8') as f:
+                    f.write(snapshot)
+            except Exception:
+                with self._lock:
+                    self._pending += pending
+                    self._dirty = True
+                raise
+
+        with self._lock:
+            self._flushes += 1
+            self._last_flush_ms = (time.perf_counter() - start) * 1000
+            self._last_flush_at = datetime.now().isoformat()
+
+    def _mark_dirty(self, updates=0):
+        """Note unsaved changes and wake the flusher if enough are pending."""
+        self._pending += updates
+        self._dirty = True
+        self._ensure_flusher()
+        if self._pending >= self.flush_threshold:
+            self._flush_requested.set()
+
+    def _ensure_flusher(self):
+        """Start the background flush thread (again after a fork)."""
+        if self._closed:
+            return
+        if self._flusher is not None and self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+        self._flusher = threading.Thread(target=self._flush_loop,
+                                         name='evolution-flush', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        """Flush pending updates on an interval or when the threshold is hit."""
+        while not self._closed:
+            self._flush_requested.wait(self.flush_interval)
+            self._flush_requested.clear()
+            try:
+                if self._dirty:
+                    self._save_stats()
+            except Exception as e:
+                import logging
+                logging.error(f"Error saving evolution stats: {str(e)}")
+
+    def flush(self):
+        """Write any pending updates to disk now, after any write in progress."""
+        self._save_stats()
+
+    def close(self):
+        """Stop the background flusher and write any pending updates."""
+        self._closed = True
+        self._flush_requested.set()
+        self.flush()
+
+    def persistence_stats(self):
+        """Get write-behind persistence counters."""
+        with self._lock:
+            return {
+                'backend': 'json',
+                'pending_updates': self._pending,
+                'flushes': self._flushes,
+                'last_flush_ms': self._last_flush_ms,
+                'last_flush_at': self._last_flush_at,
+                'flush_interval': self.flush_interval,
+                'flush_threshold': self.flush_threshold
+            }
+
+
+class SQLiteEvolutionStore:
+    """Statistics kept in a shared SQLite database in WAL mode."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS generation_events (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            timestamp TEXT,
+            genre TEXT NOT NULL,
+            mood TEXT NOT NULL,
+            tempo TEXT NOT NULL
+        );
+        CREATE TABLE IF NOT EXISTS preference_counts (
+            dimension TEXT NOT NULL,
+            value TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (dimension, value)
+        );
+        CREATE INDEX IF NOT EXISTS idx_preference_counts_rank
+            ON preference_counts (dimension, count DESC);
+        CREATE TABLE IF NOT EXISTS evolution_state (
+            key TEXT PRIMARY KEY,
+            value TEXT
+        );
+    """
+
+    def __init__(self, db_file="evolution_stats.db", busy_timeout=30.0):
+        """
+        Create a SQLite store.
+
+        Args:
+            db_file: path of the SQLite database
+            busy_timeout: seconds to wait for another writer's lock
+        """
+        self.db_file = Path(db_file)
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._write_ms = None
+
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+
+    def _connect(self):
+        """Get this thread's connection, opening a new one after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def record(self, event):
+        """
+        Record a generation event and update the counts in one transaction.
+
+        Args:
+            event: dict with timestamp, genre, mood and tempo
+        """
+        start = time.perf_counter()
+        conn = self._connect()
+        with conn:
+            conn.execute(
+                "INSERT INTO generation_events (timestamp, genre, mood, tempo) "
+                "VALUES (?, ?, ?, ?)",
+                (event.get('timestamp'), event['genre'], event['mood'], event['tempo'])
+            )
+            conn.executemany(
+                "INSERT INTO preference_counts (dimension, value, count) VALUES (?, ?, 1) "
+                "ON CONFLICT (dimension, value) DO UPDATE SET count = count + 1",
+                [(dimension, event[dimension]) for dimension in DIMENSIONS]
+            )
+        self._write_ms = (time.perf_counter() - start) * 1000
+
+    def counts(self):
+        """Get the total and per-dimension counts."""
+        counts = {f'{d}_counts': {} for d in DIMENSIONS}
+        rows = self._connect().execute(
+            "SELECT dimension, value, count FROM preference_counts"
+        ).fetchall()
+        for dimension, value, count in rows:
+            counts[f'{dimension}_counts'][value] = count
+
+        # Every event counts once per dimension, so any dimension's sum is the total
+        return {
+            'total_generations': sum(counts['genre_counts'].values()),
+            **counts
+        }
+
+    def top(self, dimension):
+        """Get the most common value of a dimension, or None."""
+        row = self._connect().execute(
+            "SELECT value FROM preference_counts WHERE dimension = ? "
+            "ORDER BY count DESC LIMIT 1",
+            (dimension,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def set_derived(self, values):
+        """Store values computed by EvolutionEngine.evolve()."""
+        conn = self._connect()
+        with conn:
+            conn.executemany(
+                "INSERT INTO evolution_state (key, value) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET value = excluded.value",
+                [(key, json.dumps(value)) for key, value in values.items()]
+            )
+
+    def get_derived(self, key, default=None):
+        """Get a value computed by EvolutionEngine.evolve()."""
+        row = self._connect().execute(
+            "SELECT value FROM evolution_state WHERE key = ?", (key,)
+        ).fetchone()
+        return json.loads(row[0]) if row else default
+
+    def snapshot(self, recent=10):
+        """Get counts, derived values and the most recent generations."""
+        rows = self._connect().execute(
+            "SELECT timestamp, genre, mood, tempo FROM generation_events "
+            "ORDER BY id DESC LIMIT ?",
+            (recent,)
+        ).fetchall()
+        return {
+            **self.counts(),
+            'evolution_score': self.get_derived('evolution_score', 0),
+            'preferred_genre': self.get_derived('preferred_genre', 'unknown'),
+            'preferred_mood': self.get_derived('preferred_mood', 'unknown'),
+            'recent_generations': [
+                {'timestamp': t, 'genre': g, 'mood': m, 'tempo': tp}
+                for t, g, m, tp in reversed(rows)
+            ]
+        }
+
+    def flush(self):
+        """Nothing to do: every update is committed as it is recorded."""
+
+    def close(self):
+        """Close this thread's connection."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None and self._local.pid == os.getpid():
+            conn.close()
+        self._local.conn = None
+
+    def persistence_stats(self):
+        """Get persistence counters."""
+        return {
+            'backend': 'sqlite',
+            'pending_updates': 0,
+            'last_write_ms': self._write_ms
+        }
+
+
+class SharedMemoryEvolutionStore:
+    """
+    Counters and recent history in a memory-mapped file shared by processes.
+
+    File layout (little-endian):
+
+    - header (64 bytes): magic, slot capacity, history capacity, total
+      generations, evolution score, preferred genre/mood slot indexes and
+      the number of allocated slots
+    - counter slots (64 bytes each): count, dimension, name length, name
+    - history ring (48 bytes each): sequence number, genre/mood/tempo slot
+      indexes, timestamp
+
+    Each counter is incremented under an fcntl lock on just its own 8 bytes,
+    so workers recording different values never wait for each other. Reads
+    take no locks.
+    """
+
+    MAGIC = b'EVOSHM01'
+    HEADER = struct.Struct('<8sIIQqiiI20x')
+    SLOT = struct.Struct('<QBB54s')
+    NAME_SIZE = 54
+    HISTORY = struct.Struct('<QHHHB33s')
+
+    # Header field offsets used for byte-range locks and in-place updates
+    TOTAL_OFFSET = 16
+    DERIVED_OFFSET = 24
+    SLOTS_USED_OFFSET = 40
+
+    # Values that no longer fit in the slot table are counted here
+    OVERFLOW = '(other)'
+
+    def __init__(self, shared_file="evolution_shared.bin", slot_capacity=1024,
+                 history_capacity=100):
+        """
+        Create or open a shared store.
+
+        Args:
+            shared_file: path of the memory-mapped file
+            slot_capacity: maximum number of distinct genre/mood/tempo values
+            history_capacity: number of recent generations kept
+        """
+        import fcntl
+        self._fcntl = fcntl
+
+        self.shared_file = Path(shared_file)
+        self.slot_capacity = slot_capacity
+        self.history_capacity = history_capacity
+        self._slots_offset = self.HEADER.size
+        self._history_offset = self._slots_offset + slot_capacity * self.SLOT.size
+        size = self._history_offset + history_capacity * self.HISTORY.size
+
+        # Per-process cache of (dimension, value) -> slot index
+        self._slot_index = {}
+        self._thread_lock = threading.Lock()
+        self._thread_lock_pid = os.getpid()
+
+        self._fd = os.open(self.shared_file, os.O_RDWR | os.O_CREAT, 0o644)
+        self._locked(0, self.HEADER.size, lambda: self._initialize(size))
+
+        # Existing files keep the capacities they were created with
+        magic, slot_capacity, history_capacity = struct.unpack(
+            '<8sII', os.pread(self._fd, 16, 0))
+        if magic != self.MAGIC:
+            os.close(self._fd)
+            raise ValueError(f"{self.shared_file} is not an evolution counter file")
+        if (slot_capacity, history_capacity) != (self.slot_capacity, self.history_capacity):
+            self.slot_capacity, self.history_capacity = slot_capacity, history_capacity
+            self._history_offset = self._slots_offset + slot_capacity * self.SLOT.size
+            size = self._history_offset + history_capacity * self.HISTORY.size
+        self._map = mmap.mmap(self._fd, size)
+
+        for dimension in DIMENSIONS:
+            self._slot(dimension, self.OVERFLOW)
+
+    def _initialize(self, size):
+        """Write the header of a new file."""
+        if os.fstat(self._fd).st_size >= self.HEADER.size:
+            return
+        os.ftruncate(self._fd, size)
+        os.pwrite(self._fd, self.HEADER.pack(self.MAGIC, self.slot_capacity,
+                                             self.history_capacity, 0, 0, -1, -1, 0), 0)
+
+    def _locked(self, offset, length, fn):
+        """Run fn holding the cross-process lock on a byte range."""
+        # fcntl locks are per process, so threads also need an in-process
+        # lock; a forked child must not inherit one held by its parent
+        if self._thread_lock_pid != os.getpid():
+            self._thread_lock = threading.Lock()
+            self._thread_lock_pid = os.getpid()
+        with self._thread_lock:
+            self._fcntl.lockf(self._fd, self._fcntl.LOCK_EX, length, offset)
+            try:
+                return fn()
+            finally:
+                self._fcntl.lockf(self._fd, self._fcntl.LOCK_UN, length, offset)
+
+    def _add(self, offset, amount):
+        """Atomically add to the unsigned 64-bit counter at offset."""
+        def add():
+            value = struct.unpack_from('<Q', self._map, offset)[0] + amount
+            struct.pack_into('<Q', self._map, offset, value)
+            return value
+        return self._locked(offset, 8, add)
+
+    def _read_slot(self, index):
+        count, dimension, name_len, name = self.SLOT.unpack_from(
+            self._map, self._slots_offset + index * self.SLOT.size)
+        return count, DIMENSIONS[dimension], name[:name_len].decode('utf-8', 'ignore')
+
+    def _slots_used(self):
+        return struct.unpack_from('<I', self._map, self.SLOTS_USED_OFFSET)[0]
+
+    def _slot(self, dimension, value):
+        """Get the slot index of a value, allocating a slot if needed."""
+        # Look values up as they are stored, cut to NAME_SIZE bytes, so a
+        # long value matches the slot another process allocated for it
+        stored = value.encode('utf-8')[:self.NAME_SIZE]
+        key = (dimension, stored.decode('utf-8', 'ignore'))
+        index = self._slot_index.get(key)
+        if index is not None:
+            return index
+
+        def find_or_allocate():
+            used = self._slots_used()
+            for i in range(used):
+                _, slot_dimension, name = self._read_slot(i)
+                self._slot_index[(slot_dimension, name)] = i
+            if key in self._slot_index:
+                return self._slot_index[key]
+            if used >= self.slot_capacity:
+                return None
+            self.SLOT.pack_into(self._map, self._slots_offset + used * self.SLOT.size,
+                                0, DIMENSIONS.index(dimension), len(stored), stored)
+            struct.pack_into('<I', self._map, self.SLOTS_USED_OFFSET, used + 1)
+            self._slot_index[key] = used
+            return used
+
+        index = self._locked(self.SLOTS_USED_OFFSET, 4, find_or_allocate)
+        if index is None:
+            return self._slot(dimension, self.OVERFLOW)
+        return index
+
+    def record(self, event):
+        """
+        Record a generation event.
+
+        Args:
+            event: dict with timestamp, genre, mood and tempo
+        """
+        slots = [self._slot(dimension, str(event[dimension])) for dimension in DIMENSIONS]
+        for index in slots:
+            self._add(self._slots_offset + index * self.SLOT.size, 1)
+
+        # The new total is this event's sequence number and picks its history entry
+        sequence = self._add(self.TOTAL_OFFSET, 1)
+        timestamp = str(event.get('timestamp') or '').encode('utf-8')[:33]
+        position = (sequence - 1) % self.history_capacity
+        self.HISTORY.pack_into(self._map, self._history_offset + position * self.HISTORY.size,
+                               sequence, *slots, len(timestamp), timestamp)
+
+    def counts(self):
+        """Get the total and per-dimension counts."""
+        counts = {f'{d}_counts': {} for d in DIMENSIONS}
+        for i in range(self._slots_used()):
+            count, dimension, name = self._read_slot(i)
+            if count:
+                counts[f'{dimension}_counts'][name] = count
+        return {
+            'total_generations': struct.unpack_from('<Q', self._map, self.TOTAL_OFFSET)[0],
+            **counts
+        }
+
+    def top(self, dimension):
+        """Get the most common value of a dimension, or None."""
+        counts = self.counts()[f'{dimension}_counts']
+        if not counts:
+            return None
+        return max(counts.items(), key=lambda x: x[1])[0]
+
+    def set_derived(self, values):
+        """Store values computed by EvolutionEngine.evolve()."""
+        # Resolve slots before taking the derived-values lock
+        preferred = {dimension: self._slot(dimension, values[f'preferred_{dimension}'])
+                     for dimension in ('genre', 'mood')
+                     if values.get(f'preferred_{dimension}') is not None}
+
+        def write():
+            score, genre, mood = struct.unpack_from('<qii', self._map, self.DERIVED_OFFSET)
+            struct.pack_into('<qii', self._map, self.DERIVED_OFFSET,
+                             values.get('evolution_score', score),
+                             preferred.get('genre', genre), preferred.get('mood', mood))
+
+        self._locked(self.DERIVED_OFFSET, 16, write)
+
+    def get_derived(self, key, default=None):
+        """Get a value computed by EvolutionEngine.evolve()."""
+        score, genre, mood = struct.unpack_from('<qii', self._map, self.DERIVED_OFFSET)
+        if key == 'evolution_score':
+            return score
+        index = {'preferred_genre': genre, 'preferred_mood': mood}.get(key, -1)
+        if index < 0:
+            return default
+        return self._read_slot(index)[2]
+
+    def snapshot(self, recent=10):
+        """Get counts, derived values and the most recent generations."""
+        counts = self.counts()
+        total = counts['total_generations']
+
+        history = []
+        for sequence in range(max(total - min(recent, self.history_capacity), 0) + 1, total + 1):
+            position = (sequence - 1) % self.history_capacity
+            stored, *slots, ts_len, timestamp = self.HISTORY.unpack_from(
+                self._map, self._history_offset + position * self.HISTORY.size)
+            if stored != sequence:
+                continue  # Entry still being written or already overwritten
+            entry = {'timestamp': timestamp[:ts_len].decode('utf-8', 'ignore') or None}
+            for dimension, index in zip(DIMENSIONS, slots):
+                entry[dimension] = self._read_slot(index)[2]
+            history.append(entry)
+
+        return {
+            **counts,
+            'evolution_score': self.get_derived('evolution_score', 0),
+            'preferred_genre': self.get_derived('preferred_genre', 'unknown'),
+            'preferred_mood': self.get_derived('preferred_mood', 'unknown'),
+            'recent_generations': history
+        }
+
+    def flush(self):
+        """Ask the OS to write the shared pages back to the file."""
+        self._map.flush()
+
+    def close(self):
+        """Flush and unmap the shared file."""
+        if not self._map.closed:
+            self._map.flush()
+            self._map.close()
+            os.close(self._fd)
+
+    def persistence_stats(self):
+        """Get persistence counters."""
+        return {
+            'backend': 'shared',
+            'pending_updates': 0,
+            'slots_used': self._slots_used(),
+            'slot_capacity': self.slot_capacity
+        }
+
+
+def create_store(config):
+    """
+    Create the evolution store selected in the 'evolution' config section.
+
+    Args:
+        config: dict with backend ('json', 'sqlite' or 'shared') and
+            backend settings
+
+    Returns:
+        JSONEvolutionStore, SQLiteEvolutionStore or SharedMemoryEvolutionStore
+    """
+    backend = config.get('backend', 'json')
+
+    if backend == 'shared':
+        return SharedMemoryEvolutionStore(
+            shared_file=config.get('shared_file', 'evolution_shared.bin'),
+            slot_capacity=config.get('slot_capacity', 1024),
+            history_capacity=config.get('history_limit', 100)
+        )
+
+    if backend == 'sqlite':
+        return SQLiteEvolutionStore(db_file=config.get('db_file', 'evolution_stats.db'))
+
+    if backend == 'json':
+        return JSONEvolutionStore(
+            stats_file=config.get('stats_file', 'evolution_stats.json'),
+            history_limit=config.get('history_limit', 100),
+            flush_interval=config.get('flush_interval_seconds', 5.0),
+            flush_threshold=config.get('flush_threshold', 100)
+        )
+
+    raise ValueError(f"Unknown evolution backend: {backend}")
@@ -4,18 +4,40 @@ Generates album art and pictures with customizable parameters.
 """
 
 import random
-from pathlib import Path
+import zlib
+from functools import lru_cache
 from PIL import Image, ImageDraw, ImageFont
-import time
 
-OUTPUT_DIR = Path("output/images")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+from bounded_cache import BoundedLRUCache
+from output_store import OutputStore
+
+
+@lru_cache(maxsize=8)
+def _wave_offsets(width, height):
+    """Get the y offset of every wave point, keyed by (row, x)."""
+    # crc32 rather than hash() so waves are the same in every process
+    return {
+        (i, x): 25 * (1 + abs(zlib.crc32(str(x+i).encode()) % 100 - 50) / 50)
+        for i in range(0, height, 50)
+        for x in range(0, width, 20)
+    }
 
 
 class ImageGenerator:
     """Generate album art and images."""
     
-    def __init__(self):
+    # Only PIL is offered: a NumPy backend painting patterns into a pixel
+    # array measured slower than PIL's C drawing plus the cached background,
+    # so other values (such as 'numpy') fall back to PIL
+    RENDER_BACKENDS = ('pil',)
+    
+    def __init__(self, render_backend='pil', background_cache_size=32, output_store=None):
+        self.render_backend = render_backend
+        self.output_store = output_store or OutputStore()
+        
+        # Pre-rendered gradient backgrounds keyed by (layer, colors, width, height)
+        self.background_cache = BoundedLRUCache(max_size=background_cache_size)
+        
         self.color_schemes = {
             'happy': [(255, 223, 0), (255, 140, 0), (255, 69, 0)],  # Warm yellows/oranges
             'sad': [(70, 130, 180), (25, 25, 112), (72, 61, 139)],  # Blues/purples
@@ -37,62 +59,114 @@ class ImageGenerator:
             'blues': 'waves'
         }
     
-    def generate(self, customization):
+    def generate(self, customization, rng=None):
         """
         Generate an album art image.
         
         Args:
-            customization: dict with genre, mood, style
+            customization: dict with genre, mood, style and optional
+                render_backend (only 'pil' is supported)
+            rng: random.Random to draw from (defaults to the global generator)
             
         Returns:
             str: filename of generated image
         """
+        genre = customization.get('genre', 'pop')
+        image = self.render(customization, rng)
+        
+        # Save image
+        filename = self.output_store.allocate('images', 'art', genre, 'png')
+        with self.output_store.open(filename, 'wb') as output_file:
+            image.save(output_file, 'PNG')
+        
+        return filename
+    
+    def render(self, customization, rng=None):
+        """
+        Render an album art image in memory.
+        
+        Args:
+            customization: dict with genre, mood, style and optional
+                render_backend (only 'pil' is supported)
+            rng: random.Random to draw from (defaults to the global generator)
+            
+        Returns:
+            PIL.Image.Image: rendered image
+        """
+        if rng is None:
+            rng = random
+        
         genre = customization.get('genre', 'pop')
         mood = customization.get('mood', 'happy')
+        backend = customization.get('render_backend', self.render_backend)
+        if backend not in self.RENDER_BACKENDS:
+            backend = 'pil'
         
-        # Create image
         width, height = 800, 800
-        image = Image.new('RGB', (width, height), color='white')
-        draw = ImageDraw.Draw(image)
         
         # Get color scheme
         colors = self.color_schemes.get(mood, self.color_schemes['happy'])
         
+        # Pattern based on genre
+        pattern = self.genre_patterns.get(genre, 'circles')
+        
+        image = self.background_cache.get_or_create(
+            ('image', tuple(colors), width, height),
+            lambda: self._render_background(colors, width, height)
+        ).copy()
+        
+        draw = ImageDraw.Draw(image)
+        self._draw_pattern(draw, pattern, colors, width, height, rng)
+        self._draw_text(draw, genre, width, height)
+        
+        return image
+    
+    def get_cache_stats(self):
+        """Get hit/miss counters for the background layer cache."""
+        return self.background_cache.stats()
+    
+    def _render_background(self, colors, width, height):
+        """Render the mood gradient background as an image."""
+        image = Image.new('RGB', (width, height), color='white')
+        draw = ImageDraw.Draw(image)
+        
         # Fill background with gradient
         for y in range(height):
             color_index = int((y / height) * (len(colors) - 1))
             color = colors[color_index]
             draw.line([(0, y), (width, y)], fill=color)
         
-        # Add pattern based on genre
-        pattern = self.genre_patterns.get(genre, 'circles')
-        
+        return image
+    
+    def _draw_pattern(self, draw, pattern, colors, width, height, rng):
+        """Draw the genre pattern shape by shape onto the image."""
         if pattern == 'circles':
             for _ in range(20):
-                x = random.randint(0, width)
-                y = random.randint(0, height)
-                radius = random.randint(20, 100)
-                color = random.choice(colors)
+                x = rng.randint(0, width)
+                y = rng.randint(0, height)
+                radius = rng.randint(20, 100)
+                color = rng.choice(colors)
                 draw.ellipse([x-radius, y-radius, x+radius, y+radius], 
                            fill=color, outline=None)
         
         elif pattern == 'angular':
             for _ in range(15):
                 points = [
-                    (random.randint(0, width), random.randint(0, height)),
-                    (random.randint(0, width), random.randint(0, height)),
-                    (random.randint(0, width), random.randint(0, height))
+                    (rng.randint(0, width), rng.randint(0, height)),
+                    (rng.randint(0, width), rng.randint(0, height)),
+                    (rng.randint(0, width), rng.randint(0, height))
                 ]
-                color = random.choice(colors)
+                color = rng.choice(colors)
                 draw.polygon(points, fill=color)
         
         elif pattern == 'waves':
+            offsets = _wave_offsets(width, height)
             for i in range(0, height, 50):
                 points = []
                 for x in range(0, width, 20):
-                    y = i + 25 * (1 + abs(hash(str(x+i)) % 100 - 50) / 50)
+                    y = i + offsets[(i, x)]
                     points.append((x, y))
-                color = random.choice(colors)
+                color = rng.choice(colors)
                 for j in range(len(points) - 1):
                     draw.line([points[j], points[j+1]], fill=color, width=3)
         
@@ -100,21 +174,22 @@ class ImageGenerator:
             grid_size = 50
             for x in range(0, width, grid_size):
                 for y in range(0, height, grid_size):
-                    if random.random() > 0.5:
-                        color = random.choice(colors)
+                    if rng.random() > 0.5:
+                        color = rng.choice(colors)
                         draw.rectangle([x, y, x+grid_size, y+grid_size], 
                                      fill=color)
         
         else:  # default circles
             for _ in range(15):
-                x = random.randint(0, width)
-                y = random.randint(0, height)
-                radius = random.randint(30, 80)
-                color = random.choice(colors)
+                x = rng.randint(0, width)
+                y = rng.randint(0, height)
+                radius = rng.randint(30, 80)
+                color = rng.choice(colors)
                 draw.ellipse([x-radius, y-radius, x+radius, y+radius], 
                            fill=color, outline=None)
-        
-        # Add text overlay
+    
+    def _draw_text(self, draw, genre, width, height):
+        """Add the genre name as a text overlay."""
         try:
             # Try to use default font, fallback to basic if not available
             font_size = 60
@@ -132,24 +207,3 @@ class ImageGenerator:
             draw.text((text_x, text_y), text, fill=(255, 255, 255))
         except:
             pass  # Skip text if font issues
-        
-        # Save image
-        import re
-        # Sanitize genre to prevent path injection
-        safe_genre = re.sub(r'[^a-zA-Z0-9_-]', '', str(genre))
-        
-        filename = f"art_{int(time.time())}_{safe_genre}.png"
-        filepath = OUTPUT_DIR / filename
-        
-        # Ensure we're writing within OUTPUT_DIR
-        filepath = filepath.resolve()
-        output_base = OUTPUT_DIR.resolve()
-        
-        try:
-            filepath.relative_to(output_base)
-        except ValueError:
-            raise ValueError("Invalid file path")
-        
-        image.save(filepath, 'PNG')
-        
-        return f"images/{filename}"
@@ -0,0 +1,142 @@
+"""
+Job Queue Module
+Runs long generation batches in the background and tracks their progress.
+"""
+
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+
+class JobQueueFull(RuntimeError):
+    """Raised when the backlog of queued jobs is at its limit."""
+
+
+class Job:
+    """A queued generation batch and its partial results."""
+
+    def __init__(self, job_id, total):
+        self.id = job_id
+        self.total = total
+        self.status = 'queued'
+        self.error = None
+        self.results = []
+        self.created_at = datetime.now().isoformat()
+        self.started_at = None
+        self.finished_at = None
+        self._lock = threading.Lock()
+
+    def add_result(self, item):
+        """Record one finished item."""
+        with self._lock:
+            self.results.append(item)
+
+    def _set_status(self, status, error=None):
+        with self._lock:
+            self.status = status
+            self.error = error
+            if status == 'running':
+                self.started_at = datetime.now().isoformat()
+            elif status in ('completed', 'failed'):
+                self.finished_at = datetime.now().isoformat()
+
+    @property
+    def finished(self):
+        return self.status in ('completed', 'failed')
+
+    def to_dict(self):
+        """Get a JSON-serializable snapshot of the job."""
+        with self._lock:
+            completed = len(self.results)
+            return {
+                'job_id': self.id,
+                'status': self.status,
+                'total': self.total,
+                'completed': completed,
+                'progress': completed / self.total if self.total else 1.0,
+                'results': list(self.results),
+                'error': self.error,
+                'created_at': self.created_at,
+                'started_at': self.started_at,
+                'finished_at': self.finished_at
+            }
+
+
+class JobQueue:
+    """In-process job queue with a fixed number of scheduler threads."""
+
+    def __init__(self, max_running_jobs=2, max_retained_jobs=100, max_queued_jobs=None):
+        """
+        Create a job queue.
+
+        Args:
+            max_running_jobs: number of jobs that run at the same time
+            max_retained_jobs: number of finished jobs kept for polling
+            max_queued_jobs: number of jobs that may wait for a scheduler
+                thread (None for no limit)
+        """
+        self.max_retained_jobs = max_retained_jobs
+        self.max_queued_jobs = max_queued_jobs
+        self._queued = 0
+        self._scheduler = ThreadPoolExecutor(max_workers=max_running_jobs,
+                                             thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, fn, total, *args):
+        """
+        Queue a job.
+
+        Args:
+            fn: callable run as fn(job, *args) on a scheduler thread; it
+                reports items through job.add_result()
+            total: number of items the job will produce
+            *args: extra arguments for fn
+
+        Returns:
+            Job: the queued job
+
+        Raises:
+            JobQueueFull: if max_queued_jobs jobs are already waiting
+        """
+        job = Job(uuid.uuid4().hex, total)
+        with self._lock:
+            if self.max_queued_jobs is not None and self._queued >= self.max_queued_jobs:
+                raise JobQueueFull(f"{self._queued} jobs are already queued")
+            self._queued += 1
+            self._jobs[job.id] = job
+            self._evict_finished()
+        self._scheduler.submit(self._run, job, fn, args)
+        return job
+
+    def get(self, job_id):
+        """Get a job by id, or None if it is unknown or was evicted."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def shutdown(self, wait=True):
+        """Stop accepting jobs and shut down the scheduler."""
+        self._scheduler.shutdown(wait=wait)
+
+    def _run(self, job, fn, args):
+        with self._lock:
+            self._queued -= 1
+        job._set_status('running')
+        try:
+            fn(job, *args)
+        except Exception as e:
+            import logging
+            logging.error(f"Error running job {job.id}: {str(e)}")
+            job._set_status('failed', 'An error occurred while generating content.')
+        else:
+            job._set_status('completed')
+
+    def _evict_finished(self):
+        """Drop the oldest finished jobs beyond the retention limit."""
+        excess = len(self._jobs) - self.max_retained_jobs
+        if excess <= 0:
+            return
+        for job_id in [job_id for job_id, job in self._jobs.items() if job.finished][:excess]:
+            del self._jobs[job_id]
@@ -0,0 +1,85 @@
+"""
+Lazy Module
+Proxies that build an object, and import its module, on first use.
+
+app.py creates its generators and stores through LazyObject, so importing
+the app, or starting a new worker process, does not pay for NumPy, Pillow,
+midiutil, opening databases or parsing the statistics file until a request
+actually needs them. warm_up() builds them ahead of time instead.
+"""
+
+import threading
+import time
+
+
+class LazyObject:
+    """Stand-in for an object that is built by a factory on first use."""
+
+    __slots__ = ('_lazy_factory', '_lazy_target', '_lazy_lock', '_lazy_name')
+
+    def __init__(self, factory, name=None):
+        """
+        Create a proxy.
+
+        Args:
+            factory: zero-argument callable that builds the real object
+            name: label used by warm_up and repr (defaults to the factory name)
+        """
+        object.__setattr__(self, '_lazy_factory', factory)
+        object.__setattr__(self, '_lazy_target', None)
+        object.__setattr__(self, '_lazy_lock', threading.Lock())
+        object.__setattr__(self, '_lazy_name', name or factory.__name__)
+
+    def _resolve(self):
+        target = self._lazy_target
+        if target is None:
+            with self._lazy_lock:
+                target = self._lazy_target
+                if target is None:
+                    target = self._lazy_factory()
+                    object.__setattr__(self, '_lazy_target', target)
+        return target
+
+    def __getattr__(self, name):
+        return getattr(self._resolve(), name)
+
+    def __setattr__(self, name, value):
+        setattr(self._resolve(), name, value)
+
+    def __repr__(self):
+        if self._lazy_target is None:
+            return f"<LazyObject {self._lazy_name} (not built)>"
+        return repr(self._lazy_target)
+
+
+def is_built(obj):
+    """Check whether a LazyObject has built its target (True for other objects)."""
+    if isinstance(obj, LazyObject):
+        return obj._lazy_target is not None
+    return True
+
+
+def resolve(obj):
+    """Get the real object behind a LazyObject, building it if needed."""
+    if isinstance(obj, LazyObject):
+        return obj._resolve()
+    return obj
+
+
+def warm_up(objects):
+    """
+    Build every lazy object now.
+
+    Args:
+        objects: iterable of LazyObject
+
+    Returns:
+        dict: milliseconds spent building each one, by name (0 if it was
+            already built)
+    """
+    timings = {}
+    for obj in objects:
+        start = time.perf_counter()
+        resolve(obj)
+        timings[obj._lazy_name] = (time.perf_counter() - start) * 1000
+    return timings
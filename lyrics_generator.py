@@ -3,13 +3,34 @@ Lyrics Generator Module
 Generates song lyrics with customizable parameters.
 """
 
+import logging
 import random
 
+from markov_lyrics import MarkovTables
+
 
 class LyricsGenerator:
     """Generate song lyrics based on genre and mood."""
     
-    def __init__(self):
+    # 'template' fills fixed line templates; 'markov' samples lines from the
+    # transition tables built by markov_lyrics.py
+    ENGINES = ('template', 'markov')
+    
+    def __init__(self, engine='template', tables_file="lyrics_corpus/tables.npz"):
+        """
+        Create a lyrics generator.
+        
+        Args:
+            engine: default engine, 'template' or 'markov'
+            tables_file: tables built by markov_lyrics.py (loaded lazily)
+        """
+        if engine not in self.ENGINES:
+            raise ValueError(f"Unknown lyrics engine: {engine}")
+        
+        self.engine = engine
+        self.markov = MarkovTables(tables_file)
+        self._markov_warned = False
+        
         # Word banks for different genres and moods
         self.themes = {
             'happy': ['sunshine', 'dancing', 'love', 'summer', 'freedom', 'joy', 'laughter'],
@@ -48,16 +69,23 @@ class LyricsGenerator:
             "Can't stop the {theme}\nWe {verb} all night\n{theme} feels so right\nWe {verb} into the light"
         ]
     
-    def generate(self, customization):
+    def generate(self, customization, rng=None):
         """
         Generate song lyrics.
         
+        Customization 'lyrics_engine' ('template' or 'markov') overrides
+        the default engine.
+        
         Args:
             customization: dict with genre, mood
+            rng: random.Random to draw from (defaults to the global generator)
             
         Returns:
             str: generated lyrics
         """
+        if rng is None:
+            rng = random
+        
         mood = customization.get('mood', 'happy')
         genre = customization.get('genre', 'pop')
         
@@ -65,31 +93,47 @@ class LyricsGenerator:
         theme_list = self.themes.get(mood, self.themes['happy'])
         verb_list = self.verbs.get(mood, self.verbs['happy'])
         
+        table = None
+        if customization.get('lyrics_engine', self.engine) == 'markov':
+            table = self._markov_table(mood, genre)
+        
+        if table is not None:
+            def make_line():
+                return self.markov.line(table, rng)
+            
+            def make_chorus():
+                return "\n".join(make_line() for _ in range(4))
+        else:
+            def make_line():
+                template = rng.choice(self.templates)
+                return template.format(
+                    theme=rng.choice(theme_list),
+                    verb=rng.choice(verb_list)
+                )
+            
+            def make_chorus():
+                chorus_template = rng.choice(self.chorus_templates)
+                return chorus_template.format(
+                    theme=rng.choice(theme_list),
+                    verb=rng.choice(verb_list)
+                )
+        
         lyrics_parts = []
         
         # Title
-        title = f"{random.choice(theme_list).title()} {random.choice(['Dreams', 'Nights', 'Days', 'Hearts', 'Souls'])}"
+        title = f"{rng.choice(theme_list).title()} {rng.choice(['Dreams', 'Nights', 'Days', 'Hearts', 'Souls'])}"
         lyrics_parts.append(f"=== {title} ===\n")
         
         # Verse 1
         lyrics_parts.append("[Verse 1]")
         for _ in range(4):
-            template = random.choice(self.templates)
-            line = template.format(
-                theme=random.choice(theme_list),
-                verb=random.choice(verb_list)
-            )
-            lyrics_parts.append(line)
+            lyrics_parts.append(make_line())
         
         lyrics_parts.append("")
         
         # Chorus
         lyrics_parts.append("[Chorus]")
-        chorus_template = random.choice(self.chorus_templates)
-        chorus = chorus_template.format(
-            theme=random.choice(theme_list),
-            verb=random.choice(verb_list)
-        )
+        chorus = make_chorus()
         lyrics_parts.append(chorus)
         
         lyrics_parts.append("")
@@ -97,12 +141,7 @@ class LyricsGenerator:
         # Verse 2
         lyrics_parts.append("[Verse 2]")
         for _ in range(4):
-            template = random.choice(self.templates)
-            line = template.format(
-                theme=random.choice(theme_list),
-                verb=random.choice(verb_list)
-            )
-            lyrics_parts.append(line)
+            lyrics_parts.append(make_line())
         
         lyrics_parts.append("")
         
@@ -115,12 +154,7 @@ class LyricsGenerator:
         # Bridge
         lyrics_parts.append("[Bridge]")
         for _ in range(2):
-            template = random.choice(self.templates)
-            line = template.format(
-                theme=random.choice(theme_list),
-                verb=random.choice(verb_list)
-            )
-            lyrics_parts.append(line)
+            lyrics_parts.append(make_line())
         
         lyrics_parts.append("")
         
@@ -129,3 +163,13 @@ class LyricsGenerator:
         lyrics_parts.append(chorus)
         
         return "\n".join(lyrics_parts)
+    
+    def _markov_table(self, mood, genre):
+        """Get the Markov table for a mood and genre, or None if unavailable."""
+        if self.markov.available():
+            return self.markov.table_name(mood, genre) or self.markov.table_name('happy')
+        if not self._markov_warned:
+            self._markov_warned = True
+            logging.warning(f"Lyrics tables {self.markov.tables_file} not found; "
+                            "run 'python markov_lyrics.py build'. Using templates.")
+        return None
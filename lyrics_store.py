@@ -0,0 +1,183 @@
+"""
+Lyrics Store Module
+Keeps generated lyrics in one SQLite database instead of one file per item.
+
+Lyrics are buffered in memory and written in batches, one transaction per
+batch, so a large generation batch costs a handful of commits rather than an
+open/write/close per item, and the output directory does not fill up with
+thousands of tiny files. Buffered lyrics are readable immediately.
+
+The database lives outside the directories retention manages, so app.py
+calls prune() after every retention sweep to expire old rows and keep the
+table under a row quota.
+"""
+
+import atexit
+import os
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+class LyricsStore:
+    """Batched lyrics storage in a SQLite database in WAL mode."""
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS lyrics (
+            item_id TEXT PRIMARY KEY,
+            created_at TEXT NOT NULL,
+            genre TEXT,
+            mood TEXT,
+            text TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS lyrics_created_at ON lyrics (created_at);
+    """
+
+    def __init__(self, db_file="lyrics.db", batch_size=100, busy_timeout=30.0):
+        """
+        Create a lyrics store.
+
+        Args:
+            db_file: path of the SQLite database
+            batch_size: buffered lyrics that trigger a write
+            busy_timeout: seconds to wait for another writer's lock
+        """
+        self.db_file = Path(db_file)
+        self.batch_size = batch_size
+        self.busy_timeout = busy_timeout
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._pending = {}
+
+        # Counters
+        self.writes = 0
+        self.rows_written = 0
+        self.last_write_ms = None
+        self.pruned_rows = 0
+
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        with self._connect() as conn:
+            conn.executescript(self.SCHEMA)
+        atexit.register(self.flush)
+
+    def _connect(self):
+        """Get this thread's connection, opening a new one after a fork."""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.db_file, timeout=self.busy_timeout)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def put(self, item_id, text, customization=None):
+        """
+        Store lyrics for an item, writing the buffer once it is full.
+
+        Args:
+            item_id: id of the generated item
+            text: the lyrics
+            customization: dict with the genre and mood they were made for
+        """
+        customization = customization or {}
+        row = (item_id, datetime.now().isoformat(),
+               customization.get('genre'), customization.get('mood'), text)
+        with self._lock:
+            self._pending[item_id] = row
+            full = len(self._pending) >= self.batch_size
+        if full:
+            self.flush()
+
+    def get(self, item_id):
+        """
+        Get the lyrics of an item.
+
+        Returns:
+            str or None: the lyrics, or None if the id is unknown
+        """
+        with self._lock:
+            row = self._pending.get(item_id)
+        if row is not None:
+            return row[4]
+
+        found = self._connect().execute(
+            "SELECT text FROM lyrics WHERE item_id = ?", (item_id,)
+        ).fetchone()
+        return found[0] if found else None
+
+    def flush(self):
+        """Write all buffered lyrics in one transaction."""
+        with self._lock:
+            rows = list(self._pending.values())
+        if not rows:
+            return
+
+        start = time.perf_counter()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO lyrics (item_id, created_at, genre, mood, text) "
+                "VALUES (?, ?, ?, ?, ?)", rows)
+
+        with self._lock:
+            # Drop what was written, keeping anything re-buffered meanwhile
+            for row in rows:
+                if self._pending.get(row[0]) is row:
+                    del self._pending[row[0]]
+            self.writes += 1
+            self.rows_written += len(rows)
+            self.last_write_ms = (time.perf_counter() - start) * 1000
+
+    def prune(self, max_age_seconds=None, max_rows=None):
+        """
+        Delete stored lyrics older than max_age_seconds, then the oldest
+        rows beyond max_rows. Buffered lyrics are not affected.
+
+        Returns:
+            int: number of rows deleted
+        """
+        deleted = 0
+        conn = self._connect()
+        with conn:
+            if max_age_seconds is not None:
+                cutoff = datetime.fromtimestamp(time.time() - max_age_seconds).isoformat()
+                deleted += conn.execute(
+                    "DELETE FROM lyrics WHERE created_at < ?", (cutoff,)).rowcount
+            if max_rows is not None:
+                deleted += conn.execute(
+                    "DELETE FROM lyrics WHERE item_id IN (SELECT item_id FROM lyrics "
+                    "ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (max_rows,)).rowcount
+        if deleted:
+            # Hand the freed pages back from the write-ahead log
+            conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+            with self._lock:
+                self.pruned_rows += deleted
+        return deleted
+
+    def disk_usage(self):
+        """
+        Get the size of the database and its WAL and shared-memory files.
+
+        Returns:
+            dict: bytes on disk and rows deleted by prune()
+        """
+        size = 0
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                size += os.stat(f"{self.db_file}{suffix}").st_size
+            except OSError:
+                pass
+        with self._lock:
+            return {'bytes': size, 'pruned_rows': self.pruned_rows}
+
+    def stats(self):
+        """Get write counters."""
+        with self._lock:
+            return {
+                'pending': len(self._pending),
+                'writes': self.writes,
+                'rows_written': self.rows_written,
+                'last_write_ms': self.last_write_ms
+            }
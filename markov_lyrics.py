@@ -0,0 +1,238 @@
+"""
+Markov Lyrics Module
+Statistical lyrics lines sampled from n-gram transition tables.
+
+Tables are built offline (python markov_lyrics.py build) from the text files
+in lyrics_corpus/, one table per file: happy.txt gives the 'happy' table,
+and a genre-specific file such as rock-dark.txt is preferred over dark.txt
+when both exist. Each line of a corpus file is one lyric line.
+
+For every n-gram state the table stores its possible next words as a Vose
+alias table (probability and alias arrays), so each word is drawn in O(1)
+with a single random number. Tables are saved as flat NumPy arrays in one
+.npz file and loaded lazily, one table at a time; NumPy itself is only
+imported once tables are built or loaded, so the template engine never
+pays for it.
+"""
+
+import argparse
+import threading
+from collections import Counter, defaultdict
+from pathlib import Path
+
+
+START = '<s>'
+END = '</s>'
+
+
+def build_alias(weights):
+    """
+    Build a Vose alias table.
+
+    Args:
+        weights: positive weights of the outcomes
+
+    Returns:
+        tuple: (probabilities, aliases) lists of the same length
+    """
+    count = len(weights)
+    total = float(sum(weights))
+    scaled = [w * count / total for w in weights]
+    prob = [0.0] * count
+    alias = list(range(count))
+
+    small = [i for i, p in enumerate(scaled) if p < 1.0]
+    large = [i for i, p in enumerate(scaled) if p >= 1.0]
+    while small and large:
+        less, more = small.pop(), large.pop()
+        prob[less] = scaled[less]
+        alias[less] = more
+        scaled[more] -= 1.0 - scaled[less]
+        (small if scaled[more] < 1.0 else large).append(more)
+    for i in small + large:
+        prob[i] = 1.0
+
+    return prob, alias
+
+
+def build_table(lines, order=1):
+    """
+    Build the arrays of one transition table.
+
+    Args:
+        lines: iterable of lyric lines
+        order: number of previous words that pick the next one
+
+    Returns:
+        dict: vocab, states, offsets, next_words, probs and aliases arrays
+    """
+    import numpy as np
+
+    transitions = defaultdict(Counter)
+    for line in lines:
+        words = line.lower().split()
+        if not words:
+            continue
+        state = (START,) * order
+        for word in words + [END]:
+            transitions[state][word] += 1
+            state = state[1:] + (word,)
+
+    vocab = [START, END] + sorted({w for c in transitions.values() for w in c} - {START, END})
+    word_ids = {word: i for i, word in enumerate(vocab)}
+
+    states, offsets, next_words, probs, aliases = [], [0], [], [], []
+    for state in sorted(transitions):
+        counts = transitions[state]
+        words = sorted(counts)
+        prob, alias = build_alias([counts[w] for w in words])
+        states.append([word_ids[w] for w in state])
+        next_words.extend(word_ids[w] for w in words)
+        probs.extend(prob)
+        aliases.extend(alias)
+        offsets.append(len(next_words))
+
+    return {
+        'vocab': np.frombuffer('\n'.join(vocab).encode('utf-8'), dtype=np.uint8),
+        'states': np.array(states, dtype=np.int32).reshape(-1, order),
+        'offsets': np.array(offsets, dtype=np.int32),
+        'next_words': np.array(next_words, dtype=np.int32),
+        'probs': np.array(probs, dtype=np.float32),
+        'aliases': np.array(aliases, dtype=np.int32)
+    }
+
+
+def build_tables(source_dir, output_file, order=1):
+    """
+    Build a table for every .txt file in source_dir and save them together.
+
+    Returns:
+        dict: number of lines per table
+    """
+    import numpy as np
+
+    arrays = {}
+    summary = {}
+    for path in sorted(Path(source_dir).glob('*.txt')):
+        lines = path.read_text(encoding='utf-8').splitlines()
+        for name, array in build_table(lines, order).items():
+            arrays[f'{path.stem}/{name}'] = array
+        summary[path.stem] = sum(1 for line in lines if line.strip())
+
+    output_file = Path(output_file)
+    output_file.parent.mkdir(parents=True, exist_ok=True)
+    np.savez(output_file, order=np.array(order), **arrays)
+    return summary
+
+
+class _Table:
+    """One loaded transition table, unpacked for fast scalar access."""
+
+    def __init__(self, arrays, order):
+        self.order = order
+        self.vocab = bytes(arrays['vocab']).decode('utf-8').split('\n')
+        offsets = arrays['offsets'].tolist()
+        self.states = {tuple(state): (offsets[i], offsets[i + 1] - offsets[i])
+                       for i, state in enumerate(arrays['states'].tolist())}
+        self.next_words = arrays['next_words'].tolist()
+        self.probs = arrays['probs'].tolist()
+        self.aliases = arrays['aliases'].tolist()
+
+
+class MarkovTables:
+    """Lazily loaded transition tables that sample lyric lines."""
+
+    def __init__(self, tables_file):
+        """
+        Create a table set; nothing is read until a line is sampled.
+
+        Args:
+            tables_file: .npz file written by build_tables
+        """
+        self.tables_file = Path(tables_file)
+        self._archive = None
+        self._names = set()
+        self._tables = {}
+        self._lock = threading.Lock()
+
+    def available(self):
+        """Check that the tables have been built."""
+        return self.tables_file.is_file()
+
+    def table_name(self, mood, genre=None):
+        """Get the best table for a mood and genre, or None."""
+        self._open()
+        for name in (f'{genre}-{mood}', mood):
+            if name in self._names:
+                return name
+        return None
+
+    def _open(self):
+        if self._archive is None:
+            with self._lock:
+                if self._archive is None:
+                    import numpy as np
+                    archive = np.load(self.tables_file)
+                    self._names = {key.split('/')[0] for key in archive.files if '/' in key}
+                    self._archive = archive
+        return self._archive
+
+    def _table(self, name):
+        table = self._tables.get(name)
+        if table is None:
+            archive = self._open()
+            with self._lock:
+                table = self._tables.get(name)
+                if table is None:
+                    table = _Table({key: archive[f'{name}/{key}'] for key in
+                                    ('vocab', 'states', 'offsets', 'next_words', 'probs', 'aliases')},
+                                   int(archive['order']))
+                    self._tables[name] = table
+        return table
+
+    def line(self, name, rng, max_words=12):
+        """
+        Sample one lyric line.
+
+        Args:
+            name: table name from table_name()
+            rng: random.Random to draw from
+            max_words: longest line produced
+
+        Returns:
+            str: the line, capitalized
+        """
+        table = self._table(name)
+        state = (0,) * table.order  # START
+        words = []
+        for _ in range(max_words):
+            offset, count = table.states[state]
+            # One uniform draw picks both the column and the coin flip
+            draw = rng.random() * count
+            column = int(draw)
+            if draw - column >= table.probs[offset + column]:
+                column = table.aliases[offset + column]
+            word = table.next_words[offset + column]
+            if word == 1:  # END
+                break
+            words.append(table.vocab[word])
+            state = state[1:] + (word,)
+
+        line = ' '.join(words)
+        return line[:1].upper() + line[1:]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the Markov lyrics tables.")
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--source', default='lyrics_corpus', help='directory of .txt corpora')
+    parser.add_argument('--output', default='lyrics_corpus/tables.npz', help='tables file to write')
+    parser.add_argument('--order', type=int, default=1, help='words of context per draw')
+    args = parser.parse_args()
+
+    summary = build_tables(args.source, args.output, args.order)
+    print(f"Built {len(summary)} tables from {sum(summary.values())} lines -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,231 @@
+"""
+Metrics Module
+In-process latency histograms and counters, exported as Prometheus text.
+
+Each pipeline stage (a generator call, saving lyrics, evolving) records its
+latency in a fixed-bucket histogram, so an observation is one bisect and
+two additions under a lock and memory does not grow with traffic. The
+p50/p95/p99 quantiles are estimated from the buckets the same way
+Prometheus' histogram_quantile() does, by interpolating within a bucket.
+
+Metrics live in the process that records them. Work that may run in a
+worker process times its stages with a StageTimer and hands the
+observations back, to be recorded with Metrics.observe_all.
+"""
+
+import bisect
+import threading
+import time
+from contextlib import contextmanager
+
+
+# Bucket upper bounds in seconds, from 10 us to 10 s
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001,
+    0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+
+def _format_value(value):
+    """Format a sample value the way Prometheus text exposition expects."""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, int):
+        return str(value)
+    return repr(float(value))
+
+
+class Histogram:
+    """Cumulative latency histogram with fixed bucket bounds."""
+
+    def __init__(self, buckets=DEFAULT_BUCKETS):
+        self.buckets = tuple(sorted(buckets))
+        # One count per bucket plus the +Inf overflow bucket
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        """Record one observation (not thread-safe; see Metrics)."""
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        """
+        Estimate a quantile from the bucket counts.
+
+        Args:
+            q: quantile between 0 and 1
+
+        Returns:
+            float or None: the estimate, or None with no observations
+        """
+        if not self.count:
+            return None
+
+        rank = q * self.count
+        cumulative = 0
+        for i, bucket_count in enumerate(self.counts):
+            if cumulative + bucket_count >= rank and bucket_count:
+                if i == len(self.buckets):
+                    # Beyond the last bound; report the largest known bound
+                    return self.buckets[-1]
+                lower = self.buckets[i - 1] if i else 0.0
+                upper = self.buckets[i]
+                return lower + (upper - lower) * (rank - cumulative) / bucket_count
+            cumulative += bucket_count
+        return self.buckets[-1]
+
+
+class StageTimer:
+    """Collects stage latencies to be recorded later, possibly elsewhere."""
+
+    def __init__(self):
+        # (stage, seconds) pairs, picklable so they can leave a worker process
+        self.observations = []
+
+    @contextmanager
+    def time(self, stage):
+        """Time the enclosed block as one run of a stage, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observations.append((stage, time.perf_counter() - start))
+
+
+class Metrics:
+    """Thread-safe registry of per-stage latencies and per-type counts."""
+
+    def __init__(self, namespace='music_ai', buckets=DEFAULT_BUCKETS):
+        """
+        Create a registry.
+
+        Args:
+            namespace: prefix of every exported metric name
+            buckets: histogram bucket upper bounds in seconds
+        """
+        self.namespace = namespace
+        self.buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._stages = {}
+        self._items = {}
+        self._errors = {}
+        self._coalesced = {}
+
+    def observe(self, stage, seconds):
+        """Record the latency of one run of a stage."""
+        with self._lock:
+            histogram = self._stages.get(stage)
+            if histogram is None:
+                histogram = self._stages[stage] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    @contextmanager
+    def time(self, stage):
+        """Time the enclosed block as one run of a stage, even if it raises."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(stage, time.perf_counter() - start)
+
+    def observe_all(self, observations):
+        """Record (stage, seconds) pairs, e.g. from a StageTimer."""
+        with self._lock:
+            for stage, seconds in observations:
+                histogram = self._stages.get(stage)
+                if histogram is None:
+                    histogram = self._stages[stage] = Histogram(self.buckets)
+                histogram.observe(seconds)
+
+    def count_item(self, content_type, amount=1):
+        """Count generated items of a content type."""
+        with self._lock:
+            self._items[content_type] = self._items.get(content_type, 0) + amount
+
+    def count_error(self, content_type, amount=1):
+        """Count failed generations of a content type."""
+        with self._lock:
+            self._errors[content_type] = self._errors.get(content_type, 0) + amount
+
+    def count_coalesced(self, content_type, amount=1):
+        """Count generations served by an identical in-flight generation."""
+        with self._lock:
+            self._coalesced[content_type] = self._coalesced.get(content_type, 0) + amount
+
+    def snapshot(self):
+        """
+        Get the current values.
+
+        Returns:
+            dict: stages (count, sum and quantiles per stage), items, errors,
+                coalesced
+        """
+        with self._lock:
+            stages = {}
+            for stage, histogram in self._stages.items():
+                stages[stage] = {
+                    'count': histogram.count,
+                    'sum': histogram.sum,
+                    **{f'p{round(q * 100)}': histogram.quantile(q) for q in QUANTILES}
+                }
+            return {
+                'stages': stages,
+                'items': dict(self._items),
+                'errors': dict(self._errors),
+                'coalesced': dict(self._coalesced)
+            }
+
+    def render(self):
+        """
+        Export every metric in the Prometheus text exposition format.
+
+        Returns:
+            str: the exposition, ending with a newline
+        """
+        prefix = self.namespace
+        lines = []
+        with self._lock:
+            stages = sorted(self._stages.items())
+
+            name = f'{prefix}_stage_duration_seconds'
+            lines.append(f'# HELP {name} Latency of each generation stage.')
+            lines.append(f'# TYPE {name} histogram')
+            for stage, histogram in stages:
+                cumulative = 0
+                bounds = self.buckets + (float('inf'),)
+                for bound, bucket_count in zip(bounds, histogram.counts):
+                    cumulative += bucket_count
+                    lines.append(f'{name}_bucket{{stage="{stage}",le="{_format_value(bound)}"}} '
+                                 f'{cumulative}')
+                lines.append(f'{name}_sum{{stage="{stage}"}} {_format_value(histogram.sum)}')
+                lines.append(f'{name}_count{{stage="{stage}"}} {histogram.count}')
+
+            name = f'{prefix}_stage_latency_quantile_seconds'
+            lines.append(f'# HELP {name} Latency quantiles of each stage, estimated from '
+                         f'the histogram buckets.')
+            lines.append(f'# TYPE {name} gauge')
+            for stage, histogram in stages:
+                for q in QUANTILES:
+                    value = histogram.quantile(q)
+                    if value is not None:
+                        lines.append(f'{name}{{stage="{stage}",quantile="{q}"}} '
+                                     f'{_format_value(value)}')
+
+            for suffix, counts, help_text in (
+                ('items_total', self._items, 'Generated items by content type.'),
+                ('errors_total', self._errors, 'Failed generations by content type.'),
+                ('coalesced_total', self._coalesced,
+                 'Generations served by an identical in-flight generation, by content type.')
+            ):
+                name = f'{prefix}_{suffix}'
+                lines.append(f'# HELP {name} {help_text}')
+                lines.append(f'# TYPE {name} counter')
+                for content_type, value in sorted(counts.items()):
+                    lines.append(f'{name}{{content_type="{content_type}"}} {value}')
+
+        return '\n'.join(lines) + '\n'
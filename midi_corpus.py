@@ -0,0 +1,348 @@
+"""
+MIDI Corpus Module
+Builds a compact melody model from the MIDI library in soundfonts/ and
+samples melodies from it.
+
+The index is built offline (python midi_corpus.py build) and holds:
+
+- note transitions: 12x12 counts of scale-relative pitch class -> next one
+- rhythm histogram: note lengths in sixteenth notes (1-16)
+- key statistics: detected key of each file and pitch-class totals
+
+It is a small header followed by little-endian uint32 arrays, opened with
+numpy.memmap the first time a melody is sampled, so loading it costs nothing
+at startup and the arrays are never copied into the process.
+"""
+
+import argparse
+import logging
+import struct
+import threading
+from pathlib import Path
+
+import numpy as np
+
+
+INDEX_MAGIC = b'MCIX'
+INDEX_VERSION = 1
+HEADER = struct.Struct('<4sHHII48x')
+
+# Array layout after the header: (name, shape)
+LAYOUT = (
+    ('transitions', (12, 12)),
+    ('rhythm', (16,)),
+    ('key_counts', (12,)),
+    ('pitch_classes', (12,))
+)
+
+DRUM_CHANNEL = 9
+
+# Krumhansl-Kessler major key profile, used to detect each file's key
+MAJOR_PROFILE = np.array([6.35, 2.23, 3.48, 2.33, 4.38, 4.09,
+                          2.52, 5.19, 2.39, 3.66, 2.29, 2.88])
+
+
+def _read_varlen(data, pos):
+    """Read a MIDI variable-length quantity, returning (value, new position)."""
+    value = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        value = (value << 7) | (byte & 0x7F)
+        if not byte & 0x80:
+            return value, pos
+
+
+def parse_midi(path):
+    """
+    Read the notes of a standard MIDI file.
+
+    Args:
+        path: .mid or .kar file
+
+    Returns:
+        tuple: (ticks per quarter note, list of (track, channel, start tick,
+            pitch, duration ticks, velocity))
+
+    Raises:
+        ValueError: if the file is not a supported MIDI file
+    """
+    data = Path(path).read_bytes()
+    if data[:4] != b'MThd':
+        raise ValueError(f"{path} is not a MIDI file")
+    header_length, _, track_count, division = struct.unpack('>IHHH', data[4:14])
+    if division & 0x8000:
+        raise ValueError(f"{path} uses SMPTE timing")
+
+    notes = []
+    pos = 8 + header_length
+    for track in range(track_count):
+        if data[pos:pos + 4] != b'MTrk':
+            break
+        length = struct.unpack('>I', data[pos + 4:pos + 8])[0]
+        end = min(pos + 8 + length, len(data))
+        try:
+            _parse_track(data, pos + 8, end, track, notes)
+        except IndexError:
+            pass  # Truncated track: keep the notes read so far
+        pos = end
+
+    return division, notes
+
+
+def _parse_track(data, pos, end, track, notes):
+    """Append the notes of one MTrk chunk to notes."""
+    tick = 0
+    status = 0
+    active = {}
+    while pos < end:
+        delta, pos = _read_varlen(data, pos)
+        tick += delta
+
+        if data[pos] & 0x80:
+            status = data[pos]
+            pos += 1
+
+        if status == 0xFF:
+            pos += 1  # meta type
+            length, pos = _read_varlen(data, pos)
+            pos += length
+            continue
+        if status in (0xF0, 0xF7):
+            length, pos = _read_varlen(data, pos)
+            pos += length
+            continue
+
+        kind = status & 0xF0
+        channel = status & 0x0F
+        if kind in (0xC0, 0xD0):
+            pos += 1
+            continue
+
+        first, second = data[pos], data[pos + 1]
+        pos += 2
+        if kind == 0x90 and second > 0:
+            active[(channel, first)] = (tick, second)
+        elif kind in (0x80, 0x90):
+            started = active.pop((channel, first), None)
+            if started is not None and tick > started[0]:
+                notes.append((track, channel, started[0], first,
+                              tick - started[0], started[1]))
+
+
+def detect_key(pitch_class_weights):
+    """Get the major key root (0-11) that best fits a pitch-class histogram."""
+    weights = np.asarray(pitch_class_weights, dtype=float)
+    if not weights.any():
+        return 0
+    scores = [np.corrcoef(np.roll(MAJOR_PROFILE, root), weights)[0, 1] for root in range(12)]
+    return int(np.nanargmax(scores))
+
+
+def melody_lines(notes):
+    """
+    Split notes into melodic lines, one per track and channel.
+
+    Drums are skipped, and where several notes start together only the
+    highest is kept.
+
+    Yields:
+        list: (start tick, pitch, duration ticks) sorted by start
+    """
+    lines = {}
+    for track, channel, start, pitch, duration, _ in notes:
+        if channel == DRUM_CHANNEL:
+            continue
+        line = lines.setdefault((track, channel), {})
+        if start not in line or pitch > line[start][0]:
+            line[start] = (pitch, duration)
+
+    for line in lines.values():
+        yield [(start, pitch, duration) for start, (pitch, duration) in sorted(line.items())]
+
+
+def build_index(source_dir, index_file):
+    """
+    Build the corpus index from every .mid and .kar file in source_dir.
+
+    Args:
+        source_dir: directory with the MIDI library
+        index_file: path of the index to write
+
+    Returns:
+        dict: number of files indexed, skipped and notes read
+    """
+    arrays = {name: np.zeros(shape, dtype='<u4') for name, shape in LAYOUT}
+    indexed = skipped = note_count = 0
+
+    files = sorted(p for p in Path(source_dir).iterdir()
+                   if p.suffix.lower() in ('.mid', '.midi', '.kar'))
+    for path in files:
+        try:
+            division, notes = parse_midi(path)
+        except (ValueError, IndexError, struct.error) as e:
+            logging.warning(f"Skipping {path.name}: {e}")
+            skipped += 1
+            continue
+
+        pitched = [n for n in notes if n[1] != DRUM_CHANNEL]
+        if not pitched:
+            skipped += 1
+            continue
+
+        histogram = np.zeros(12)
+        for _, _, _, pitch, duration, _ in pitched:
+            histogram[pitch % 12] += duration
+        root = detect_key(histogram)
+        arrays['key_counts'][root] += 1
+
+        sixteenth = max(division // 4, 1)
+        for line in melody_lines(pitched):
+            previous = None
+            for _, pitch, duration in line:
+                relative = (pitch - root) % 12
+                arrays['pitch_classes'][relative] += 1
+                steps = min(max(round(duration / sixteenth), 1), 16)
+                arrays['rhythm'][steps - 1] += 1
+                if previous is not None:
+                    arrays['transitions'][previous, relative] += 1
+                previous = relative
+
+        note_count += len(pitched)
+        indexed += 1
+
+    index_file = Path(index_file)
+    index_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(index_file, 'wb') as f:
+        f.write(HEADER.pack(INDEX_MAGIC, INDEX_VERSION, 0, indexed, note_count))
+        for name, _ in LAYOUT:
+            f.write(arrays[name].tobytes())
+
+    return {'files': indexed, 'skipped': skipped, 'notes': note_count}
+
+
+class CorpusModel:
+    """Melody model backed by a memory-mapped corpus index."""
+
+    def __init__(self, index_file):
+        """
+        Create a model; the index is opened on first use.
+
+        Args:
+            index_file: path written by build_index
+        """
+        self.index_file = Path(index_file)
+        self._arrays = None
+        self._lock = threading.Lock()
+        # Why the index could not be read, once a load has failed
+        self.load_error = None
+        # Cumulative transition rows per scale
+        self._tables = {}
+
+    def available(self):
+        """
+        Check that the index has been built and can be read.
+
+        A corrupt or truncated index is logged once and then treated as
+        missing, so callers fall back instead of failing every request.
+        """
+        if self.load_error is not None or not self.index_file.is_file():
+            return False
+        try:
+            self.arrays()
+        except (OSError, ValueError, struct.error) as e:
+            with self._lock:
+                if self.load_error is None:
+                    self.load_error = str(e) or type(e).__name__
+                    logging.error(f"Corpus index {self.index_file} is unreadable "
+                                  f"({self.load_error}); rebuild it with "
+                                  "'python midi_corpus.py build'")
+            return False
+        return True
+
+    def arrays(self):
+        """Map the index on first use and return its arrays by name."""
+        if self._arrays is None:
+            with self._lock:
+                if self._arrays is None:
+                    self._arrays = self._load()
+        return self._arrays
+
+    def _load(self):
+        with open(self.index_file, 'rb') as f:
+            magic, version, _, files, notes = HEADER.unpack(f.read(HEADER.size))
+        if magic != INDEX_MAGIC or version != INDEX_VERSION:
+            raise ValueError(f"{self.index_file} is not a version {INDEX_VERSION} corpus index")
+
+        size = sum(int(np.prod(shape)) for _, shape in LAYOUT)
+        mapped = np.memmap(self.index_file, dtype='<u4', mode='r',
+                           offset=HEADER.size, shape=(size,))
+        arrays = {'files': files, 'notes': notes}
+        start = 0
+        for name, shape in LAYOUT:
+            count = int(np.prod(shape))
+            arrays[name] = mapped[start:start + count].reshape(shape)
+            start += count
+        return arrays
+
+    def _scale_tables(self, scale):
+        """Get cumulative transition and start probabilities restricted to a scale."""
+        key = tuple(scale)
+        tables = self._tables.get(key)
+        if tables is None:
+            arrays = self.arrays()
+            degrees = np.array(scale)
+            # Counts between scale degrees, plus one so every step is possible
+            counts = arrays['transitions'][np.ix_(degrees, degrees)].astype(float) + 1
+            rows = np.cumsum(counts / counts.sum(axis=1, keepdims=True), axis=1)
+            start = arrays['pitch_classes'][degrees].astype(float) + 1
+            rhythm = arrays['rhythm'].astype(float) + 1
+            tables = (rows, np.cumsum(start / start.sum()), np.cumsum(rhythm / rhythm.sum()))
+            self._tables[key] = tables
+        return tables
+
+    def melody(self, scale, count, generator):
+        """
+        Sample a melody restricted to a scale.
+
+        Args:
+            scale: semitone offsets of the scale degrees from the root
+            count: number of notes
+            generator: numpy.random.Generator to draw from
+
+        Returns:
+            tuple: (semitone offsets from the root, durations in beats) lists
+        """
+        if count <= 0:
+            return [], []
+
+        rows, start, rhythm = self._scale_tables(scale)
+        draws = generator.random(count)
+
+        degrees = np.empty(count, dtype=int)
+        degree = min(int(np.searchsorted(start, draws[0], side='right')), len(scale) - 1)
+        degrees[0] = degree
+        for i in range(1, count):
+            degree = min(int(np.searchsorted(rows[degree], draws[i], side='right')),
+                         len(scale) - 1)
+            degrees[i] = degree
+
+        steps = np.minimum(np.searchsorted(rhythm, generator.random(count), side='right'), 15) + 1
+        offsets = np.array(scale)[degrees]
+        return offsets.tolist(), (steps / 4.0).tolist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Build the MIDI corpus index.")
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--source', default='soundfonts', help='directory of MIDI files')
+    parser.add_argument('--output', default='soundfonts/corpus.idx', help='index file to write')
+    args = parser.parse_args()
+
+    summary = build_index(args.source, args.output)
+    print(f"Indexed {summary['files']} files ({summary['notes']} notes), "
+          f"skipped {summary['skipped']} -> {args.output}")
+
+
+if __name__ == '__main__':
+    main()
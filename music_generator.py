@@ -3,18 +3,59 @@ Music Generator Module
 Generates MIDI music files with customizable parameters.
 """
 
+import io
+import logging
 import random
-from pathlib import Path
+
+import numpy as np
 from midiutil import MIDIFile
 
-OUTPUT_DIR = Path("output/songs")
-OUTPUT_DIR.mkdir(parents=True, exist_ok=True)
+from arrangement import Arranger
+from midi_corpus import CorpusModel
+from output_store import OutputStore
 
 
 class MusicGenerator:
     """Generate music using MIDI."""
     
-    def __init__(self):
+    # Melody note lengths in beats
+    NOTE_DURATIONS = np.array([0.5, 1, 2])
+    
+    # 'simple' is a melody plus a root-note bass; 'full' uses the Arranger
+    ARRANGEMENTS = ('simple', 'full')
+    
+    # 'scale' draws melody notes uniformly from the genre scale; 'corpus'
+    # samples them from the MIDI library model (see midi_corpus.py)
+    MELODY_MODES = ('scale', 'corpus')
+    
+    def __init__(self, output_store=None, duration_bars=32, beats_per_bar=4,
+                 arrangement='simple', melody_mode='scale',
+                 corpus_index="soundfonts/corpus.idx"):
+        """
+        Create a music generator.
+        
+        Args:
+            output_store: OutputStore that names and writes song files
+            duration_bars: song length in bars
+            beats_per_bar: melody notes per bar
+            arrangement: default arrangement, 'simple' or 'full'
+            melody_mode: default melody mode, 'scale' or 'corpus'
+            corpus_index: index file built by midi_corpus.py (opened lazily)
+        """
+        if arrangement not in self.ARRANGEMENTS:
+            raise ValueError(f"Unknown arrangement: {arrangement}")
+        if melody_mode not in self.MELODY_MODES:
+            raise ValueError(f"Unknown melody mode: {melody_mode}")
+        
+        self.output_store = output_store or OutputStore()
+        self.duration_bars = duration_bars
+        self.beats_per_bar = beats_per_bar
+        self.arrangement = arrangement
+        self.arranger = Arranger(self)
+        self.melody_mode = melody_mode
+        self.corpus = CorpusModel(corpus_index)
+        self._corpus_warned = False
+        
         self.genre_scales = {
             'pop': [0, 2, 4, 5, 7, 9, 11],  # Major scale
             'rock': [0, 2, 3, 5, 7, 8, 10],  # Minor scale
@@ -37,24 +78,146 @@ class MusicGenerator:
             'C': 0, 'C#': 1, 'D': 2, 'D#': 3, 'E': 4, 'F': 5,
             'F#': 6, 'G': 7, 'G#': 8, 'A': 9, 'A#': 10, 'B': 11
         }
+        
+        # Melody velocity range (inclusive) by mood
+        self.mood_velocity = {
+            'energetic': (90, 127),
+            'happy': (90, 127),
+            'uplifting': (90, 127),
+            'calm': (60, 90),
+            'sad': (60, 90)
+        }
+        self.default_velocity = (70, 100)
+        
+        # Scale pitch tables, built once per (genre, key, octave)
+        self._pitch_tables = {}
+    
+    def pitch_table(self, genre, key, octave):
+        """Get the MIDI pitches of a genre's scale in a key and octave."""
+        table_key = (genre, key, octave)
+        table = self._pitch_tables.get(table_key)
+        if table is None:
+            scale = self.genre_scales.get(genre, self.genre_scales['pop'])
+            root_note = self.key_map.get(key, 0)
+            table = np.array(scale) + root_note + octave * 12
+            self._pitch_tables[table_key] = table
+        return table
+    
+    def melody_events(self, genre, key, mood, count, rng=None, mode='scale'):
+        """
+        Draw a whole melody at once.
+        
+        Args:
+            genre: genre whose scale the pitches come from
+            key: key name, e.g. 'C'
+            mood: mood that sets the velocity range
+            count: number of notes
+            rng: random.Random used to seed the draw (defaults to the
+                global generator)
+            mode: 'scale' for uniform scale notes, or 'corpus' to sample
+                pitches and rhythm from the MIDI library model (falls back
+                to 'scale' if the index has not been built)
+            
+        Returns:
+            tuple: (pitches, start times, durations, velocities) lists
+        """
+        if rng is None:
+            rng = random
+        generator = np.random.default_rng(rng.getrandbits(64))
+        
+        if mode == 'corpus' and self._corpus_ready():
+            scale = self.genre_scales.get(genre, self.genre_scales['pop'])
+            offsets, durations = self.corpus.melody(scale, count, generator)
+            base = self.key_map.get(key, 0) + 5 * 12
+            pitches = np.array(offsets) + base
+            durations = np.array(durations)
+        else:
+            pitches = generator.choice(self.pitch_table(genre, key, 5), count)
+            durations = generator.choice(self.NOTE_DURATIONS, count)
+        low, high = self.mood_velocity.get(mood, self.default_velocity)
+        velocities = generator.integers(low, high + 1, count)
+        
+        # Each note starts when the previous one ends
+        starts = np.cumsum(durations) - durations
+        
+        return pitches.tolist(), starts.tolist(), durations.tolist(), velocities.tolist()
+    
+    def _corpus_ready(self):
+        """Check the corpus index is usable, warning once if it was not built."""
+        if self.corpus.available():
+            return True
+        # An unreadable index has already been logged by the model
+        if not self._corpus_warned and self.corpus.load_error is None:
+            self._corpus_warned = True
+            logging.warning(f"Corpus index {self.corpus.index_file} not found; "
+                            "run 'python midi_corpus.py build'. Using scale melodies.")
+        return False
     
-    def generate(self, customization):
+    def generate(self, customization, rng=None):
         """
         Generate a MIDI music file.
         
         Args:
             customization: dict with genre, mood, tempo, key, style
+            rng: random.Random to draw from (defaults to the global generator)
             
         Returns:
             str: filename of generated MIDI file
         """
+        data = self.generate_bytes(customization, rng)
+        
+        # Save MIDI file
+        genre = customization.get('genre', 'pop')
+        filename = self.output_store.allocate('songs', 'song', genre, 'mid')
+        with self.output_store.open(filename, 'wb') as output_file:
+            output_file.write(data)
+        
+        return filename
+    
+    def generate_bytes(self, customization, rng=None):
+        """
+        Generate a song as MIDI file bytes without touching the disk.
+        
+        Args:
+            customization: dict with genre, mood, tempo, key, style
+            rng: random.Random to draw from (defaults to the global generator)
+            
+        Returns:
+            bytes: contents of a standard MIDI file
+        """
+        buffer = io.BytesIO()
+        self.build(customization, rng).writeFile(buffer)
+        return buffer.getvalue()
+    
+    def build(self, customization, rng=None):
+        """
+        Compose a song.
+        
+        Customization 'arrangement' ('simple' or 'full') overrides the
+        default arrangement, and 'tracks' limits a full arrangement to some
+        of melody, chords, bass and drums.
+        
+        Args:
+            customization: dict with genre, mood, tempo, key, style
+            rng: random.Random to draw from (defaults to the global generator)
+            
+        Returns:
+            MIDIFile: the composed song
+        """
+        if rng is None:
+            rng = random
+        
+        if customization.get('arrangement', self.arrangement) == 'full':
+            return self.arranger.arrange(customization, rng, customization.get('tracks'))
+        
         genre = customization.get('genre', 'pop')
         mood = customization.get('mood', 'happy')
         tempo = customization.get('tempo', 'medium')
         key = customization.get('key', 'C')
         
-        # Create MIDI file
-        midi = MIDIFile(1)  # One track
+        # Create MIDI file. Melody and bass are single non-overlapping lines,
+        # so midiutil's duplicate-removal and de-interleaving passes are skipped
+        midi = MIDIFile(1, removeDuplicates=False, deinterleave=False)  # One track
         track = 0
         channel = 0
         time = 0
@@ -63,67 +226,23 @@ class MusicGenerator:
         tempo_bpm = self.tempo_map.get(tempo, 120)
         midi.addTempo(track, time, tempo_bpm)
         
-        # Get scale for genre
-        scale = self.genre_scales.get(genre, self.genre_scales['pop'])
-        root_note = self.key_map.get(key, 0)
-        
         # Generate melody
-        duration = 32  # bars
-        beats_per_bar = 4
-        total_beats = duration * beats_per_bar
-        
-        current_time = 0
-        octave = 5
+        duration = self.duration_bars
+        total_beats = duration * self.beats_per_bar
         
-        for _ in range(total_beats):
-            # Choose note from scale
-            scale_degree = random.choice(scale)
-            pitch = root_note + scale_degree + (octave * 12)
-            
-            # Vary duration
-            note_duration = random.choice([0.5, 1, 2])
-            
-            # Vary volume based on mood
-            if mood in ['energetic', 'happy', 'uplifting']:
-                volume = random.randint(90, 127)
-            elif mood in ['calm', 'sad']:
-                volume = random.randint(60, 90)
-            else:
-                volume = random.randint(70, 100)
-            
-            midi.addNote(track, channel, pitch, current_time, note_duration, volume)
-            current_time += note_duration
+        add_note = midi.addNote
+        for pitch, start, note_duration, volume in zip(
+                *self.melody_events(genre, key, mood, total_beats, rng,
+                                    customization.get('melody_mode', self.melody_mode))):
+            add_note(track, channel, pitch, start, note_duration, volume)
         
         # Add bass line
         bass_channel = 1
-        current_time = 0
         bass_octave = 3
+        bass_note = self.key_map.get(key, 0) + (bass_octave * 12)
         
-        for i in range(duration):
-            bass_note = root_note + (bass_octave * 12)
-            midi.addNote(track, bass_channel, bass_note, current_time, 4, 80)
-            current_time += 4
-        
-        # Save MIDI file
-        import time as time_module
-        import re
-        
-        # Sanitize genre to prevent path injection
-        safe_genre = re.sub(r'[^a-zA-Z0-9_-]', '', str(genre))
-        
-        filename = f"song_{int(time_module.time())}_{safe_genre}.mid"
-        filepath = OUTPUT_DIR / filename
-        
-        # Ensure we're writing within OUTPUT_DIR
-        filepath = filepath.resolve()
-        output_base = OUTPUT_DIR.resolve()
-        
-        try:
-            filepath.relative_to(output_base)
-        except ValueError:
-            raise ValueError("Invalid file path")
-        
-        with open(filepath, "wb") as output_file:
-            midi.writeFile(output_file)
+        for bar in range(duration):
+            add_note(track, bass_channel, bass_note, bar * self.beats_per_bar,
+                     self.beats_per_bar, 80)
         
-        return f"songs/{filename}"
+        return midi
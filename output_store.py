@@ -0,0 +1,118 @@
+"""
+Output Store Module
+Allocates collision-free, sharded paths for generated files and writes them
+atomically.
+
+Files are laid out as <kind>/<shard>/<prefix>_<id>_<label>.<ext>, where id is
+a random 128-bit hex string and shard is taken from its leading characters,
+so concurrent generators never overwrite each other and no single directory
+grows without bound. Writes go to a temporary file in the target directory
+and are renamed into place, so readers never see a partial file.
+"""
+
+import os
+import re
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+
+
+def new_id():
+    """Get a new unique id."""
+    return uuid.uuid4().hex
+
+
+@contextmanager
+def atomic_write(path, mode='wb', encoding=None):
+    """
+    Open a temporary file that replaces path when the block succeeds.
+
+    Args:
+        path: destination file path
+        mode: 'wb' or 'w'
+        encoding: text encoding for mode 'w'
+
+    Yields:
+        file object to write to
+    """
+    path = Path(path)
+    fd, tmp_path = tempfile.mkstemp(dir=path.parent, prefix='.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, mode, encoding=encoding) as f:
+            # mkstemp creates owner-only files; give outputs normal permissions
+            os.chmod(tmp_path, 0o644)
+            yield f
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+
+class OutputStore:
+    """Hand out unique output paths and write files into them atomically."""
+
+    def __init__(self, base_dir="output", shard_depth=1, on_write=None):
+        """
+        Create an output store.
+
+        Args:
+            base_dir: root directory for generated files
+            shard_depth: number of two-character shard directory levels
+            on_write: callable(relative_path, size) run after each file is
+                written, e.g. RetentionManager.track
+        """
+        self.base_dir = Path(base_dir)
+        self.shard_depth = shard_depth
+        self.on_write = on_write
+
+    def allocate(self, kind, prefix, label, extension):
+        """
+        Allocate a new unique path for a generated file.
+
+        Args:
+            kind: top-level subdirectory, e.g. 'songs'
+            prefix: filename prefix, e.g. 'song'
+            label: descriptive label such as the genre (sanitized here)
+            extension: file extension without the dot
+
+        Returns:
+            str: path relative to the base directory, using '/' separators
+        """
+        file_id = new_id()
+        # Sanitize label to prevent path injection
+        safe_label = re.sub(r'[^a-zA-Z0-9_-]', '', str(label))
+        shards = [file_id[i * 2:i * 2 + 2] for i in range(self.shard_depth)]
+        return '/'.join([kind, *shards, f"{prefix}_{file_id}_{safe_label}.{extension}"])
+
+    def resolve(self, relative_path):
+        """
+        Get the absolute path for a relative output path.
+
+        Raises:
+            ValueError: if the path escapes the base directory
+        """
+        filepath = (self.base_dir / relative_path).resolve()
+        output_base = self.base_dir.resolve()
+
+        try:
+            filepath.relative_to(output_base)
+        except ValueError:
+            raise ValueError("Invalid file path")
+
+        return filepath
+
+    @contextmanager
+    def open(self, relative_path, mode='wb', encoding=None):
+        """Open an output path for an atomic write, creating its directory."""
+        filepath = self.resolve(relative_path)
+        filepath.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(filepath, mode, encoding) as f:
+            yield f
+        if self.on_write is not None:
+            self.on_write(relative_path, filepath.stat().st_size)
+
+    def write_text(self, relative_path, text):
+        """Atomically write a text file."""
+        with self.open(relative_path, 'w', encoding='utf-8') as f:
+            f.write(text)
@@ -0,0 +1,149 @@
+"""
+Result Cache Module
+Content-addressed cache of seeded generation results.
+
+A seeded request always produces the same output, so its result can be
+stored under a hash of (seed, customization, content type, item index) and
+served again without re-running the generator. The hash also covers a
+fingerprint of the server's generator settings and data files, so changing
+them does not serve results generated under the old ones. Index entries are small JSON
+files under output/cache/, so they survive restarts and are shared by every
+worker process; a bounded in-memory LRU sits in front of them.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+
+from bounded_cache import BoundedLRUCache
+from output_store import atomic_write
+
+
+# Result fields that name a generated file under the output directory
+FILE_FIELDS = ('song', 'audio', 'picture')
+
+
+def settings_fingerprint(settings, files=()):
+    """
+    Hash generator settings and the state of the data files they read.
+
+    Args:
+        settings: JSON-serializable dict of settings that shape the output
+        files: paths of data files (corpus index, tables); each contributes
+            its size and modification time, or None if it is missing
+
+    Returns:
+        str: hex digest
+    """
+    file_states = {}
+    for path in files:
+        try:
+            stat = os.stat(path)
+            file_states[str(path)] = [stat.st_size, stat.st_mtime_ns]
+        except OSError:
+            file_states[str(path)] = None
+    payload = json.dumps({'settings': settings, 'files': file_states},
+                         sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Look up and store generation results by content hash."""
+
+    def __init__(self, output_dir, memory_size=1024, fingerprint=''):
+        """
+        Create a result cache.
+
+        Args:
+            output_dir: directory generated files are served from
+            memory_size: number of entries kept in memory
+            fingerprint: settings_fingerprint of the generators whose
+                results are stored
+        """
+        self.output_dir = Path(output_dir)
+        self.fingerprint = fingerprint
+        self.index_dir = self.output_dir / "cache"
+        self.memory = BoundedLRUCache(max_size=memory_size)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def make_key(self, seed, customization, content_type, index):
+        """Hash the inputs that fully determine a seeded result."""
+        payload = json.dumps({
+            'settings': self.fingerprint,
+            'seed': seed,
+            'customization': customization,
+            'content_type': content_type,
+            'index': index
+        }, sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+    def get(self, key):
+        """
+        Get a cached result whose files still exist.
+
+        Returns:
+            dict or None: the cached result fields
+        """
+        result = self.memory.get(key)
+        if result is None:
+            result = self._read_entry(key)
+            if result is not None:
+                self.memory.put(key, result)
+
+        found = result is not None and self._files_exist(result)
+        with self._lock:
+            if found:
+                self.hits += 1
+            else:
+                self.misses += 1
+        return dict(result) if found else None
+
+    def put(self, key, result, persist=True):
+        """
+        Store the result fields for a key.
+
+        Args:
+            key: key from make_key
+            result: result fields to store
+            persist: also write the entry to disk; pass False for results
+                that carry their content inline rather than naming a file
+        """
+        self.memory.put(key, dict(result))
+        if persist:
+            self._write_entry(key, result)
+
+    def stats(self):
+        """Get hit/miss counters."""
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / lookups if lookups else 0.0,
+            'memory': self.memory.stats()
+        }
+
+    def _entry_path(self, key):
+        return self.index_dir / key[:2] / f"{key}.json"
+
+    def _read_entry(self, key):
+        try:
+            with open(self._entry_path(key), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _write_entry(self, key, result):
+        path = self._entry_path(key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with atomic_write(path, 'w', encoding='utf-8') as f:
+            json.dump(result, f)
+
+    def _files_exist(self, result):
+        return all((self.output_dir / result[field]).is_file()
+                   for field in FILE_FIELDS if field in result)
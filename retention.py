@@ -0,0 +1,311 @@
+"""
+Retention Module
+Keeps the generated-media directories under a disk quota.
+
+Every file under the tracked output directories is indexed with its size
+and last access, in least-recently-used order. New files are registered as
+the output store writes them, downloads through serve_output mark a file
+as used, and a background sweep walks the directories to pick up files
+written by other processes (or present at startup) and to forget files
+deleted behind its back. Once the quota is exceeded, or files go unused for
+longer than max_age_seconds, the least recently used files are deleted.
+
+Sweeps run on their own thread and hold the lock only to merge one batch
+of directory entries or pop one batch of victims, so request threads are
+never blocked for long. Files younger than grace_seconds are never
+deleted, so a result is not evicted before its client can download it.
+Stores kept outside the managed directories can be trimmed from the same
+thread through the on_sweep hook.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime
+from pathlib import Path
+
+
+class RetentionManager:
+    """LRU disk quota and age limit for generated output files."""
+
+    def __init__(self, output_dir, directories=('songs', 'images', 'videos', 'audio'),
+                 max_bytes=1024 ** 3, max_age_seconds=None, grace_seconds=300,
+                 sweep_interval=60.0, batch_size=500, on_sweep=None):
+        """
+        Create a retention manager; call start() to run background sweeps.
+
+        Args:
+            output_dir: directory generated files are served from
+            directories: subdirectories of output_dir that are managed
+            max_bytes: disk quota for the managed files (None for no quota)
+            max_age_seconds: delete files unused for this long (None to keep)
+            grace_seconds: minimum age before a file may be deleted
+            sweep_interval: seconds between background sweeps
+            batch_size: files merged or deleted per lock acquisition
+            on_sweep: zero-argument callable run at the end of every sweep
+        """
+        self.output_dir = Path(output_dir)
+        self.directories = tuple(directories)
+        self.max_bytes = max_bytes
+        self.max_age_seconds = max_age_seconds
+        self.grace_seconds = grace_seconds
+        self.sweep_interval = sweep_interval
+        self.batch_size = batch_size
+        self.on_sweep = on_sweep
+
+        # relative path -> [size, last access, sweep that last saw it], LRU first
+        self._files = OrderedDict()
+        self._bytes = 0
+        self._usage = {name: [0, 0] for name in self.directories}  # files, bytes
+        self._lock = threading.Lock()
+        self._sweep_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._thread_pid = None
+        self._sweeps = 0
+        self._indexed = False
+
+        # Counters
+        self.evicted_files = 0
+        self.evicted_bytes = 0
+        self.expired_files = 0
+        self.last_sweep_ms = None
+        self.last_sweep_at = None
+
+    def start(self):
+        """Start sweeping on a background thread, unless already started."""
+        pid = os.getpid()
+        if self._thread is not None and self._thread_pid == pid:
+            return
+        if self._thread_pid not in (None, pid):
+            # A forked child inherits no threads, and must not inherit locks
+            # its parent's sweep thread may have held, so sweep afresh
+            self._lock = threading.Lock()
+            self._sweep_lock = threading.Lock()
+            self._thread = None
+            self._thread_pid = None
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name='retention', daemon=True)
+                self._thread_pid = pid
+                self._thread.start()
+
+    def stop(self):
+        """Stop the background thread after its current sweep."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self):
+        while True:
+            try:
+                self.sweep()
+            except Exception as e:
+                logging.error(f"Error sweeping output files: {str(e)}")
+            if self._stop.wait(self.sweep_interval):
+                return
+
+    def _managed(self, relative_path):
+        return relative_path.split('/', 1)[0] in self.directories
+
+    def track(self, relative_path, size):
+        """Register a newly written file as the most recently used."""
+        if not self._managed(relative_path):
+            return
+        with self._lock:
+            self._put(relative_path, size, time.time())
+
+    def touch(self, relative_path):
+        """Mark a file as used, e.g. when it is downloaded."""
+        if not self._managed(relative_path):
+            return
+        with self._lock:
+            entry = self._files.get(relative_path)
+            if entry is not None:
+                entry[1] = time.time()
+                self._files.move_to_end(relative_path)
+                return
+        try:
+            size = (self.output_dir / relative_path).stat().st_size
+        except OSError:
+            return
+        self.track(relative_path, size)
+
+    def _put(self, relative_path, size, accessed, sweep=None, last=True):
+        if relative_path in self._files:
+            self._remove(relative_path)
+        self._files[relative_path] = [size, accessed, self._sweeps if sweep is None else sweep]
+        self._files.move_to_end(relative_path, last=last)
+        self._bytes += size
+        usage = self._usage[relative_path.split('/', 1)[0]]
+        usage[0] += 1
+        usage[1] += size
+
+    def _remove(self, relative_path):
+        size = self._files.pop(relative_path)[0]
+        self._bytes -= size
+        usage = self._usage[relative_path.split('/', 1)[0]]
+        usage[0] -= 1
+        usage[1] -= size
+        return size
+
+    def _walk(self):
+        """Yield (relative path, size, last access) of every managed file."""
+        base = str(self.output_dir)
+        stack = [os.path.join(base, name) for name in self.directories]
+        while stack:
+            try:
+                entries = list(os.scandir(stack.pop()))
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and not entry.name.startswith('.'):
+                    try:
+                        stat = entry.stat(follow_symlinks=False)
+                    except OSError:
+                        continue
+                    relative_path = os.path.relpath(entry.path, base).replace(os.sep, '/')
+                    yield relative_path, stat.st_size, max(stat.st_atime, stat.st_mtime)
+
+    def _index(self, sweep, now):
+        """
+        Walk the directories, merging what is found one batch at a time.
+
+        Returns:
+            list: (relative path, size) of files popped for exceeding
+                max_age_seconds
+        """
+        batch = []
+        discovered = []
+
+        def merge():
+            with self._lock:
+                for relative_path, size, accessed in batch:
+                    entry = self._files.get(relative_path)
+                    if entry is not None:
+                        entry[2] = sweep
+                    elif self._indexed:
+                        # Written by another process since the last sweep
+                        self._put(relative_path, size, accessed, sweep)
+                    else:
+                        discovered.append((accessed, relative_path, size))
+            batch.clear()
+
+        for item in self._walk():
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                merge()
+        merge()
+
+        if not self._indexed:
+            # Files found at startup are older than anything tracked since,
+            # so they go to the LRU end, least recently accessed first
+            discovered.sort(reverse=True)
+            for start in range(0, len(discovered), self.batch_size):
+                with self._lock:
+                    for accessed, relative_path, size in discovered[start:start + self.batch_size]:
+                        if relative_path not in self._files:
+                            self._put(relative_path, size, accessed, sweep, last=False)
+            self._indexed = True
+
+        # Forget files that disappeared, unless tracked during this sweep,
+        # and pop files unused for too long
+        expired = []
+        max_age = self.max_age_seconds
+        if max_age is not None:
+            max_age = max(max_age, self.grace_seconds)
+        with self._lock:
+            paths = list(self._files)
+        for start in range(0, len(paths), self.batch_size):
+            with self._lock:
+                for relative_path in paths[start:start + self.batch_size]:
+                    entry = self._files.get(relative_path)
+                    if entry is None:
+                        continue
+                    if entry[2] < sweep:
+                        self._remove(relative_path)
+                    elif max_age is not None and now - entry[1] > max_age:
+                        expired.append((relative_path, self._remove(relative_path)))
+        return expired
+
+    def _pop_victims(self, now):
+        """Pop up to batch_size least recently used files while over quota."""
+        victims = []
+        with self._lock:
+            while (self._files and len(victims) < self.batch_size
+                   and self.max_bytes is not None and self._bytes > self.max_bytes):
+                relative_path, (size, accessed, _) = next(iter(self._files.items()))
+                if now - accessed < self.grace_seconds:
+                    break
+                victims.append((relative_path, self._remove(relative_path)))
+        return victims
+
+    def _delete(self, victims, expired=False):
+        """Delete popped files and count them; returns the number deleted."""
+        deleted = 0
+        for relative_path, size in victims:
+            try:
+                (self.output_dir / relative_path).unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logging.error(f"Error deleting {relative_path}: {str(e)}")
+                continue
+            deleted += 1
+            with self._lock:
+                self.evicted_files += 1
+                self.evicted_bytes += size
+                self.expired_files += int(expired)
+        return deleted
+
+    def sweep(self):
+        """
+        Re-index the managed directories and delete files over the limits.
+
+        Returns:
+            int: number of files deleted
+        """
+        with self._sweep_lock:
+            start = time.perf_counter()
+            with self._lock:
+                self._sweeps += 1
+                sweep = self._sweeps
+            deleted = self._delete(self._index(sweep, time.time()), expired=True)
+
+            while True:
+                victims = self._pop_victims(time.time())
+                if not victims:
+                    break
+                deleted += self._delete(victims)
+
+            if self.on_sweep is not None:
+                self.on_sweep()
+
+            with self._lock:
+                self.last_sweep_ms = (time.perf_counter() - start) * 1000
+                self.last_sweep_at = datetime.now().isoformat()
+            return deleted
+
+    def stats(self):
+        """Get disk usage and eviction counters."""
+        with self._lock:
+            return {
+                'files': len(self._files),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'max_age_seconds': self.max_age_seconds,
+                'usage_ratio': self._bytes / self.max_bytes if self.max_bytes else None,
+                'directories': {name: {'files': files, 'bytes': size}
+                                for name, (files, size) in self._usage.items()},
+                'evicted_files': self.evicted_files,
+                'evicted_bytes': self.evicted_bytes,
+                'expired_files': self.expired_files,
+                'sweeps': self._sweeps,
+                'last_sweep_ms': self.last_sweep_ms,
+                'last_sweep_at': self.last_sweep_at
+            }
@@ -0,0 +1,122 @@
+"""
+Single Flight Module
+Coalesces identical concurrent calls so one computation serves them all.
+
+The first caller for a key runs the computation; callers arriving with the
+same key while it is in flight wait for it and share its result (or its
+exception) instead of running their own. Once the computation finishes the
+key is forgotten, so later calls compute again (or hit a cache in front).
+
+Fan-out is bounded: at most max_waiters callers join one flight, and a
+caller that waits longer than wait_timeout gives up and computes on its
+own, so a slow or stuck leader cannot hold an unbounded queue of requests.
+"""
+
+import threading
+
+
+class _Flight:
+    """One in-progress computation and the callers waiting on it."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """Deduplicate concurrent calls by key."""
+
+    def __init__(self, max_waiters=64, wait_timeout=30.0, on_join=None):
+        """
+        Create a single-flight group.
+
+        Args:
+            max_waiters: callers that may join one flight; others compute
+                on their own
+            wait_timeout: seconds a joined caller waits before computing on
+                its own
+            on_join: callable(key) run when a caller has joined a flight,
+                before it starts waiting
+        """
+        self.max_waiters = max_waiters
+        self.wait_timeout = wait_timeout
+        self.on_join = on_join
+        self._flights = {}
+        self._lock = threading.Lock()
+
+        # Counters
+        self.leaders = 0
+        self.coalesced = 0
+        self.overflows = 0
+        self.timeouts = 0
+
+    def do(self, key, fn):
+        """
+        Run fn for key, or wait for an identical call already running.
+
+        Args:
+            key: hashable identity of the call
+            fn: zero-argument callable computing the result
+
+        Returns:
+            tuple: (result, shared) where shared is True if the result came
+                from another caller's computation
+
+        Raises:
+            whatever fn raised, in the leader and every waiter
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+            elif flight.waiters >= self.max_waiters:
+                self.overflows += 1
+                flight = None
+                leader = False
+            else:
+                flight.waiters += 1
+                leader = False
+
+        if flight is None:
+            # Fan-out limit reached: compute independently
+            return fn(), False
+
+        if not leader:
+            if self.on_join is not None:
+                self.on_join(key)
+            if not flight.done.wait(self.wait_timeout):
+                with self._lock:
+                    self.timeouts += 1
+                return fn(), False
+            if flight.error is not None:
+                raise flight.error
+            with self._lock:
+                self.coalesced += 1
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+            return flight.result, False
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+
+    def stats(self):
+        """Get coalescing counters."""
+        with self._lock:
+            return {
+                'in_flight': len(self._flights),
+                'leaders': self.leaders,
+                'coalesced': self.coalesced,
+                'overflows': self.overflows,
+                'timeouts': self.timeouts,
+                'max_waiters': self.max_waiters
+            }
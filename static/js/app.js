@@ -46,30 +46,37 @@ document.addEventListener('DOMContentLoaded', function() {
         generateBtn.disabled = true;
         loadingDiv.style.display = 'block';
         
+        // Clear previous results
+        resultsDiv.innerHTML = '';
+        
         try {
-            // Make API request
+            // Make API request, asking for items to be streamed as they finish
             const response = await fetch('/api/generate', {
                 method: 'POST',
                 headers: {
-                    'Content-Type': 'application/json'
+                    'Content-Type': 'application/json',
+                    'Accept': 'application/x-ndjson'
                 },
                 body: JSON.stringify(requestData)
             });
             
-            const data = await response.json();
-            
-            if (data.success) {
-                // Display results
-                displayResults(data.results);
-                
-                // Update evolution score
-                document.getElementById('evolution-score').textContent = data.evolution_score;
-                
-                // Reload stats
-                loadEvolutionStats();
-            } else {
-                alert('Error generating content: ' + data.error);
-            }
+            await readRecords(response, record => {
+                if (record.type === 'item') {
+                    // Display each result as soon as it arrives
+                    appendResult(record.result, record.index);
+                } else if (record.type === 'done') {
+                    // Offer the whole batch as one download
+                    appendArchiveLink(record.archive_url);
+                    
+                    // Update evolution score
+                    document.getElementById('evolution-score').textContent = record.evolution_score;
+                    
+                    // Reload stats
+                    loadEvolutionStats();
+                } else if (record.type === 'error' || record.success === false) {
+                    alert('Error generating content: ' + record.error);
+                }
+            });
         } catch (error) {
             console.error('Error:', error);
             alert('Error generating content. Please try again.');
@@ -80,63 +87,109 @@ document.addEventListener('DOMContentLoaded', function() {
         }
     }
     
-    function displayResults(results) {
-        // Clear previous results
-        resultsDiv.innerHTML = '';
+    async function readRecords(response, onRecord) {
+        // Non-streamed responses (e.g. errors) arrive as a single JSON document
+        const contentType = response.headers.get('Content-Type') || '';
+        if (!contentType.includes('application/x-ndjson') || !response.body) {
+            onRecord(await response.json());
+            return;
+        }
+        
+        // Parse newline-delimited JSON records as chunks arrive
+        const reader = response.body.getReader();
+        const decoder = new TextDecoder();
+        let buffer = '';
         
-        // Display each result
-        results.forEach((result, index) => {
-            const card = document.createElement('div');
-            card.className = 'result-card';
+        while (true) {
+            const { value, done } = await reader.read();
+            buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
             
-            let html = `<h4>Generation ${index + 1}</h4>`;
+            const lines = buffer.split('\n');
+            buffer = lines.pop();
+            lines.filter(line => line.trim()).forEach(line => onRecord(JSON.parse(line)));
             
-            // Display artist name
-            if (result.artist) {
-                html += `<div class="artist-name">🎤 ${result.artist}</div>`;
+            if (done) {
+                if (buffer.trim()) {
+                    onRecord(JSON.parse(buffer));
+                }
+                break;
             }
-            
-            // Display metadata
-            html += `<div class="meta">
-                Genre: ${result.customization.genre} | 
-                Mood: ${result.customization.mood}
+        }
+    }
+    
+    function appendResult(result, index) {
+        const card = document.createElement('div');
+        card.className = 'result-card';
+        
+        let html = `<h4>Generation ${index + 1}</h4>`;
+        
+        // Display artist name
+        if (result.artist) {
+            html += `<div class="artist-name">🎤 ${result.artist}</div>`;
+        }
+        
+        // Display metadata
+        html += `<div class="meta">
+            Genre: ${result.customization.genre} | 
+            Mood: ${result.customization.mood}
+        </div>`;
+        
+        // Display album art
+        if (result.picture) {
+            html += `<div class="content">
+                <img src="/output/${result.picture}" alt="Album Art">
             </div>`;
-            
-            // Display album art
-            if (result.picture) {
-                html += `<div class="content">
-                    <img src="/output/${result.picture}" alt="Album Art">
-                </div>`;
-            }
-            
-            // Display lyrics preview
-            if (result.lyrics) {
-                const lyricsPreview = result.lyrics.substring(0, 300) + '...';
-                html += `<div class="content">
-                    <div class="lyrics-preview">${escapeHtml(lyricsPreview)}</div>
-                </div>`;
-            }
-            
-            // Download links
-            html += '<div class="content">';
-            
-            if (result.song) {
-                html += `<a href="/output/${result.song}" class="download-link" download>⬇ Download Song</a>`;
-            }
-            
-            if (result.lyrics_file) {
-                html += `<a href="/output/${result.lyrics_file}" class="download-link" download>⬇ Download Lyrics</a>`;
-            }
-            
-            if (result.picture) {
-                html += `<a href="/output/${result.picture}" class="download-link" download>⬇ Download Art</a>`;
-            }
-            
-            html += '</div>';
-            
-            card.innerHTML = html;
-            resultsDiv.appendChild(card);
-        });
+        }
+        
+        // Display lyrics preview
+        if (result.lyrics) {
+            const lyricsPreview = result.lyrics.substring(0, 300) + '...';
+            html += `<div class="content">
+                <div class="lyrics-preview">${escapeHtml(lyricsPreview)}</div>
+            </div>`;
+        }
+        
+        // Download links
+        html += '<div class="content">';
+        
+        if (result.song) {
+            html += `<a href="/output/${result.song}" class="download-link" download>⬇ Download Song</a>`;
+        }
+        
+        if (result.song_midi) {
+            html += `<a href="data:audio/midi;base64,${result.song_midi}" class="download-link" download="song.mid">⬇ Download Song</a>`;
+        }
+        
+        if (result.audio) {
+            html += `<audio controls preload="none" src="/output/${result.audio}"></audio>`;
+            html += `<a href="/output/${result.audio}" class="download-link" download>⬇ Download Audio</a>`;
+        }
+        
+        if (result.lyrics_url) {
+            html += `<a href="${result.lyrics_url}?download=1" class="download-link" download>⬇ Download Lyrics</a>`;
+        }
+        
+        if (result.picture) {
+            html += `<a href="/output/${result.picture}" class="download-link" download>⬇ Download Art</a>`;
+        }
+        
+        html += '</div>';
+        
+        card.innerHTML = html;
+        resultsDiv.appendChild(card);
+    }
+    
+    function appendArchiveLink(archiveUrl) {
+        if (!archiveUrl) {
+            return;
+        }
+        const card = document.createElement('div');
+        card.className = 'result-card';
+        card.innerHTML = `<h4>Whole Batch</h4>
+            <div class="content">
+                <a href="${archiveUrl}" class="download-link" download>⬇ Download All (ZIP)</a>
+            </div>`;
+        resultsDiv.appendChild(card);
     }
     
     async function loadEvolutionStats() {
@@ -8,6 +8,9 @@ from image_generator import ImageGenerator
 from lyrics_generator import LyricsGenerator
 from artist_generator import ArtistGenerator
 from evolution_engine import EvolutionEngine
+from batch_executor import BatchExecutor
+from job_queue import JobQueue, JobQueueFull
+from bounded_cache import BoundedLRUCache
 
 
 def test_generators():
@@ -80,6 +83,1161 @@ def test_generators():
     return True
 
 
+def test_batch_executor():
+    """Test that batch results come back grouped and in order."""
+    groups = [[(i, j) for j in range(3)] for i in range(5)]
+    expected = [[i * 10 + j for j in range(3)] for i in range(5)]
+    
+    for pool_size in (1, 4):
+        executor = BatchExecutor(pool_size=pool_size)
+        try:
+            assert executor.map_grouped(lambda i, j: i * 10 + j, groups) == expected
+        finally:
+            executor.shutdown()
+
+
+def test_job_queue():
+    """Test that queued jobs publish results and report failures."""
+    def produce(job, values):
+        for value in values:
+            job.add_result(value)
+    
+    def explode(job):
+        raise RuntimeError("boom")
+    
+    queue = JobQueue(max_running_jobs=1)
+    ok = queue.submit(produce, 3, [1, 2, 3])
+    failed = queue.submit(explode, 1)
+    queue.shutdown()
+    
+    status = queue.get(ok.id).to_dict()
+    assert status['status'] == 'completed'
+    assert status['results'] == [1, 2, 3]
+    assert status['progress'] == 1.0
+    assert queue.get(failed.id).status == 'failed'
+    
+    # Jobs waiting for a scheduler thread are capped
+    import threading
+    import time
+    release = threading.Event()
+    queue = JobQueue(max_running_jobs=1, max_queued_jobs=1)
+    blocker = queue.submit(lambda job: release.wait(), 1)
+    while blocker.status == 'queued':
+        time.sleep(0.01)
+    queue.submit(produce, 1, [1])
+    try:
+        queue.submit(produce, 1, [2])
+        assert False, "a full backlog should refuse jobs"
+    except JobQueueFull:
+        pass
+    release.set()
+    queue.shutdown()
+
+
+def test_generate_stream():
+    """Test that /api/generate streams one NDJSON record per item."""
+    import json
+    from app import app
+    
+    client = app.test_client()
+    response = client.post('/api/generate?stream=1', json={
+        'quantity': 2,
+        'content_types': ['artist', 'lyrics']
+    })
+    records = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    
+    assert response.mimetype == 'application/x-ndjson'
+    assert [r['type'] for r in records] == ['item', 'item', 'done']
+    assert [r['index'] for r in records[:2]] == [0, 1]
+    assert 'artist' in records[0]['result']
+    assert 'evolution_score' in records[-1]
+
+
+def test_image_render_backends():
+    """Test that unknown render backends fall back to PIL and cached backgrounds match."""
+    import random
+    import numpy as np
+    
+    image_gen = ImageGenerator()
+    uncached_gen = ImageGenerator(background_cache_size=0)
+    for genre in ('pop', 'electronic', 'jazz', 'blues'):
+        customization = {'genre': genre, 'mood': 'sad'}
+        random.seed(42)
+        expected = np.asarray(uncached_gen.render(customization))
+        random.seed(42)
+        image_gen.render(customization)  # fill the background cache
+        random.seed(42)
+        actual = np.asarray(image_gen.render({**customization, 'render_backend': 'numpy'}))
+        assert (expected == actual).all()
+
+
+def test_bounded_cache():
+    """Test LRU eviction and hit/miss counters."""
+    cache = BoundedLRUCache(max_size=2)
+    cache.put('a', 1)
+    cache.put('b', 2)
+    assert cache.get('a') == 1
+    cache.put('c', 3)  # evicts 'b', the least recently used
+    
+    assert cache.get('b') is None
+    assert cache.get_or_create('c', lambda: 99) == 3
+    
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['evictions']) == (2, 1, 1)
+
+
+def test_seeded_generation():
+    """Test that generators are reproducible with a seeded rng."""
+    import random
+    import numpy as np
+    
+    customization = {'genre': 'jazz', 'mood': 'calm'}
+    
+    def run(seed):
+        rng = random.Random(seed)
+        return (
+            ArtistGenerator().generate(customization, rng),
+            LyricsGenerator().generate(customization, rng),
+            np.asarray(ImageGenerator().render(customization, rng)).tobytes()
+        )
+    
+    assert run(7) == run(7)
+    assert run(7) != run(8)
+
+
+def test_output_store():
+    """Test unique sharded paths and atomic writes."""
+    import tempfile
+    from pathlib import Path
+    from output_store import OutputStore
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = OutputStore(tmp, shard_depth=2)
+        paths = {store.allocate('songs', 'song', 'hip/hop', 'mid') for _ in range(100)}
+        assert len(paths) == 100
+        
+        path = paths.pop()
+        assert path.startswith('songs/') and path.endswith('_hiphop.mid')
+        assert len(path.split('/')) == 4
+        
+        store.write_text(path, 'hello')
+        assert (Path(tmp) / path).read_text() == 'hello'
+        assert not list((Path(tmp) / path).parent.glob('*.tmp'))
+        
+        try:
+            store.resolve('../escape.txt')
+            assert False, "path outside the store was accepted"
+        except ValueError:
+            pass
+
+
+def test_evolution_write_behind():
+    """Test that evolution updates are batched and flushed on close."""
+    import json
+    import tempfile
+    import threading
+    from pathlib import Path
+    from evolution_store import JSONEvolutionStore
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        stats_file = Path(tmp) / 'stats.json'
+        evolution = EvolutionEngine(stats_file, flush_interval=60, flush_threshold=1000)
+        for genre in ('rock', 'jazz', 'rock'):
+            evolution.record_generation({'customization': {'genre': genre}})
+        evolution.evolve()
+        
+        assert not stats_file.exists()
+        assert evolution.get_stats()['persistence']['pending_updates'] == 3
+        
+        evolution.close()
+        saved = json.loads(stats_file.read_text())
+        assert saved['total_generations'] == 3
+        assert saved['preferred_genre'] == 'rock'
+        assert evolution.get_persistence_stats()['pending_updates'] == 0
+        
+        # Overlapping flushes leave the newest snapshot on disk
+        store = JSONEvolutionStore(Path(tmp) / 'race.json', flush_interval=60)
+        threads = []
+        for i in range(20):
+            store.record({'timestamp': None, 'genre': 'rock', 'mood': 'calm', 'tempo': 'slow'})
+            threads.append(threading.Thread(target=store.flush))
+            threads[-1].start()
+        for thread in threads:
+            thread.join()
+        store.close()
+        assert json.loads((Path(tmp) / 'race.json').read_text())['total_generations'] == 20
+
+
+def test_evolution_sqlite_store():
+    """Test the SQLite evolution backend and its shared view of the data."""
+    import tempfile
+    from pathlib import Path
+    from evolution_store import SQLiteEvolutionStore
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = Path(tmp) / 'stats.db'
+        evolution = EvolutionEngine(store=SQLiteEvolutionStore(db_file))
+        for genre, mood in (('rock', 'dark'), ('jazz', 'calm'), ('rock', 'calm')):
+            evolution.record_generation({'customization': {'genre': genre, 'mood': mood}})
+        evolution.evolve()
+        
+        # A second engine on the same database sees the same state
+        other = EvolutionEngine(store=SQLiteEvolutionStore(db_file))
+        stats = other.get_stats()
+        assert stats['total_generations'] == 3
+        assert stats['genre_counts'] == {'rock': 2, 'jazz': 1}
+        assert stats['preferred_genre'] == 'rock'
+        assert len(stats['recent_generations']) == 3
+        assert other.get_score() == evolution.get_score()
+        assert other.get_recommendations()['mood'] == 'calm'
+        
+        evolution.close()
+        other.close()
+
+
+def test_evolution_shared_store():
+    """Test the memory-mapped evolution backend across processes."""
+    import multiprocessing
+    import tempfile
+    from pathlib import Path
+    from evolution_store import SharedMemoryEvolutionStore
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        shared_file = Path(tmp) / 'stats.bin'
+        evolution = EvolutionEngine(store=SharedMemoryEvolutionStore(shared_file, history_capacity=5))
+        
+        # Forked workers increment the same counters
+        workers = [multiprocessing.get_context('fork').Process(
+            target=_record_shared, args=(shared_file, genre, 50)) for genre in ('rock', 'jazz', 'rock')]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+            assert worker.exitcode == 0
+        
+        evolution.evolve()
+        stats = evolution.get_stats()
+        assert stats['total_generations'] == 150
+        assert stats['genre_counts'] == {'rock': 100, 'jazz': 50}
+        assert stats['preferred_genre'] == 'rock'
+        assert len(stats['recent_generations']) == 5
+        assert stats['persistence']['backend'] == 'shared'
+        
+        # A store opened later sees the same state
+        other = SharedMemoryEvolutionStore(shared_file)
+        assert other.get_derived('evolution_score') == evolution.get_score()
+        assert other.history_capacity == 5
+        other.close()
+        evolution.close()
+        
+        # Values longer than a slot name share one slot across stores
+        long_genre = 'g' * 60
+        for _ in range(3):
+            _record_shared(shared_file, long_genre, 1)
+        store = SharedMemoryEvolutionStore(shared_file)
+        assert store.counts()['genre_counts']['g' * 54] == 3
+        assert store.persistence_stats()['slots_used'] == 8
+        store.close()
+
+
+def _record_shared(shared_file, genre, count):
+    from evolution_store import SharedMemoryEvolutionStore
+    store = SharedMemoryEvolutionStore(shared_file)
+    for _ in range(count):
+        store.record({'timestamp': None, 'genre': genre, 'mood': 'calm', 'tempo': 'medium'})
+    store.close()
+
+
+def test_audio_renderer():
+    """Test audio rendering, its MIDI-hash cache and missing synthesizers."""
+    import tempfile
+    from pathlib import Path
+    from audio_renderer import AudioRenderer, AudioRenderError
+    from output_store import OutputStore
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        store = OutputStore(tmp / 'output')
+        song = MusicGenerator(output_store=store).generate({'genre': 'jazz'})
+        
+        # Stand-in synthesizer that writes one second of silence to -F
+        synth = tmp / 'fake-fluidsynth'
+        synth.write_text(
+            f"#!{sys.executable}\n"
+            "import sys, wave\n"
+            "with wave.open(sys.argv[sys.argv.index('-F') + 1], 'wb') as f:\n"
+            "    f.setnchannels(2); f.setsampwidth(2); f.setframerate(8000)\n"
+            "    f.writeframes(bytes(8000 * 4))\n"
+        )
+        synth.chmod(0o755)
+        soundfont = tmp / 'test.sf2'
+        soundfont.write_bytes(b'sf2')
+        
+        renderer = AudioRenderer(tmp / 'output', soundfont, fluidsynth_bin=str(synth))
+        audio = renderer.render(song)
+        assert audio.startswith('audio/') and audio.endswith('.wav')
+        assert (tmp / 'output' / audio).is_file()
+        
+        # Same MIDI bytes are served from the cache
+        assert renderer.render(song) == audio
+        stats = renderer.stats()
+        assert stats['renders'] == 1 and stats['cache_hits'] == 1
+        assert stats['audio_seconds'] == 1.0
+        
+        # Other synthesis settings render again
+        resampled = AudioRenderer(tmp / 'output', soundfont, fluidsynth_bin=str(synth),
+                                  sample_rate=22050)
+        assert resampled.render(song) != audio
+        assert resampled.stats()['renders'] == 1
+        other_font = tmp / 'other.sf2'
+        other_font.write_bytes(b'sf2')
+        assert AudioRenderer(tmp / 'output', other_font, fluidsynth_bin=str(synth)).render(song) != audio
+        resampled.shutdown()
+        
+        try:
+            renderer.render(song, 'mp3')
+            assert False, "unknown format should fail"
+        except AudioRenderError:
+            pass
+        
+        missing = AudioRenderer(tmp / 'output', tmp / 'missing.sf2', fluidsynth_bin=str(synth))
+        other_song = MusicGenerator(output_store=store).generate({'genre': 'rock'})
+        try:
+            missing.render(other_song)
+            assert False, "missing soundfont should fail"
+        except AudioRenderError:
+            pass
+        renderer.shutdown()
+
+
+def test_inline_midi():
+    """Test in-memory MIDI: inline base64 results and the preview endpoint."""
+    import base64
+    import random
+    import app as app_module
+    
+    music_gen = MusicGenerator()
+    data = music_gen.generate_bytes({'genre': 'blues'}, random.Random(5))
+    assert data.startswith(b'MThd')
+    assert data == music_gen.generate_bytes({'genre': 'blues'}, random.Random(5))
+    
+    client = app_module.app.test_client()
+    response = client.post('/api/generate', json={
+        'quantity': 1,
+        'content_types': ['song'],
+        'customization': {'genre': 'blues', 'inline_midi': True}
+    })
+    result = response.get_json()['results'][0]
+    assert 'song' not in result
+    assert base64.b64decode(result['song_midi']).startswith(b'MThd')
+    
+    response = client.get('/api/preview/song?genre=blues&seed=5')
+    assert response.status_code == 200
+    assert response.mimetype == 'audio/midi'
+    assert response.data == client.get('/api/preview/song?genre=blues&seed=5').data
+    
+    # Seeded inline results are cached in memory only, with no batch manifest
+    body = {
+        'quantity': 1,
+        'content_types': ['song'],
+        'customization': {'genre': 'blues', 'inline_midi': True, 'seed': 77}
+    }
+    first = client.post('/api/generate', json=body).get_json()['results'][0]
+    second = client.post('/api/generate', json=body).get_json()['results'][0]
+    assert first['song_midi'] == second['song_midi']
+    key = app_module.result_cache.make_key(77, body['customization'], 'song', 0)
+    assert app_module.result_cache.get(key) is not None
+    assert not app_module.result_cache._entry_path(key).exists()
+    batch_id = first['id'].rsplit('_', 1)[0]
+    assert client.get(f'/api/batches/{batch_id}/archive').status_code == 404
+
+
+def test_melody_events():
+    """Test batched melody drawing and configurable song length."""
+    import random
+    
+    music_gen = MusicGenerator(duration_bars=8, beats_per_bar=4)
+    pitches, starts, durations, velocities = music_gen.melody_events(
+        'blues', 'D', 'calm', 32, random.Random(1))
+    
+    scale = set(music_gen.pitch_table('blues', 'D', 5).tolist())
+    assert len(pitches) == 32 and set(pitches) <= scale
+    assert all(60 <= v <= 90 for v in velocities)
+    assert set(durations) <= {0.5, 1, 2}
+    assert starts[0] == 0 and starts[1] == durations[0]
+    
+    # Same seed, same song; longer songs are larger
+    short = music_gen.generate_bytes({'genre': 'blues'}, random.Random(1))
+    assert short == music_gen.generate_bytes({'genre': 'blues'}, random.Random(1))
+    long = MusicGenerator(duration_bars=64).generate_bytes({'genre': 'blues'}, random.Random(1))
+    assert len(long) > len(short)
+    
+    # The bass holds one note per bar, however many beats a bar has
+    midi = MusicGenerator(duration_bars=4, beats_per_bar=3).build({'genre': 'blues'}, random.Random(1))
+    ticks = midi.ticks_per_quarternote
+    bass = [event for event in midi.tracks[1].eventList
+            if type(event).__name__ == 'NoteOn' and event.channel == 1]
+    assert [event.tick for event in bass] == [bar * 3 * ticks for bar in range(4)]
+    assert {event.duration for event in bass} == {3 * ticks}
+
+
+def test_arrangement():
+    """Test multi-track arrangements and independent, reproducible tracks."""
+    import io
+    import random
+    from arrangement import DRUM_CHANNEL, SongContext
+    
+    music_gen = MusicGenerator(duration_bars=8, arrangement='full')
+    arranger = music_gen.arranger
+    
+    data = music_gen.generate_bytes({'genre': 'rock'}, random.Random(2))
+    assert data == music_gen.generate_bytes({'genre': 'rock'}, random.Random(2))
+    # Header track count: tempo track plus melody, chords, bass and drums
+    assert int.from_bytes(data[10:12], 'big') == 5
+    
+    only_bass = music_gen.generate_bytes({'genre': 'rock', 'tracks': ['bass']}, random.Random(2))
+    assert int.from_bytes(only_bass[10:12], 'big') == 2
+    
+    # Each track is built on its own from the song context and its seed
+    song = SongContext('jazz', 'calm', 'C', music_gen.genre_scales['jazz'], 0, 8, 4)
+    rng = random.Random(9)
+    seeds = {name: rng.getrandbits(64) for name in arranger.TRACKS}
+    chords = arranger.build_track('chords', song, seeds['chords'])
+    assert len(chords.notes) == 8 * 3
+    drums = arranger.build_track('drums', song, seeds['drums'])
+    assert drums.channel == DRUM_CHANNEL and drums.notes
+    melody = arranger.build_track('melody', song, seeds['melody'])
+    assert melody == arranger.build_track('melody', song, seeds['melody'])
+    assert max(start + length for _, start, length, _ in melody.notes) <= 8 * 4
+    
+    # The simple arrangement stays the default
+    assert MusicGenerator().arrangement == 'simple'
+    built = io.BytesIO()
+    music_gen.build({'genre': 'rock'}, random.Random(2)).writeFile(built)
+    assert built.getvalue() == data
+
+
+def test_midi_corpus():
+    """Test the corpus index: building, lazy memory-mapping and sampling."""
+    import random
+    import tempfile
+    from pathlib import Path
+    import numpy as np
+    from midi_corpus import CorpusModel, build_index, parse_midi
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'library'
+        source.mkdir()
+        music_gen = MusicGenerator(duration_bars=4)
+        for genre in ('pop', 'rock', 'jazz'):
+            (source / f'{genre}.mid').write_bytes(
+                music_gen.generate_bytes({'genre': genre, 'key': 'D'}, random.Random(genre)))
+        (source / 'notes.txt').write_text('not midi')
+        
+        division, notes = parse_midi(source / 'pop.mid')
+        assert division == 960 and len(notes) == 4 * 4 + 4
+        
+        index_file = Path(tmp) / 'corpus.idx'
+        summary = build_index(source, index_file)
+        assert summary['files'] == 3 and summary['skipped'] == 0
+        
+        model = CorpusModel(index_file)
+        assert model._arrays is None  # nothing is read until first use
+        arrays = model.arrays()
+        assert arrays['files'] == 3 and arrays['transitions'].sum() > 0
+        assert arrays['key_counts'].sum() == 3
+        
+        corpus_gen = MusicGenerator(duration_bars=4, corpus_index=index_file)
+        pitches, _, durations, _ = corpus_gen.melody_events(
+            'blues', 'C', 'happy', 64, random.Random(1), mode='corpus')
+        scale = set(corpus_gen.pitch_table('blues', 'C', 5).tolist())
+        assert set(pitches) <= scale and all(0.25 <= d <= 4 for d in durations)
+        
+        # Without an index, corpus mode falls back to scale melodies
+        fallback = MusicGenerator(corpus_index=Path(tmp) / 'missing.idx')
+        assert fallback.generate_bytes({'melody_mode': 'corpus'}, random.Random(1)) == \
+            fallback.generate_bytes({}, random.Random(1))
+        
+        # An empty melody has no notes
+        assert model.melody([0, 2, 4], 0, np.random.default_rng(1)) == ([], [])
+        assert corpus_gen.melody_events('pop', 'C', 'happy', 0, random.Random(1),
+                                        mode='corpus') == ([], [], [], [])
+        
+        # A truncated or corrupt index is treated as missing, not an error
+        data = index_file.read_bytes()
+        for name, contents in (('truncated.idx', data[:len(data) // 2]),
+                               ('short.idx', data[:10]),
+                               ('corrupt.idx', b'x' * len(data))):
+            (Path(tmp) / name).write_bytes(contents)
+            broken = MusicGenerator(corpus_index=Path(tmp) / name)
+            assert broken.generate_bytes({'melody_mode': 'corpus'}, random.Random(1)) == \
+                broken.generate_bytes({}, random.Random(1))
+            assert not broken.corpus.available() and broken.corpus.load_error
+
+
+def test_markov_lyrics():
+    """Test alias tables, Markov lyric lines and the template fallback."""
+    import random
+    import tempfile
+    from collections import Counter
+    from pathlib import Path
+    from markov_lyrics import MarkovTables, build_alias, build_tables
+    
+    # Alias draws follow the weights
+    prob, alias = build_alias([1, 3])
+    rng = random.Random(0)
+    draws = Counter()
+    for _ in range(4000):
+        draw = rng.random() * 2
+        column = int(draw)
+        draws[column if draw - column < prob[column] else alias[column]] += 1
+    assert 0.7 < draws[1] / 4000 < 0.8
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        source = Path(tmp) / 'corpus'
+        source.mkdir()
+        (source / 'calm.txt').write_text("the quiet sea\nthe quiet stars are bright\n")
+        (source / 'jazz-calm.txt').write_text("slow blue notes\n")
+        tables_file = Path(tmp) / 'tables.npz'
+        assert build_tables(source, tables_file) == {'calm': 2, 'jazz-calm': 1}
+        
+        tables = MarkovTables(tables_file)
+        assert tables.table_name('calm', 'jazz') == 'jazz-calm'
+        assert tables.table_name('calm', 'rock') == 'calm'
+        assert tables.table_name('dark') is None
+        for _ in range(20):
+            assert tables.line('calm', rng) in ('The quiet sea', 'The quiet stars are bright')
+        
+        lyrics_gen = LyricsGenerator(engine='markov', tables_file=tables_file)
+        lyrics = lyrics_gen.generate({'mood': 'calm', 'genre': 'jazz'}, random.Random(1))
+        assert 'Slow blue notes' in lyrics and '[Chorus]' in lyrics
+        
+        # Without tables the template engine is used
+        fallback = LyricsGenerator(engine='markov', tables_file=Path(tmp) / 'missing.npz')
+        assert fallback.generate({}, random.Random(1)) == LyricsGenerator().generate({}, random.Random(1))
+
+
+def test_lyrics_store():
+    """Test batched lyrics storage and the /api/lyrics endpoint."""
+    import tempfile
+    from pathlib import Path
+    from lyrics_store import LyricsStore
+    import app as app_module
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        store = LyricsStore(Path(tmp) / 'lyrics.db', batch_size=3)
+        store.put('a', 'first', {'genre': 'rock', 'mood': 'dark'})
+        store.put('b', 'second')
+        # Buffered lyrics are readable before they are written
+        assert store.get('a') == 'first' and store.stats()['writes'] == 0
+        store.put('c', 'third')
+        assert store.stats() == {'pending': 0, 'writes': 1, 'rows_written': 3,
+                                 'last_write_ms': store.last_write_ms}
+        
+        # Another store on the same database reads them back
+        assert LyricsStore(Path(tmp) / 'lyrics.db').get('c') == 'third'
+        assert store.get('missing') is None
+        
+        # Pruning keeps the newest rows under the quota, then expires by age
+        assert store.disk_usage()['bytes'] > 0
+        assert store.prune(max_rows=2) == 1 and store.get('a') is None
+        assert store.prune(max_age_seconds=3600) == 0
+        assert store.prune(max_age_seconds=-1) == 2 and store.get('c') is None
+        assert store.disk_usage()['pruned_rows'] == 3
+    
+    client = app_module.app.test_client()
+    response = client.post('/api/generate', json={
+        'quantity': 2,
+        'content_types': ['lyrics'],
+        'customization': {'mood': 'calm'}
+    })
+    result = response.get_json()['results'][1]
+    assert result['lyrics_url'] == f"/api/lyrics/{result['id']}"
+    
+    response = client.get(result['lyrics_url'])
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    assert response.get_data(as_text=True) == result['lyrics']
+    assert 'attachment' in client.get(result['lyrics_url'] + '?download=1').headers['Content-Disposition']
+    assert client.get('/api/lyrics/unknown').status_code == 404
+    
+    # Lyrics made on a process pool are stored, and timed, by the parent
+    from batch_executor import BatchExecutor
+    executor = BatchExecutor(pool_size=2, pool_type='process')
+    before = app_module.metrics.snapshot()['stages']['lyrics']['count']
+    try:
+        items = list(app_module.iter_batch(2, ['lyrics'], {'mood': 'sad'}, executor=executor))
+    finally:
+        executor.shutdown()
+    for item in items:
+        assert client.get(item['lyrics_url']).get_data(as_text=True) == item['lyrics']
+    assert app_module.metrics.snapshot()['stages']['lyrics']['count'] == before + 2
+    
+    # The database is kept out of the publicly served output directory
+    db_file = Path(app_module.lyrics_store.db_file).resolve()
+    assert app_module.OUTPUT_DIR.resolve() not in db_file.parents
+
+
+def test_unique_artist_names():
+    """Test the artist name space, unique sampling and the issued-name filter."""
+    import random
+    import tempfile
+    from pathlib import Path
+    from bloom_filter import BloomFilter
+    import app as app_module
+    
+    artist_gen = ArtistGenerator()
+    space = artist_gen.name_space('jazz')
+    names = [space[i] for i in range(len(space))]
+    assert len(space) == 900 and len(set(names)) == len(names)
+    
+    sample = artist_gen.generate_unique({'genre': 'jazz'}, 300, random.Random(1))
+    assert len(set(sample)) == 300 and set(sample) <= set(names)
+    assert sample == artist_gen.generate_unique({'genre': 'jazz'}, 300, random.Random(1))
+    try:
+        artist_gen.generate_unique({'genre': 'jazz'}, len(space) + 1)
+        assert False, "asking for more names than exist should fail"
+    except ValueError:
+        pass
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        path = Path(tmp) / 'issued.bloom'
+        issued = ArtistGenerator(issued_filter=BloomFilter(path, capacity=1000))
+        first = issued.generate_unique({'genre': 'pop'}, 400, random.Random(2))
+        issued.issued_filter.close()
+        
+        # The filter persists; excluded draws never repeat an issued name
+        reopened = ArtistGenerator(issued_filter=BloomFilter(path, capacity=1000))
+        assert all(name in reopened.issued_filter for name in first)
+        second = reopened.generate_unique({'genre': 'pop'}, 400, random.Random(2),
+                                          exclude_issued=True)
+        assert not set(first) & set(second)
+        reopened.issued_filter.close()
+    
+    client = app_module.app.test_client()
+    response = client.get('/api/artist-names?genre=rock&count=25&seed=4')
+    data = response.get_json()
+    assert response.status_code == 200 and len(set(data['names'])) == 25
+    assert client.get('/api/artist-names?count=0').status_code == 400
+    
+    # Names within a batch are distinct
+    response = client.post('/api/generate', json={
+        'quantity': 10,
+        'content_types': ['artist'],
+        'customization': {'genre': 'blues', 'seed': 3}
+    })
+    batch = [item['artist'] for item in response.get_json()['results']]
+    assert len(set(batch)) == 10
+
+
+def test_metrics():
+    """Test latency histograms, counters and the /api/metrics endpoint."""
+    from metrics import Histogram, Metrics
+    import app as app_module
+    
+    histogram = Histogram(buckets=(1.0, 2.0, 4.0))
+    for value in (0.5, 1.5, 1.5, 3.0):
+        histogram.observe(value)
+    assert histogram.counts == [1, 2, 1, 0] and histogram.sum == 6.5
+    assert histogram.quantile(0.5) == 1.5
+    assert histogram.quantile(0.99) > 2.0
+    assert Histogram().quantile(0.5) is None
+    
+    registry = Metrics(namespace='test', buckets=(1.0, 2.0))
+    with registry.time('stage'):
+        pass
+    registry.count_item('song', 3)
+    registry.count_error('song')
+    text = registry.render()
+    assert 'test_stage_duration_seconds_bucket{stage="stage",le="+Inf"} 1' in text
+    assert 'test_stage_duration_seconds_count{stage="stage"} 1' in text
+    assert 'test_items_total{content_type="song"} 3' in text
+    assert 'test_errors_total{content_type="song"} 1' in text
+    
+    client = app_module.app.test_client()
+    client.post('/api/generate', json={
+        'quantity': 2,
+        'content_types': ['artist', 'lyrics', 'song'],
+        'customization': {'genre': 'rock'}
+    })
+    response = client.get('/api/metrics')
+    assert response.status_code == 200 and response.mimetype == 'text/plain'
+    text = response.get_data(as_text=True)
+    for stage in ('artist', 'lyrics', 'save_lyrics', 'song', 'evolve'):
+        assert f'music_ai_stage_duration_seconds_count{{stage="{stage}"}}' in text
+    
+    stats = client.get('/api/metrics?format=json').get_json()
+    assert stats['items']['song'] >= 2 and stats['items']['artist'] >= 2
+    assert stats['stages']['song']['p95'] is not None
+
+
+def test_lazy_startup():
+    """Test that importing the app defers generators and heavy imports."""
+    import json
+    import subprocess
+    import sys
+    import tempfile
+    from pathlib import Path
+    from lazy import LazyObject, is_built, warm_up
+    
+    calls = []
+    
+    class Target:
+        value = 1
+    
+    def factory():
+        calls.append(1)
+        return Target()
+    
+    proxy = LazyObject(factory, 'target')
+    assert not is_built(proxy) and not calls
+    proxy.value = 5
+    assert proxy.value == 5 and calls == [1] and is_built(proxy)
+    assert set(warm_up([proxy])) == {'target'} and calls == [1]
+    
+    # A fresh interpreter imports the app without NumPy, Pillow or midiutil
+    root = Path(__file__).resolve().parent
+    script = (
+        "import sys, json\n"
+        f"sys.path.insert(0, {str(root)!r})\n"
+        "import app\n"
+        "from lazy import is_built\n"
+        "heavy = [m for m in ('numpy', 'PIL', 'midiutil', 'music_generator') if m in sys.modules]\n"
+        "lazy = [c._lazy_name for c in app.LAZY_COMPONENTS if not is_built(c)]\n"
+        "import threading\n"
+        "threads = [t.name for t in threading.enumerate()]\n"
+        "warm = sorted(app.warm_up())\n"
+        "sweeping = 'retention' in [t.name for t in threading.enumerate()]\n"
+        "print(json.dumps({'heavy': heavy, 'lazy': lazy, 'warm': warm,\n"
+        "                  'threads': threads, 'sweeping': sweeping}))\n"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        output = subprocess.run([sys.executable, '-c', script], cwd=tmp,
+                                capture_output=True, text=True, check=True).stdout
+    report = json.loads(output.strip().splitlines()[-1])
+    assert report['heavy'] == []
+    assert len(report['lazy']) == 6 and sorted(report['lazy']) == report['warm']
+    # Retention sweeps start with warm-up (or the first request), not on import
+    assert report['threads'] == ['MainThread'] and report['sweeping']
+    
+    # `python app.py` starts from a fresh checkout with no output/ directory
+    script = (
+        "import runpy, sys, flask\n"
+        f"sys.path.insert(0, {str(root)!r})\n"
+        "flask.Flask.run = lambda self, **kwargs: print('started')\n"
+        f"runpy.run_path({str(root / 'app.py')!r}, run_name='__main__')\n"
+    )
+    with tempfile.TemporaryDirectory() as tmp:
+        output = subprocess.run([sys.executable, '-c', script], cwd=tmp,
+                                capture_output=True, text=True, check=True).stdout
+        assert output.strip().splitlines()[-1] == 'started'
+        assert (Path(tmp) / 'output' / 'songs').is_dir()
+
+
+def test_http_caching():
+    """Test validators, Cache-Control and Range requests on cacheable routes."""
+    import app as app_module
+    
+    client = app_module.app.test_client()
+    
+    # The catalog comes from config.json and revalidates with 304
+    response = client.get('/api/customization-options')
+    assert response.status_code == 200
+    assert response.get_json()['genres'] == app_module.CONFIG['customization']['genres']
+    assert 'max-age' in response.headers['Cache-Control']
+    etag = response.headers['ETag']
+    assert client.get('/api/customization-options',
+                      headers={'If-None-Match': etag}).status_code == 304
+    assert client.get('/api/customization-options', headers={
+        'If-Modified-Since': response.headers['Last-Modified']
+    }).status_code == 304
+    
+    # Generated media is immutable and supports partial downloads
+    song = client.post('/api/generate', json={
+        'quantity': 1, 'content_types': ['song', 'lyrics']
+    }).get_json()['results'][0]
+    response = client.get(f"/output/{song['song']}")
+    assert response.status_code == 200
+    assert 'immutable' in response.headers['Cache-Control']
+    full = response.data
+    response = client.get(f"/output/{song['song']}", headers={'Range': 'bytes=0-3'})
+    assert response.status_code == 206 and response.data == full[:4] == b'MThd'
+    assert client.get(f"/output/{song['song']}",
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    
+    response = client.get(song['lyrics_url'], headers={'Range': 'bytes=0-4'})
+    assert response.status_code == 206 and response.data == song['lyrics'].encode()[:5]
+    assert client.get(song['lyrics_url'],
+                      headers={'If-None-Match': response.headers['ETag']}).status_code == 304
+    
+    # Only media directories are served from the output directory
+    batch_id = song['id'].rsplit('_', 1)[0]
+    assert client.get(f"/output/batches/{batch_id[:2]}/{batch_id}.json").status_code == 404
+    assert client.get('/output/issued_artists.bloom').status_code == 404
+
+
+def test_retention():
+    """Test LRU eviction, age expiry and re-indexing of output files."""
+    import os
+    import tempfile
+    import time
+    from pathlib import Path
+    from retention import RetentionManager
+    import app as app_module
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        base = Path(tmp)
+        now = time.time()
+        
+        def write(relative_path, size, age):
+            path = base / relative_path
+            path.parent.mkdir(parents=True, exist_ok=True)
+            path.write_bytes(b'x' * size)
+            os.utime(path, (now - age, now - age))
+        
+        # Existing files are indexed in access order on the first sweep
+        write('songs/aa/old.mid', 100, 3000)
+        write('songs/bb/middle.mid', 100, 2000)
+        write('images/aa/new.png', 100, 1000)
+        write('cache/aa/entry.json', 100, 5000)
+        manager = RetentionManager(base, directories=('songs', 'images'),
+                                   max_bytes=250, grace_seconds=0, batch_size=2)
+        assert manager.sweep() == 1
+        assert not (base / 'songs/aa/old.mid').exists()
+        assert (base / 'cache/aa/entry.json').exists()
+        stats = manager.stats()
+        assert stats['files'] == 2 and stats['bytes'] == 200
+        assert stats['evicted_files'] == 1 and stats['directories']['images']['files'] == 1
+        
+        # Using a file makes it the most recently used
+        manager.touch('songs/bb/middle.mid')
+        write('songs/cc/tracked.mid', 100, 0)
+        manager.track('songs/cc/tracked.mid', 100)
+        manager.sweep()
+        assert not (base / 'images/aa/new.png').exists()
+        assert (base / 'songs/bb/middle.mid').exists()
+        
+        # Files written or deleted behind its back are picked up
+        (base / 'songs/bb/middle.mid').unlink()
+        write('images/dd/other.png', 50, 10)
+        manager.sweep()
+        assert manager.stats()['bytes'] == 150
+        
+        # Unused files expire once older than max_age_seconds
+        manager.max_age_seconds = 5
+        manager.sweep()
+        assert manager.stats()['files'] == 1 and manager.stats()['expired_files'] == 1
+        
+        # The grace period protects fresh files even over quota
+        manager.max_bytes = 0
+        manager.grace_seconds = 60
+        assert manager.sweep() == 0
+        
+        # Every sweep runs the hook that prunes stores kept elsewhere
+        swept = []
+        manager.on_sweep = lambda: swept.append(1)
+        manager.sweep()
+        assert swept == [1]
+        
+        # A forked child starts its own sweep thread, even if the parent's
+        # thread held the lock when it forked
+        manager.sweep_interval = 3600
+        manager.start()
+        parent_thread = manager._thread
+        manager._thread_pid = -1
+        manager._lock.acquire()
+        manager.start()
+        assert manager._thread is not parent_thread and manager._thread.is_alive()
+        assert manager._thread_pid == os.getpid()
+        manager.stop()
+    
+    client = app_module.app.test_client()
+    result = client.post('/api/generate', json={
+        'quantity': 1, 'content_types': ['song']
+    }).get_json()['results'][0]
+    stats = client.get('/api/storage').get_json()
+    assert stats['enabled'] and stats['directories']['songs']['files'] >= 1
+    assert stats['lyrics_db']['bytes'] > 0
+    assert client.get(f"/output/{result['song']}").status_code == 200
+
+
+def test_batch_archive():
+    """Test streaming a batch's files as one ZIP or TAR archive."""
+    import io
+    import json
+    import tarfile
+    import zipfile
+    import batch_archive
+    import app as app_module
+    
+    client = app_module.app.test_client()
+    data = client.post('/api/generate', json={
+        'quantity': 2,
+        'content_types': ['artist', 'lyrics', 'song', 'picture'],
+        'customization': {'genre': 'jazz'}
+    }).get_json()
+    assert data['archive_url'] == f"/api/batches/{data['batch_id']}/archive"
+    first = data['results'][0]
+    
+    response = client.get(data['archive_url'])
+    assert response.status_code == 200 and response.is_streamed
+    assert response.mimetype == 'application/zip'
+    with zipfile.ZipFile(io.BytesIO(response.data)) as archive:
+        assert archive.testzip() is None
+        names = archive.namelist()
+        assert names[0] == 'manifest.json'
+        assert {'item_01/song.mid', 'item_01/picture.png', 'item_01/lyrics.txt',
+                'item_02/song.mid'} <= set(names)
+        with open(app_module.OUTPUT_DIR / first['song'], 'rb') as f:
+            assert archive.read('item_01/song.mid') == f.read()
+        assert archive.read('item_01/lyrics.txt').decode() == first['lyrics']
+        summary = json.loads(archive.read('manifest.json'))
+        assert summary['items'][0]['artist'] == first['artist']
+    
+    response = client.get(data['archive_url'] + '?format=tar')
+    assert response.mimetype == 'application/x-tar'
+    with tarfile.open(fileobj=io.BytesIO(response.data)) as archive:
+        assert set(archive.getnames()) == set(names)
+        assert archive.extractfile('item_02/lyrics.txt').read().decode() == \
+            data['results'][1]['lyrics']
+    
+    # A repeated seeded batch reuses cached parts, lyrics included
+    request = {'quantity': 1, 'content_types': ['lyrics', 'song'],
+               'customization': {'genre': 'blues', 'seed': 'archive'}}
+    client.post('/api/generate', json=request)
+    repeat = client.post('/api/generate', json=request).get_json()
+    with zipfile.ZipFile(io.BytesIO(client.get(repeat['archive_url']).data)) as archive:
+        assert archive.read('item_01/lyrics.txt').decode() == repeat['results'][0]['lyrics']
+        assert json.loads(archive.read('manifest.json'))['items'][0]['missing'] == []
+    
+    # Lyrics that are gone are reported as missing
+    manifest = batch_archive.load_manifest(app_module.OUTPUT_DIR, repeat['batch_id'])
+    entries = batch_archive.archive_entries(app_module.OUTPUT_DIR, manifest, lambda _: None)
+    summary = json.loads(entries[0][1])
+    assert summary['items'][0]['missing'] == [repeat['results'][0]['lyrics_url']]
+    
+    # Manifests are sharded and fall under retention
+    batch_id = data['batch_id']
+    assert (app_module.OUTPUT_DIR / 'batches' / batch_id[:2] / f"{batch_id}.json").is_file()
+    assert client.get('/api/storage').get_json()['directories']['batches']['files'] >= 1
+    
+    assert client.get(data['archive_url'] + '?format=rar').status_code == 400
+    assert client.get('/api/batches/' + '0' * 32 + '/archive').status_code == 404
+    assert client.get('/api/batches/..%2Fconfig/archive').status_code == 404
+
+
+def test_single_flight():
+    """Test coalescing of identical concurrent calls."""
+    import threading
+    from single_flight import SingleFlight
+    
+    joined = threading.Semaphore(0)
+    group = SingleFlight(max_waiters=2, wait_timeout=5, on_join=lambda key: joined.release())
+    entered = threading.Semaphore(0)
+    release = threading.Event()
+    calls = []
+    
+    def slow():
+        calls.append(1)
+        entered.release()
+        assert release.wait(5)
+        return {'song': 'songs/x.mid'}
+    
+    results = []
+    
+    def call():
+        results.append(group.do('key', slow))
+    
+    threads = [threading.Thread(target=call) for _ in range(4)]
+    threads[0].start()
+    assert entered.acquire(timeout=5)
+    # Two callers join the flight; the third is over the fan-out limit and
+    # computes on its own
+    for thread in threads[1:3]:
+        thread.start()
+    assert joined.acquire(timeout=5) and joined.acquire(timeout=5)
+    threads[3].start()
+    assert entered.acquire(timeout=5)
+    assert group.stats()['in_flight'] == 1
+    release.set()
+    for thread in threads:
+        thread.join()
+    
+    assert len(calls) == 2 and len(results) == 4
+    assert sorted(shared for _, shared in results) == [False, False, True, True]
+    stats = group.stats()
+    assert stats == {'in_flight': 0, 'leaders': 1, 'coalesced': 2, 'overflows': 1,
+                     'timeouts': 0, 'max_waiters': 2}
+    
+    # A later call computes again
+    assert group.do('key', lambda: 'fresh') == ('fresh', False)
+    
+    # Errors reach the leader and are not remembered
+    def fail():
+        raise RuntimeError('boom')
+    try:
+        group.do('key', fail)
+        assert False, "the leader should see the error"
+    except RuntimeError:
+        pass
+    assert group.stats()['in_flight'] == 0
+
+
+def test_generate_coalescing():
+    """Test that identical concurrent seeded requests run the generator once."""
+    import threading
+    import uuid
+    from single_flight import SingleFlight
+    import app as app_module
+    
+    joined = threading.Event()
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+    run_generator = app_module._run_generator
+    
+    def slow_run_generator(*args):
+        runs.append(args[0])
+        started.set()
+        assert release.wait(10)
+        return run_generator(*args)
+    
+    body = {'quantity': 1, 'content_types': ['song'],
+            'customization': {'genre': 'rock', 'seed': uuid.uuid4().hex}}
+    responses = []
+    
+    def post():
+        responses.append(app_module.app.test_client().post('/api/generate', json=body))
+    
+    single_flight = app_module.single_flight
+    app_module.single_flight = SingleFlight(on_join=lambda key: joined.set())
+    app_module._run_generator = slow_run_generator
+    before = app_module.metrics.snapshot()['coalesced'].get('song', 0)
+    try:
+        first = threading.Thread(target=post)
+        first.start()
+        assert started.wait(10)
+        second = threading.Thread(target=post)
+        second.start()
+        assert joined.wait(10)
+        release.set()
+        first.join()
+        second.join()
+    finally:
+        release.set()
+        app_module._run_generator = run_generator
+        app_module.single_flight = single_flight
+    
+    assert runs == ['song']
+    assert [response.status_code for response in responses] == [200, 200]
+    songs = [response.get_json()['results'][0]['song'] for response in responses]
+    assert songs[0] == songs[1]
+    assert app_module.metrics.snapshot()['coalesced']['song'] == before + 1
+    text = app_module.app.test_client().get('/api/metrics').get_data(as_text=True)
+    assert f'music_ai_coalesced_total{{content_type="song"}} {before + 1}' in text
+
+
+def test_result_cache_fingerprint():
+    """Test that result cache keys change with generator settings and data files."""
+    import os
+    import tempfile
+    from pathlib import Path
+    from result_cache import ResultCache, settings_fingerprint
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        corpus = Path(tmp) / 'corpus.idx'
+        corpus.write_bytes(b'v1')
+        settings = {'midi_duration_bars': 32, 'arrangement': 'simple'}
+        base = settings_fingerprint(settings, files=[corpus])
+        
+        assert settings_fingerprint(settings, files=[corpus]) == base
+        assert settings_fingerprint({**settings, 'arrangement': 'full'}, files=[corpus]) != base
+        os.utime(corpus, ns=(0, 0))
+        assert settings_fingerprint(settings, files=[corpus]) != base
+        assert settings_fingerprint(settings, files=[Path(tmp) / 'missing.idx']) != base
+        
+        customization = {'genre': 'jazz', 'seed': 3}
+        old = ResultCache(tmp, fingerprint=base)
+        new = ResultCache(tmp, fingerprint=settings_fingerprint({**settings, 'arrangement': 'full'}))
+        key = old.make_key(3, customization, 'lyrics', 0)
+        assert key != new.make_key(3, customization, 'lyrics', 0)
+        
+        # Lyrics live in the database, not in a file the cache checks for
+        old.put(key, {'lyrics': 'la la', 'lyrics_url': '/api/lyrics/x', 'lyrics_file': 'gone.txt'})
+        assert old.get(key)['lyrics'] == 'la la'
+
+
+def test_jobs_api():
+    """Test queuing a job over HTTP and polling it, including error paths."""
+    import threading
+    import time
+    import app as app_module
+    
+    client = app_module.app.test_client()
+    response = client.post('/api/jobs', json={
+        'quantity': 2,
+        'content_types': ['artist', 'lyrics'],
+        'customization': {'genre': 'jazz'},
+        'max_concurrency': '2'
+    })
+    assert response.status_code == 202
+    status_url = response.get_json()['status_url']
+    
+    deadline = time.time() + 30
+    while True:
+        status = client.get(status_url).get_json()
+        if status['status'] in ('completed', 'failed') or time.time() > deadline:
+            break
+        time.sleep(0.01)
+    assert status['status'] == 'completed' and status['completed'] == 2
+    assert status['archive_url'] == f"/api/batches/{status['job_id']}/archive"
+    
+    assert client.post('/api/jobs', json={'max_concurrency': 'abc'}).status_code == 400
+    assert client.get('/api/jobs/unknown').status_code == 404
+    
+    # A full backlog is refused with 429
+    release = threading.Event()
+    queue = JobQueue(max_running_jobs=1, max_queued_jobs=1)
+    original, app_module.job_queue = app_module.job_queue, queue
+    try:
+        blocker = queue.submit(lambda job: release.wait(), 1)
+        while blocker.status == 'queued':
+            time.sleep(0.01)
+        body = {'quantity': 1, 'content_types': ['artist']}
+        assert client.post('/api/jobs', json=body).status_code == 202
+        assert client.post('/api/jobs', json=body).status_code == 429
+    finally:
+        release.set()
+        queue.shutdown()
+        app_module.job_queue = original
+
+
 if __name__ == '__main__':
+    test_batch_executor()
+    test_job_queue()
+    test_generate_stream()
+    test_image_render_backends()
+    test_bounded_cache()
+    test_seeded_generation()
+    test_output_store()
+    test_evolution_write_behind()
+    test_evolution_sqlite_store()
+    test_evolution_shared_store()
+    test_audio_renderer()
+    test_inline_midi()
+    test_melody_events()
+    test_arrangement()
+    test_midi_corpus()
+    test_markov_lyrics()
+    test_lyrics_store()
+    test_unique_artist_names()
+    test_metrics()
+    test_lazy_startup()
+    test_http_caching()
+    test_retention()
+    test_batch_archive()
+    test_single_flight()
+    test_generate_coalescing()
+    test_result_cache_fingerprint()
+    test_jobs_api()
     success = test_generators()
     sys.exit(0 if success else 1)